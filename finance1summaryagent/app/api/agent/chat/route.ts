@@ -12,10 +12,15 @@ import type { ChatRequest, ChatResponse } from '@/types/api';
  * - account_id?: string (legacy support - at least one of entity_id or account_id is required)
  * - entity_type?: string (optional, defaults to "Accounts")
  * - query: string (required)
+ * - stream?: boolean (optional, proxies /chat/stream and returns Server-Sent Events)
  * 
  * Response:
  * - response: string
  * - actions?: Action[]
+ * - cached?: boolean (answer reused from the backend answer cache)
+ * 
+ * Streaming response (text/event-stream), passed through unbuffered:
+ * - "token" events with { text }, then "actions" with { actions }, then "done"
  */
 export async function POST(request: NextRequest) {
   try {
@@ -47,6 +52,25 @@ export async function POST(request: NextRequest) {
       ...(body.entity_type && { entity_type: body.entity_type }),
     };
     
+    // Streaming: hand the backend's event stream straight to the client
+    if (body.stream) {
+      const streamResponse = await fetchFastAPI('/chat/stream', {
+        method: 'POST',
+        body: JSON.stringify(backendRequest),
+        headers: { Accept: 'text/event-stream' },
+      });
+      
+      return new Response(streamResponse.body, {
+        status: 200,
+        headers: {
+          'Content-Type': 'text/event-stream; charset=utf-8',
+          'Cache-Control': 'no-cache, no-transform',
+          Connection: 'keep-alive',
+          'X-Accel-Buffering': 'no',
+        },
+      });
+    }
+    
     // Proxy to FastAPI backend
     const response = await fetchFastAPI('/chat', {
       method: 'POST',
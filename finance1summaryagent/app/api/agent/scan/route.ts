@@ -14,6 +14,7 @@ import type { ScanRequest, ScanResponse } from '@/types/api';
  * 
  * Response:
  * - recommendations: Recommendation[]
+ * - cached?: boolean (answer reused from the backend answer cache)
  */
 export async function POST(request: NextRequest) {
   try {
@@ -72,6 +73,18 @@ export async function POST(request: NextRequest) {
           );
         }
         
+        // Backend shed the scan to keep Gemini capacity for interactive chat
+        if (error.message.includes('503')) {
+          return NextResponse.json(
+            {
+              error: 'Scan temporarily unavailable',
+              details: 'The backend is busy with interactive requests; retry shortly',
+              recommendations: [] // Return empty array for graceful degradation
+            },
+            { status: 503 }
+          );
+        }
+
         return NextResponse.json(
           { error: 'Backend request failed', details: error.message },
           { status: 502 }
@@ -0,0 +1,60 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { ApiClientError, fetchFastAPI } from '@/lib/api/client';
+import type { UploadJobStatus } from '@/types/api';
+
+/**
+ * GET /api/upload/[jobId]
+ *
+ * Proxies upload job status requests to the FastAPI backend /upload/{job_id} endpoint
+ *
+ * Response:
+ * - status: "queued" | "running" | "succeeded" | "failed"
+ * - progress: number (0-1)
+ * - chunks_total, chunks_embedded, error, timestamps
+ */
+export async function GET(
+  request: NextRequest,
+  { params }: { params: { jobId: string } }
+) {
+  try {
+    const response = await fetchFastAPI(`/upload/${encodeURIComponent(params.jobId)}`, {
+      method: 'GET',
+    });
+
+    const data: UploadJobStatus = await response.json();
+
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error('Error in /api/upload/[jobId]:', error);
+
+    if (error instanceof ApiClientError && error.status === 404) {
+      return NextResponse.json(
+        { error: 'Upload job not found' },
+        { status: 404 }
+      );
+    }
+
+    if (error instanceof Error) {
+      // Check if it's a configuration error
+      if (error.message.includes('FastAPI URL is not configured')) {
+        return NextResponse.json(
+          { error: 'Backend configuration error', details: error.message },
+          { status: 500 }
+        );
+      }
+
+      // Check if it's a FastAPI request error
+      if (error.message.includes('FastAPI request failed')) {
+        return NextResponse.json(
+          { error: 'Backend request failed', details: error.message },
+          { status: 502 }
+        );
+      }
+    }
+
+    return NextResponse.json(
+      { error: 'Internal server error', details: 'An unexpected error occurred' },
+      { status: 500 }
+    );
+  }
+}
@@ -13,9 +13,14 @@ import type { UploadResponse } from '@/types/api';
  * - entity_type: string (required)
  * - file_type?: string (optional)
  * 
- * Response:
+ * Response (202 Accepted):
  * - success: boolean
  * - message: string
+ * - job_id: string - poll GET /api/upload/{job_id} for ingestion progress
+ * - status: "queued"
+ *
+ * Returns 413 when the file exceeds the backend's upload size limit. The request is
+ * forwarded with a Content-Length (fetch sets it for FormData), which the backend requires.
  */
 export async function POST(request: NextRequest) {
   try {
@@ -84,6 +89,18 @@ export async function POST(request: NextRequest) {
         );
       }
       
+      // File over the backend's upload size limit
+      if (response.status === 413) {
+        return NextResponse.json(
+          {
+            success: false,
+            error: 'File too large',
+            message: errorText
+          },
+          { status: 413 }
+        );
+      }
+      
       throw new Error(
         `FastAPI request failed: ${response.status} ${response.statusText}. ${errorText}`
       );
@@ -91,7 +108,8 @@ export async function POST(request: NextRequest) {
     
     const data: UploadResponse = await response.json();
     
-    return NextResponse.json(data);
+    // Keep the backend's 202 so clients know ingestion is still running
+    return NextResponse.json(data, { status: response.status });
   } catch (error) {
     console.error('Error in /api/upload:', error);
     
@@ -6,6 +6,7 @@ import { AgentMessage } from './AgentMessage';
 import { AgentInput } from './AgentInput';
 import { LoadingSpinner } from '@/components/ui/LoadingSpinner';
 import { Card } from '@/components/ui/Card';
+import { readChatStream } from '@/lib/api/agent';
 import type { ChatRequest, ChatResponse, Action } from '@/types/api';
 
 export interface Message {
@@ -26,6 +27,7 @@ export interface AgentChatProps {
  * Features:
  * - Message history display
  * - Send messages to agent API
+ * - Stream agent responses as they are generated
  * - Display agent responses with actions
  * - Auto-scroll to latest message
  * - Loading states
@@ -75,6 +77,7 @@ export function AgentChat({ className }: AgentChatProps) {
         entity_id: entityId,
         entity_type: entityType,
         query: content,
+        stream: true,
       };
       
       // Call API
@@ -91,18 +94,69 @@ export function AgentChat({ className }: AgentChatProps) {
         throw new Error(errorData.error || errorData.message || `HTTP ${response.status}`);
       }
       
-      const data: ChatResponse = await response.json();
+      const assistantId = `assistant-${Date.now()}`;
+      const isStream = (response.headers.get('Content-Type') || '').includes('text/event-stream');
       
-      // Add assistant message
-      const assistantMessage: Message = {
-        id: `assistant-${Date.now()}`,
-        role: 'assistant',
-        content: data.response || 'No response received.',
-        actions: data.actions,
-        timestamp: new Date(),
+      if (!isStream || !response.body) {
+        const data: ChatResponse = await response.json();
+        
+        // Add assistant message
+        const assistantMessage: Message = {
+          id: assistantId,
+          role: 'assistant',
+          content: data.response || 'No response received.',
+          actions: data.actions,
+          timestamp: new Date(),
+        };
+        
+        setMessages((prev) => [...prev, assistantMessage]);
+        return;
+      }
+      
+      // Show the assistant message as soon as the first text arrives, then grow it
+      let started = false;
+      let pendingActions: Action[] | undefined;
+      const updateAssistant = (update: (message: Message) => Message) => {
+        setMessages((prev) => prev.map((m) => (m.id === assistantId ? update(m) : m)));
       };
       
-      setMessages((prev) => [...prev, assistantMessage]);
+      await readChatStream(response.body, {
+        onToken: (text) => {
+          if (!started) {
+            started = true;
+            setIsLoading(false);
+            setMessages((prev) => [
+              ...prev,
+              { id: assistantId, role: 'assistant', content: text, timestamp: new Date() },
+            ]);
+            return;
+          }
+          updateAssistant((m) => ({ ...m, content: m.content + text }));
+        },
+        onActions: (actions) => {
+          if (actions.length === 0) {
+            return;
+          }
+          if (started) {
+            updateAssistant((m) => ({ ...m, actions }));
+          } else {
+            pendingActions = actions;
+          }
+        },
+      });
+      
+      if (!started) {
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: assistantId,
+            role: 'assistant',
+            content: 'No response received.',
+            actions: pendingActions,
+            timestamp: new Date(),
+          },
+        ]);
+      }
     } catch (err) {
       const errorMessage = err instanceof Error ? err.message : 'Failed to send message';
       setError(errorMessage);
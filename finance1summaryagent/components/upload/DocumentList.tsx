@@ -10,6 +10,8 @@ export interface UploadedDocument {
   size: number;
   type: string;
   uploadedAt: Date;
+  chunksEmbedded?: number; // Chunks the backend had to embed
+  chunksReused?: number; // Chunks whose vectors were reused from identical text already uploaded
 }
 
 export interface DocumentListProps {
@@ -59,6 +61,7 @@ export function DocumentList({ documents, onRemove, className }: DocumentListPro
                   </p>
                   <p className="text-xs text-primary/60">
                     {formatFileSize(doc.size)} • {doc.uploadedAt.toLocaleDateString()}
+                    {doc.chunksReused ? ` • ${doc.chunksReused} of ${doc.chunksReused + (doc.chunksEmbedded ?? 0)} parts reused` : ''}
                   </p>
                 </div>
               </div>
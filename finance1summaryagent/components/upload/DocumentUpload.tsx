@@ -1,13 +1,38 @@
 'use client';
 
-import React, { useState, useRef } from 'react';
+import React, { useEffect, useState, useRef } from 'react';
 import { useRecordData } from '@/components/zoho/useRecordData';
 import { DocumentList, type UploadedDocument } from './DocumentList';
 import { Button } from '@/components/ui/Button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/Card';
 import { LoadingSpinner } from '@/components/ui/LoadingSpinner';
 import { cn } from '@/lib/utils/cn';
-import type { UploadResponse } from '@/types/api';
+import type { UploadJobStatus, UploadResponse } from '@/types/api';
+
+// Interval between upload job status polls
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Longest time to wait for an upload job to finish before reporting an error
+const JOB_MAX_WAIT_MS = 10 * 60 * 1000;
+
+// Resolves after ms, or rejects with an AbortError once the signal aborts
+function wait(ms: number, signal: AbortSignal): Promise<void> {
+  return new Promise((resolve, reject) => {
+    if (signal.aborted) {
+      reject(new DOMException('Aborted', 'AbortError'));
+      return;
+    }
+    const timer = setTimeout(resolve, ms);
+    signal.addEventListener(
+      'abort',
+      () => {
+        clearTimeout(timer);
+        reject(new DOMException('Aborted', 'AbortError'));
+      },
+      { once: true }
+    );
+  });
+}
 
 export interface DocumentUploadProps {
   className?: string;
@@ -23,7 +48,7 @@ export interface DocumentUploadProps {
  * Features:
  * - Drag and drop file upload
  * - File type and size validation
- * - Upload progress indication
+ * - Upload progress indication (polls the background ingestion job)
  * - List of uploaded documents
  * - Integration with FastAPI /upload endpoint
  */
@@ -48,7 +73,14 @@ export function DocumentUpload({
   const [isDragging, setIsDragging] = useState(false);
   const [isUploading, setIsUploading] = useState(false);
   const [uploadError, setUploadError] = useState<string | null>(null);
+  const [ingestProgress, setIngestProgress] = useState<number | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
+  // Aborts the upload request and job polling when the component unmounts
+  const abortRef = useRef<AbortController | null>(null);
+
+  useEffect(() => {
+    return () => abortRef.current?.abort();
+  }, []);
   
   const validateFile = (file: File): string | null => {
     // Check file size
@@ -64,6 +96,30 @@ export function DocumentUpload({
     return null;
   };
   
+  // Polls the backend ingestion job until the document is indexed, fails, or JOB_MAX_WAIT_MS passes
+  const waitForIngestion = async (jobId: string, signal: AbortSignal): Promise<UploadJobStatus> => {
+    setIngestProgress(0);
+    const deadline = Date.now() + JOB_MAX_WAIT_MS;
+    while (true) {
+      if (Date.now() >= deadline) {
+        throw new Error('Document processing is taking longer than expected. Please check again later.');
+      }
+      await wait(JOB_POLL_INTERVAL_MS, signal);
+      const response = await fetch(`/api/upload/${encodeURIComponent(jobId)}`, { signal });
+      if (!response.ok) {
+        throw new Error(`Could not check upload status (HTTP ${response.status})`);
+      }
+      const job: UploadJobStatus = await response.json();
+      setIngestProgress(job.progress);
+      if (job.status === 'succeeded') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Document processing failed');
+      }
+    }
+  };
+  
   const uploadFile = async (file: File) => {
     if (!entityId || !entityType) {
       const error = 'No record loaded. Please wait for a record to be selected.';
@@ -79,6 +135,10 @@ export function DocumentUpload({
       return;
     }
     
+    abortRef.current?.abort();
+    const controller = new AbortController();
+    abortRef.current = controller;
+    
     setIsUploading(true);
     setUploadError(null);
     
@@ -92,6 +152,7 @@ export function DocumentUpload({
       const response = await fetch('/api/upload', {
         method: 'POST',
         body: formData,
+        signal: controller.signal,
       });
       
       if (!response.ok) {
@@ -111,6 +172,8 @@ export function DocumentUpload({
         throw new Error(data.message || 'Upload failed');
       }
       
+      const job = data.job_id ? await waitForIngestion(data.job_id, controller.signal) : null;
+      
       // Create document entry
       const document: UploadedDocument = {
         id: `doc-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`,
@@ -118,16 +181,26 @@ export function DocumentUpload({
         size: file.size,
         type: file.type,
         uploadedAt: new Date(),
+        chunksEmbedded: job?.chunks_embedded,
+        chunksReused: job?.chunks_reused ?? undefined,
       };
       
       setDocuments((prev) => [...prev, document]);
       onUploadSuccess?.(document);
     } catch (err) {
+      if (controller.signal.aborted) {
+        // Unmounted (or replaced by a newer upload); nothing left to update
+        return;
+      }
       const errorMessage = err instanceof Error ? err.message : 'Failed to upload file';
       setUploadError(errorMessage);
       onUploadError?.(errorMessage);
     } finally {
-      setIsUploading(false);
+      if (abortRef.current === controller) {
+        abortRef.current = null;
+        setIsUploading(false);
+        setIngestProgress(null);
+      }
     }
   };
   
@@ -217,7 +290,11 @@ export function DocumentUpload({
             {isUploading ? (
               <div className="flex flex-col items-center gap-3">
                 <LoadingSpinner size="md" />
-                <p className="text-sm text-primary/60">Uploading...</p>
+                <p className="text-sm text-primary/60">
+                  {ingestProgress === null
+                    ? 'Uploading...'
+                    : `Processing... ${Math.round(ingestProgress * 100)}%`}
+                </p>
               </div>
             ) : (
               <>
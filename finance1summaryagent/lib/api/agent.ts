@@ -5,7 +5,7 @@
  * All requests go through Next.js API routes which proxy to the FastAPI backend.
  */
 
-import type { ChatRequest, ChatResponse, ScanRequest, ScanResponse } from '@/types/api';
+import type { Action, ChatRequest, ChatResponse, ScanRequest, ScanResponse } from '@/types/api';
 
 /**
  * Base URL for Next.js API routes
@@ -132,3 +132,72 @@ export async function scan(request: ScanRequest): Promise<ScanResponse> {
     body: JSON.stringify(request),
   });
 }
+
+/**
+ * Handlers for events from the streaming chat endpoint
+ */
+export interface ChatStreamHandlers {
+  /** Called with each piece of answer text as it is generated */
+  onToken: (text: string) => void;
+  /** Called once with the actions parsed after generation completes */
+  onActions?: (actions: Action[]) => void;
+}
+
+/**
+ * Read a Server-Sent Events chat stream until it completes
+ * 
+ * @param body - Response body from /api/agent/chat with stream: true
+ * @param handlers - Callbacks for token and actions events
+ * @throws {Error} If the stream reports an error event
+ */
+export async function readChatStream(
+  body: ReadableStream<Uint8Array>,
+  handlers: ChatStreamHandlers
+): Promise<void> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  
+  const dispatch = (rawEvent: string) => {
+    let event = 'message';
+    const dataLines: string[] = [];
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        dataLines.push(line.slice(5).trimStart());
+      }
+    }
+    if (dataLines.length === 0) {
+      return;
+    }
+    
+    const data = JSON.parse(dataLines.join('\n'));
+    if (event === 'token') {
+      handlers.onToken(data.text);
+    } else if (event === 'actions') {
+      handlers.onActions?.(data.actions || []);
+    } else if (event === 'error') {
+      throw new Error(data.detail || 'Streaming response failed');
+    }
+  };
+  
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+    
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary >= 0) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+}
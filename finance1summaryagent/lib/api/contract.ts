@@ -16,6 +16,7 @@ import type {
   ScanResponse,
   UploadRequest,
   UploadResponse,
+  UploadJobStatus,
   ZohoExecuteRequest,
   ZohoExecuteResponse,
   ZohoMetadataResponse,
@@ -33,8 +34,10 @@ export const API_BASE_PATH = `/api/${API_VERSION}` as const;
  */
 export const BACKEND_ENDPOINTS = {
   CHAT: '/chat',
+  CHAT_STREAM: '/chat/stream',
   SCAN: '/scan',
   UPLOAD: '/upload',
+  UPLOAD_STATUS: '/upload/{job_id}',
 } as const;
 
 /**
@@ -45,6 +48,7 @@ export const API_ROUTES = {
   AGENT_CHAT: '/api/agent/chat',
   AGENT_SCAN: '/api/agent/scan',
   UPLOAD: '/api/upload',
+  UPLOAD_STATUS: '/api/upload/[jobId]',
   ZOHO_METADATA: '/api/zoho/metadata',
   ZOHO_EXECUTE: '/api/zoho/execute',
 } as const;
@@ -96,6 +100,9 @@ export const AGENT_CHAT_ENDPOINT: EndpointDefinition<ChatRequest, ChatResponse>
     - At least one of entity_id or account_id must be provided
     - The backend currently expects account_id, but we send both for compatibility
     - Response may include optional actions array for actionable UI
+    - With stream: true the route proxies the backend /chat/stream endpoint and returns
+      Server-Sent Events unbuffered: "token" events ({ text }) as the answer is generated,
+      then one "actions" event ({ actions }), then "done" (or "error" with { detail })
   `,
 };
 
@@ -135,8 +142,28 @@ export const UPLOAD_ENDPOINT: EndpointDefinition<UploadRequest, UploadResponse>
   responseType: 'UploadResponse',
   notes: `
     - Accepts multipart/form-data with file and entity information
-    - File is processed and added to the vector store
-    - Document becomes available for future agent queries
+    - Responds 202 with a job_id once the file is accepted; extraction, chunking and
+      embedding run on backend workers
+    - Document becomes available for future agent queries when the job succeeds
+  `,
+};
+
+/**
+ * Upload Job Status Endpoint
+ * 
+ * Reports progress of a background document ingestion job.
+ */
+export const UPLOAD_STATUS_ENDPOINT: EndpointDefinition<{ jobId: string }, UploadJobStatus> = {
+  method: 'GET',
+  path: API_ROUTES.UPLOAD_STATUS,
+  backendPath: BACKEND_ENDPOINTS.UPLOAD_STATUS,
+  description: 'Get progress and chunk counts of a document upload job',
+  requestType: '{ jobId: string }',
+  responseType: 'UploadJobStatus',
+  notes: `
+    - status is queued, running, succeeded or failed; error is set when failed
+    - progress (0-1) covers extraction, then embedding of new chunks
+    - Returns 404 for unknown job IDs
   `,
 };
 
@@ -193,6 +220,7 @@ export const ALL_ENDPOINTS = {
   AGENT_CHAT: AGENT_CHAT_ENDPOINT,
   AGENT_SCAN: AGENT_SCAN_ENDPOINT,
   UPLOAD: UPLOAD_ENDPOINT,
+  UPLOAD_STATUS: UPLOAD_STATUS_ENDPOINT,
   ZOHO_METADATA: ZOHO_METADATA_ENDPOINT,
   ZOHO_EXECUTE: ZOHO_EXECUTE_ENDPOINT,
 } as const;
@@ -249,6 +277,66 @@ export const API_CHANGELOG = [
         endpoint: 'ZOHO_EXECUTE',
         description: 'Added /api/zoho/execute endpoint for executing Zoho SDK actions',
       },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'AGENT_CHAT',
+        description: 'Added stream option that returns the answer as Server-Sent Events',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'AGENT_CHAT',
+        description: 'Added optional cached flag to chat response (answer reused for unchanged record context)',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'AGENT_SCAN',
+        description: 'Added optional cached flag to scan response (recommendations reused for unchanged record)',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'AGENT_SCAN',
+        description: 'Returns 503 with empty recommendations when the backend sheds the scan under Gemini load',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD',
+        description: 'Upload responds 202 with a job_id; ingestion runs in the background',
+      },
+      {
+        type: 'added' as const,
+        endpoint: 'UPLOAD_STATUS',
+        description: 'Added /api/upload/[jobId] endpoint for polling document ingestion progress',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD',
+        description: 'Returns 413 when the file exceeds the backend upload size limit',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD',
+        description: 'Added optional content_hash and duplicate flag (same content uploaded before) to upload response',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD_STATUS',
+        description: 'Added content_hash and chunks_reused (chunks whose vectors were reused) to job status',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD',
+        description: 'Oversized requests get 413 from their Content-Length before the body is read; requests without Content-Length get 411',
+      },
+      {
+        type: 'changed' as const,
+        endpoint: 'UPLOAD',
+        description: 'Removed the duplicate flag from the upload response; it is reported by the job status once ingestion succeeds',
+      },
+      {
+        type: 'enhanced' as const,
+        endpoint: 'UPLOAD_STATUS',
+        description: 'Added duplicate (content copied from a document uploaded before) to job status, null until the job succeeds',
+      },
     ],
   },
 ] as const;
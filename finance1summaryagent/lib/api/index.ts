@@ -62,6 +62,7 @@ export {
   ScanResponseSchema,
   UploadRequestMetadataSchema,
   UploadResponseSchema,
+  UploadJobStatusSchema,
   ZohoExecuteRequestSchema,
   ZohoExecuteResponseSchema,
   ZohoMetadataResponseSchema,
@@ -77,6 +78,7 @@ export {
   type ScanResponse,
   type UploadRequestMetadata,
   type UploadResponse,
+  type UploadJobStatus,
   type ZohoExecuteRequest,
   type ZohoExecuteResponse,
   type ZohoFieldMetadata,
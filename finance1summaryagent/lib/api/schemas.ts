@@ -50,6 +50,7 @@ export const ChatRequestSchema = z.object({
   account_id: z.string().optional(), // Legacy support
   entity_type: z.string().optional(),
   query: z.string().min(1, 'Query is required'),
+  stream: z.boolean().optional(),
 }).refine(
   (data) => data.entity_id || data.account_id,
   {
@@ -66,6 +67,7 @@ export const ChatRequestSchema = z.object({
 export const ChatResponseSchema = z.object({
   response: z.string(),
   actions: z.array(ActionSchema).optional(),
+  cached: z.boolean().optional(),
 });
 
 /**
@@ -115,6 +117,7 @@ export const RecommendationSchema = z.object({
  */
 export const ScanResponseSchema = z.object({
   recommendations: z.array(RecommendationSchema),
+  cached: z.boolean().optional(),
 });
 
 /**
@@ -137,6 +140,35 @@ export const UploadRequestMetadataSchema = z.object({
 export const UploadResponseSchema = z.object({
   success: z.boolean(),
   message: z.string(),
+  job_id: z.string().optional(),
+  status: z.enum(['queued', 'running', 'succeeded', 'failed']).optional(),
+  content_hash: z.string().optional(),
+});
+
+/**
+ * Upload Job Status Schema
+ * 
+ * Validates background ingestion progress from GET /upload/{job_id}
+ */
+export const UploadJobStatusSchema = z.object({
+  job_id: z.string(),
+  status: z.enum(['queued', 'running', 'succeeded', 'failed']),
+  stage: z.enum(['extracting', 'embedding']).nullable(),
+  progress: z.number().min(0).max(1),
+  entity_id: z.string(),
+  entity_type: z.string(),
+  filename: z.string(),
+  size_bytes: z.number(),
+  content_hash: z.string().nullable(),
+  chunks_total: z.number().nullable(),
+  chunks_embedded: z.number(),
+  chunks_reused: z.number().nullable(),
+  chunks_unchanged: z.number().nullable(),
+  duplicate: z.boolean().nullable().optional(),
+  error: z.string().nullable(),
+  created_at: z.string(),
+  started_at: z.string().nullable(),
+  finished_at: z.string().nullable(),
 });
 
 /**
@@ -276,6 +308,7 @@ export type Recommendation = z.infer<typeof RecommendationSchema>;
 export type ScanResponse = z.infer<typeof ScanResponseSchema>;
 export type UploadRequestMetadata = z.infer<typeof UploadRequestMetadataSchema>;
 export type UploadResponse = z.infer<typeof UploadResponseSchema>;
+export type UploadJobStatus = z.infer<typeof UploadJobStatusSchema>;
 export type ZohoExecuteRequest = z.infer<typeof ZohoExecuteRequestSchema>;
 export type ZohoExecuteResponse = z.infer<typeof ZohoExecuteResponseSchema>;
 export type ZohoFieldMetadata = z.infer<typeof ZohoFieldMetadataSchema>;
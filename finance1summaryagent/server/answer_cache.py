@@ -0,0 +1,38 @@
+"""
+Cache of generated /chat and /scan answers.
+Answers are keyed by endpoint, entity ID, a hash of the exact context sent to
+Gemini and the normalized query. Any CRM change alters the rendered context,
+so its hash changes and older answers are simply never looked up again.
+"""
+import hashlib
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from ttl_cache import TTLCache
+
+# Generated answers, evicted least recently used first once the cache is full
+answer_cache = TTLCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases the query and collapses punctuation and whitespace, so trivial rewordings share an entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def answer_cache_key(endpoint: str, entity_id: str, context: str, query: str = "") -> Tuple[str, str, str, str]:
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    return endpoint, entity_id, context_hash, normalize_query(query)
+
+
+def get_cached_answer(key: Tuple[str, str, str, str]) -> Optional[Dict[str, Any]]:
+    """Returns a copy of the cached answer payload, or None."""
+    entry = answer_cache.get(key)
+    return dict(entry.value) if entry is not None else None
+
+
+def store_answer(key: Tuple[str, str, str, str], payload: Dict[str, Any]) -> None:
+    answer_cache.set(key, payload)
@@ -0,0 +1,109 @@
+"""
+Compares serial PDF text extraction (PyPDF2 in the calling thread) with the
+process pool in pdf_extraction on synthetic statement-like PDFs, and checks
+that both produce the same text. Pool start-up is excluded: each pool is
+warmed on the document once before it is timed.
+
+Run from the server directory:
+    python benchmarks/pdf_extraction_benchmark.py [--pages 100 400] [--workers 1 2 4]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_extraction  # noqa: E402
+from document_processor import iter_text_blocks  # noqa: E402
+
+WORDS = [
+    "statement", "balance", "interest", "premium", "policy", "renewal", "account",
+    "deposit", "withdrawal", "fee", "dividend", "contribution", "insured", "benefit",
+]
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 45, seed: int = 3) -> bytes:
+    """Builds an uncompressed PDF with `pages` pages of Helvetica text lines."""
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+        stream = "\n".join(["BT /F1 9 Tf 40 800 Td 11 TL"] + [f"({line}) '" for line in lines] + ["ET"]).encode()
+        contents = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, contents)
+        ))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids),
+    )
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def _extract(source) -> str:
+    return "".join(text for text, _ in iter_text_blocks(source, "statement.pdf"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 400], help="Pages per synthetic PDF")
+    default_workers = sorted({1, 2, min(4, os.cpu_count() or 1), os.cpu_count() or 1})
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers, help="Pool sizes to time")
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}, pages per shard: {pdf_extraction.PDF_PAGES_PER_SHARD}\n")
+    print(f"{'pages':>6} {'MB':>6} {'engine':>10} {'seconds':>9} {'pages/s':>9} {'speedup':>8} {'same text':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in args.pages:
+            data = synthetic_pdf(pages)
+            path = os.path.join(directory, f"statement-{pages}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+
+            # In-memory files take the serial path
+            start = time.perf_counter()
+            expected = _extract(io.BytesIO(data))
+            serial = time.perf_counter() - start
+            size = f"{len(data) / 1e6:.1f}"
+            print(f"{pages:>6} {size:>6} {'serial':>10} {serial:>9.2f} {pages / serial:>9.1f} {'1.00x':>8} {'-':>10}")
+
+            for workers in args.workers:
+                pdf_extraction.PDF_EXTRACT_WORKERS = workers
+                pdf_extraction.shutdown_pdf_pool()
+                _extract(path)
+                start = time.perf_counter()
+                text = _extract(path)
+                elapsed = time.perf_counter() - start
+                engine = f"pool x{workers}"
+                speedup = f"{serial / elapsed:.2f}x"
+                print(f"{pages:>6} {size:>6} {engine:>10} {elapsed:>9.2f} {pages / elapsed:>9.1f} {speedup:>8} {str(text == expected):>10}")
+            pdf_extraction.shutdown_pdf_pool()
+    print("\nSpeedup is bounded by the number of cores; a single worker shows the pool's IPC overhead.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compares prompt size and render time of the "list" and "table" related-list
+formats in crm_record_to_text on synthetic Zoho-shaped accounts. "cold" renders
+every section from scratch; "warm" re-renders the same account with one related
+list changed, so the other sections come from the render cache.
+
+Run from the server directory:
+    python benchmarks/render_benchmark.py [--rows 50] [--runs 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_to_text import crm_record_to_text, render_cache  # noqa: E402
+from context_builder import estimate_tokens  # noqa: E402
+
+STAGES = ["Qualification", "Needs Analysis", "Proposal", "Negotiation", "Closed Won", "Closed Lost"]
+POLICY_TYPES = ["Life", "Income Protection", "TPD", "Trauma", "Home & Contents"]
+INSURERS = ["AIA", "TAL", "Zurich", "MLC Life", "OnePath"]
+NOTE_TOPICS = [
+    "cash flow and upcoming policy renewals", "rebalancing the portfolio", "the estate plan",
+    "super contributions before year end", "refinancing the mortgage",
+]
+
+
+def _lookup(rng: random.Random, name: str) -> dict:
+    return {"name": name, "id": str(rng.randint(10**17, 10**18))}
+
+
+def _common(rng: random.Random, i: int) -> dict:
+    return {
+        "id": str(4_000_000_000_000_000 + i),
+        "Owner": _lookup(rng, "Jane Adviser"),
+        "Created_Time": "2024-02-01T10:00:00+10:00",
+        "Modified_Time": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T09:30:00+10:00",
+        "Tag": [],
+        "$approval_state": "approved",
+    }
+
+
+def synthetic_account(rows: int, seed: int = 7) -> dict:
+    """Builds an account with `rows` Deals, Insurance policies, Contacts and Notes."""
+    rng = random.Random(seed)
+    account = {
+        "id": "4000000000000000001",
+        "Account_Name": "Example Household",
+        "Phone": "+61 2 9000 0000",
+        "Owner": _lookup(rng, "Jane Adviser"),
+        "Total_Asset_Value": 2_450_000,
+        "Client_Since": "2016-05-12",
+    }
+    account["Related_Deals"] = [
+        {
+            **_common(rng, i),
+            "Deal_Name": f"Portfolio review {i}",
+            "Stage": rng.choice(STAGES),
+            "Amount": rng.randint(5, 500) * 1000,
+            "Closing_Date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Probability": rng.choice([10, 25, 50, 75, 90]),
+            "Contact_Name": _lookup(rng, "Alex Example"),
+            "Lead_Source": rng.choice(["Referral", "Website", None]),
+            "Description": None,
+            "Type": "Existing Business",
+        }
+        for i in range(rows)
+    ]
+    account["Related_Insurance_Policies_New"] = [
+        {
+            **_common(rng, 1000 + i),
+            "Name": f"POL-{100000 + i}",
+            "Policy_Type": rng.choice(POLICY_TYPES),
+            "Insurer": rng.choice(INSURERS),
+            "Sum_Insured": rng.randint(1, 40) * 50_000,
+            "Premium": round(rng.uniform(300, 6000), 2),
+            "Renewal_Date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Policy_Holder": _lookup(rng, "Alex Example"),
+            "Status": rng.choice(["In Force", "Lapsed", "Pending"]),
+            "Notes": None,
+        }
+        for i in range(rows)
+    ]
+    account["Related_Contacts"] = [
+        {
+            **_common(rng, 2000 + i),
+            "First_Name": f"Person{i}",
+            "Last_Name": "Example",
+            "Email": f"person{i}@example.com",
+            "Mobile": f"+61 400 {rng.randint(100000, 999999)}",
+            "Title": None,
+            "Mailing_City": "Sydney",
+        }
+        for i in range(min(rows, 10))
+    ]
+    account["Related_Notes"] = [
+        {
+            **_common(rng, 3000 + i),
+            "Note_Title": f"Review meeting {i}",
+            "Note_Content": f"Discussed {rng.choice(NOTE_TOPICS)} and agreed to follow up by {rng.randint(1, 28)} March.",
+            "Parent_Id": _lookup(rng, "Example Household"),
+        }
+        for i in range(rows)
+    ]
+    return account
+
+
+def _time_render(record: dict, related_format: str, runs: int, warm: bool) -> float:
+    elapsed = 0.0
+    for run in range(runs):
+        if warm:
+            # Touch one Note so exactly one section changes between renders
+            record["Related_Notes"][0]["Note_Title"] = f"Review meeting {run}"
+        else:
+            render_cache.clear()
+        start = time.perf_counter()
+        crm_record_to_text(record, related_format=related_format)
+        elapsed += time.perf_counter() - start
+    return elapsed / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 50, 200], help="Rows per related list")
+    parser.add_argument("--runs", type=int, default=100, help="Renders per timing")
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'format':>6} {'chars':>9} {'tokens':>8} {'cold ms':>9} {'warm ms':>9} {'saving':>8}")
+    for rows in args.rows:
+        record = synthetic_account(rows)
+        baseline = None
+        for related_format in ("list", "table"):
+            text = crm_record_to_text(record, related_format=related_format)
+            tokens = estimate_tokens(text)
+            cold = _time_render(record, related_format, args.runs, warm=False)
+            warm = _time_render(record, related_format, args.runs, warm=True)
+            saving = "" if baseline is None else f"{(1 - tokens / baseline) * 100:.0f}%"
+            baseline = baseline or tokens
+            print(f"{rows:>6} {related_format:>6} {len(text):>9} {tokens:>8} {cold:>9.2f} {warm:>9.2f} {saving:>8}")
+    print("\nlist shows the first 4 non-empty scalar fields per record; table shows up to "
+          "RELATED_TABLE_MAX_COLUMNS columns including lookup names, so it carries more data per row;\n"
+          "columns with one value on every row (owner, parent account) are stated once per table.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Builds the record context sent to the LLM.
+Small records are passed through as-is; only records that exceed the token
+budget are chunked (per field group, subform and related record), embedded and
+searched for the parts relevant to the query. Sections (main fields, each
+subform, each related module) are then packed into the budget in order of
+relevance, with the most recent Notes kept first.
+"""
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from document_processor import chunk_text
+from vectorstore_runtime import create_vectorstore
+from entity_index import entity_indexes
+
+# Records estimated at or under this many tokens skip embedding entirely;
+# larger ones are packed into this many tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+
+# Chunk size (characters) used when a record has to be split for retrieval
+CONTEXT_CHUNK_SIZE = int(os.getenv("CONTEXT_CHUNK_SIZE", "1000"))
+
+# Rough characters-per-token ratio for English CRM text
+CHARS_PER_TOKEN = 4
+
+_mode_counts: Counter = Counter()
+_mode_lock = threading.Lock()
+
+
+@dataclass
+class ContextSelection:
+    text: str
+    mode: str  # "passthrough" or "retrieval"
+    tokens_used: int
+    tokens_dropped: int = 0
+    sections_included: int = 0
+    sections_truncated: int = 0
+    sections_dropped: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, good enough for budgeting prompts."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _record_selection(selection: ContextSelection) -> None:
+    with _mode_lock:
+        _mode_counts[selection.mode] += 1
+        _mode_counts["tokens_used"] += selection.tokens_used
+        _mode_counts["tokens_dropped"] += selection.tokens_dropped
+
+
+def _chunks_from_text(text: str, entity_id: str) -> List[Dict[str, Any]]:
+    """Splits plain text into chunks shaped like crm_record_to_chunks output."""
+    pieces = chunk_text(text, chunk_size=CONTEXT_CHUNK_SIZE, chunk_overlap=CONTEXT_CHUNK_SIZE // 10)
+    return [
+        {"text": piece, "metadata": {"section": "text", "record_id": entity_id, "chunk_index": i}}
+        for i, piece in enumerate(pieces)
+    ]
+
+
+def _section_key(metadata: Dict[str, Any]) -> str:
+    section = metadata.get("section")
+    if section == "fields":
+        return "fields"
+    if section in ("subform", "related"):
+        return f"{section}:{metadata.get('module')}"
+    # Plain text chunks are sections of their own
+    return f"{section}:{metadata.get('chunk_index')}"
+
+
+def _retrieve_chunks(
+    chunks: List[Dict[str, Any]],
+    query: str,
+    entity_id: str,
+    budget: int,
+    related_modules: Set[str],
+) -> Tuple[List[Dict[str, Any]], ContextSelection]:
+    """
+    Packs whole sections into the token budget, most relevant first.
+
+    Main fields always come first. The remaining sections are ordered by their
+    best matching chunk. Within a section, Notes are taken newest first and
+    other records by similarity; a section that does not fit is truncated
+    rather than skipped.
+    """
+    candidates = [c for c in chunks if c["metadata"].get("section") != "fields"]
+    ranked = _rank_candidates(candidates, query, entity_id, related_modules) if candidates else []
+    rank = {c["metadata"].get("chunk_index"): pos for pos, c in enumerate(ranked)}
+
+    def chunk_rank(chunk: Dict[str, Any]) -> int:
+        return rank.get(chunk["metadata"].get("chunk_index"), len(rank))
+
+    sections: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        sections.setdefault(_section_key(chunk["metadata"]), []).append(chunk)
+
+    for key, section_chunks in sections.items():
+        if key == "related:Notes":
+            # Zoho Modified_Time is ISO 8601, so string order is time order
+            section_chunks.sort(key=lambda c: c["metadata"].get("modified_time") or "", reverse=True)
+        elif key != "fields":
+            section_chunks.sort(key=chunk_rank)
+
+    ordered = sorted(
+        sections.items(),
+        key=lambda item: -1 if item[0] == "fields" else min(chunk_rank(c) for c in item[1])
+    )
+
+    selected = []
+    selection = ContextSelection(text="", mode="retrieval", tokens_used=0)
+    for _, section_chunks in ordered:
+        taken = 0
+        for chunk in section_chunks:
+            tokens = estimate_tokens(chunk["text"])
+            # The first chunk is always kept so the context is never empty
+            if selected and selection.tokens_used + tokens > budget:
+                selection.tokens_dropped += tokens
+                continue
+            selected.append(chunk)
+            selection.tokens_used += tokens
+            taken += 1
+        if taken == len(section_chunks):
+            selection.sections_included += 1
+        elif taken:
+            selection.sections_truncated += 1
+        else:
+            selection.sections_dropped += 1
+
+    # Keep the record's reading order rather than relevance order
+    selected.sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+    return selected, selection
+
+
+def _rank_candidates(
+    candidates: List[Dict[str, Any]],
+    query: str,
+    entity_id: str,
+    related_modules: Set[str],
+) -> List[Dict[str, Any]]:
+    """
+    Orders candidate chunks by similarity to the query.
+
+    Record chunks (with a chunk_key) go through the entity's persistent index,
+    so only new or changed chunks are embedded. Chunks of subforms and of the
+    fetched related modules that are gone from the record are deleted; related
+    modules that were not fetched this time are left alone. Plain text chunks
+    use a throwaway index.
+    """
+    if all("chunk_key" in c["metadata"] for c in candidates):
+        current = {c["metadata"]["chunk_key"]: c for c in candidates}
+        with entity_indexes.pinned(entity_id) as index:
+            with index.lock:
+                subforms = {entry["module"] for key, entry in index.manifest.items() if key.startswith("subform:")}
+            scope = subforms | related_modules | {c["metadata"].get("module") for c in candidates}
+            changes = index.sync(candidates, scope=scope)
+            print(f"Entity index {entity_id}: {changes}")
+            matches = index.search(query, allowed_keys=set(current))
+        entity_indexes.evict_to_budget()
+        # Return the current chunks so text and chunk_index reflect this request
+        return [current[m["metadata"]["chunk_key"]] for m in matches]
+
+    vs = create_vectorstore(
+        [c["text"] for c in candidates],
+        [{**c["metadata"], "entity_id": entity_id} for c in candidates]
+    )
+    docs = vs.similarity_search(query, k=len(candidates))
+    return [{"text": d.page_content, "metadata": d.metadata} for d in docs]
+
+
+def select_context(
+    text: str,
+    query: str,
+    entity_id: str,
+    chunks: Optional[List[Dict[str, Any]]] = None,
+    budget: Optional[int] = None,
+    related_modules: Optional[Set[str]] = None,
+) -> ContextSelection:
+    """
+    Picks the record context for a query.
+
+    Args:
+        text: Rendered record text
+        query: User question (or scan goal) used to rank sections
+        entity_id: Record ID stored in chunk metadata
+        chunks: Optional section chunks from crm_record_to_chunks. Used for
+            retrieval when the record is too large; otherwise the text is split
+            by size.
+        budget: Token budget, defaults to CONTEXT_TOKEN_BUDGET
+        related_modules: Related modules fetched with the record, empty ones
+            included. Indexed chunks of these modules (and of subforms, which
+            come with the record itself) that are not in `chunks` are deleted
+            from the entity's index.
+
+    Returns:
+        ContextSelection with the context text, the mode ("passthrough" when
+        the whole record fits the budget, "retrieval" when sections were
+        ranked and packed) and the tokens used and dropped.
+    """
+    if budget is None:
+        budget = CONTEXT_TOKEN_BUDGET
+
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        selection = ContextSelection(text=text, mode="passthrough", tokens_used=tokens)
+        _record_selection(selection)
+        return selection
+
+    if not chunks:
+        chunks = _chunks_from_text(text, entity_id)
+
+    selected, selection = _retrieve_chunks(chunks, query, entity_id, budget, related_modules or set())
+    selection.text = "\n\n".join(c["text"] for c in selected)
+    _record_selection(selection)
+    return selection
+
+
+def retrieval_stats() -> Dict[str, int]:
+    """Returns how many requests took each context path, and total tokens used and dropped."""
+    with _mode_lock:
+        return dict(_mode_counts)
@@ -0,0 +1,37 @@
+"""
+Dedicated executor for CPU-bound work (record rendering, embedding, FAISS search).
+Async handlers hand this work off here so it never blocks the event loop and
+does not compete with Starlette's default thread pool.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+# Worker threads for CPU-bound work; embedding and FAISS release the GIL for most of their runtime
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Returns the shared CPU executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, CPU_EXECUTOR_WORKERS), thread_name_prefix="cpu")
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs func(*args, **kwargs) on the CPU executor and awaits the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_cpu_executor() -> None:
+    """Stops the executor; queued work is cancelled."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
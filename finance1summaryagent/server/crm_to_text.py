@@ -1,7 +1,29 @@
 """
 Converts Zoho CRM record data to formatted text for LLM consumption.
+
+Field layouts (order, display names, skipped fields) are compiled once per
+payload shape, and each rendered section (main fields, each related module) is
+memoized by a hash of its content, so a request only re-renders the sections
+whose data changed.
 """
-from typing import Dict, Any
+import hashlib
+import os
+import pickle
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from ttl_cache import TTLCache
+
+# Lowercased field names record_to_text leaves out
+RECORD_SKIP_FIELDS = frozenset(["id", "created_time", "modified_time", "created_by", "modified_by"])
+
+
+@lru_cache(maxsize=4096)
+def _record_field_label(key: str) -> Optional[str]:
+    """Display name for a record_to_text field, or None if it is skipped."""
+    if key.lower() in RECORD_SKIP_FIELDS:
+        return None
+    return key.replace("_", " ").title()
 
 
 def record_to_text(record_data: Dict[str, Any], entity_type: str = "Record") -> str:
@@ -28,13 +50,11 @@ def record_to_text(record_data: Dict[str, Any], entity_type: str = "Record") ->
     
     # Format all fields
     for key, value in record_data.items():
-        # Skip internal fields
-        if key.lower() in ["id", "created_time", "modified_time", "created_by", "modified_by"]:
+        # Skip internal fields; field names are formatted once and cached
+        field_name = _record_field_label(key)
+        if field_name is None:
             continue
         
-        # Format the field name (replace underscores, capitalize)
-        field_name = key.replace("_", " ").title()
-        
         # Format the value
         if value is None:
             formatted_value = "Not set"
@@ -54,3 +74,335 @@ def record_to_text(record_data: Dict[str, Any], entity_type: str = "Record") ->
         lines.append(f"{field_name}: {formatted_value}")
     
     return "\n".join(lines)
+
+
+# Fields that confuse the AI and are never rendered from the main record
+MAIN_SKIP_FIELDS = ["id", "Created_Time", "Modified_Time", "Created_By", "Modified_By", "Tag", "$state", "$process_flow"]
+
+# Fields left out of related record details
+RELATED_SKIP_FIELDS = ["id", "Owner", "Created_Time", "Modified_Time", "Tag"]
+
+# Main fields are chunked in groups of this many lines
+MAIN_FIELDS_PER_CHUNK = 20
+
+# How related lists are rendered: "table" (header row + value rows) or "list" (one item per line pair)
+CRM_RELATED_FORMAT = os.getenv("CRM_RELATED_FORMAT", "table")
+
+# Fields tried, in order, for a related record's display name
+RELATED_NAME_FIELDS = ["Name", "Account_Name", "Last_Name", "Subject", "Title"]
+
+# Most populated columns kept per related table (besides the name)
+RELATED_TABLE_MAX_COLUMNS = 8
+
+_MAIN_SKIP = frozenset(MAIN_SKIP_FIELDS)
+_RELATED_SKIP = frozenset(RELATED_SKIP_FIELDS)
+_RELATED_NAME = frozenset(RELATED_NAME_FIELDS)
+_SUBFORM_SKIP = frozenset(["id", "s_id"])
+
+# Rendered sections keyed by (section, module, format, content hash)
+render_cache = TTLCache(max_entries=int(os.getenv("RENDER_CACHE_SIZE", "2048")), ttl=float("inf"))
+
+
+@lru_cache(maxsize=256)
+def _main_layout(keys: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    """(field, display name) for each renderable main field, in payload order. Compiled once per payload shape."""
+    return tuple(
+        # e.g. "Total_Asset_Value" -> "Total Asset Value"
+        (key, key.replace("_", " "))
+        for key in keys
+        if key not in _MAIN_SKIP and not key.startswith("Related_")
+    )
+
+
+@lru_cache(maxsize=1024)
+def _related_layout(keys: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Compiled once per related record shape: (detail fields for the list format,
+    candidate columns for the table format, name fields present in preference order).
+    """
+    details = tuple(key for key in keys if key not in _RELATED_SKIP)
+    columns = tuple(key for key in details if key not in _RELATED_NAME and not key.startswith("$"))
+    names = tuple(key for key in RELATED_NAME_FIELDS if key in keys)
+    return details, columns, names
+
+
+def _content_hash(value: Any) -> str:
+    # Pickle keeps key order (which decides field order in the output) and is several
+    # times faster than json.dumps; equal bytes always mean equal content
+    return hashlib.blake2b(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+
+def _memoized(section: Tuple[str, ...], value: Any, render: Callable[[Any], List[str]]) -> Tuple[str, ...]:
+    """Returns the rendered lines for a section, rendering only if this content was not seen before."""
+    key = section + (_content_hash(value),)
+    entry = render_cache.get(key)
+    if entry is not None:
+        return entry.value
+    lines = tuple(render(value))
+    render_cache.set(key, lines)
+    return lines
+
+
+def render_cache_stats() -> Dict[str, Any]:
+    stats = render_cache.stats()
+    # Entries never expire; inf is not valid JSON
+    stats["ttl_seconds"] = None
+    return stats
+
+
+def _render_subform(key: str, value: List[Dict[str, Any]]) -> List[str]:
+    lines = [f"\n--- {key} (Subform) ---"]
+    for item in value:
+        # Summarize the subform row
+        row_details = []
+        for k, v in item.items():
+            if v and k not in _SUBFORM_SKIP:
+                # Handle Lookups (e.g. {"name": "John", "id": "..."})
+                if isinstance(v, dict) and "name" in v:
+                    v = v["name"]
+                row_details.append(f"{k}: {v}")
+        lines.append("  • " + ", ".join(row_details))
+    return lines
+
+
+def _render_main_field(label: str, value: Any) -> Optional[str]:
+    if not value:
+        return None
+    # If it's a lookup (like Owner), just get the name
+    if isinstance(value, dict) and "name" in value:
+        value = value["name"]
+    return f"{label}: {value}"
+
+
+def _split_main_record(record: Dict[str, Any]) -> Tuple[List[str], List[Tuple[str, List[str]]]]:
+    """Returns (main field lines, [(subform key, subform lines)]) in record order."""
+    field_lines = []
+    subforms = []
+    for key, label in _main_layout(tuple(record)):
+        value = record[key]
+        if isinstance(value, list) and value:
+            subforms.append((key, _render_subform(key, value)))
+            continue
+        line = _render_main_field(label, value)
+        if line:
+            field_lines.append(line)
+    return field_lines, subforms
+
+
+def _render_main_lines(record: Dict[str, Any]) -> List[str]:
+    # Subforms are rendered where they appear among the main fields
+    lines = []
+    for key, label in _main_layout(tuple(record)):
+        value = record[key]
+        if isinstance(value, list) and value:
+            lines.extend(_render_subform(key, value))
+            continue
+        line = _render_main_field(label, value)
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _related_item_name(item: Dict[str, Any]) -> str:
+    # Try to find a name for the record
+    for key in _related_layout(tuple(item))[2]:
+        if item[key]:
+            return item[key]
+    return "Record"
+
+
+def _related_item_details(item: Dict[str, Any]) -> Optional[str]:
+    # Add details (the first 4 non-empty scalar fields)
+    details = []
+    for k in _related_layout(tuple(item))[0]:
+        v = item[k]
+        if v and isinstance(v, (str, int, float)):
+            details.append(f"{k}: {v}")
+            if len(details) >= 4:
+                break
+    return f"[{', '.join(details)}]" if details else None
+
+
+def _render_related_item(index: int, item: Dict[str, Any]) -> List[str]:
+    lines = [f"  {index}. {_related_item_name(item)}"]
+    details = _related_item_details(item)
+    if details:
+        lines.append(f"     {details}")
+    return lines
+
+
+def _table_cell(value: Any) -> Optional[str]:
+    # Lookups become their name; scalars are kept on one line without the column separator
+    if isinstance(value, dict):
+        value = value.get("name")
+    elif isinstance(value, list):
+        value = ", ".join(str(v.get("name", "") if isinstance(v, dict) else v) for v in value)
+    if value is None or value == "" or value is False:
+        return None
+    return str(value).replace("\n", " ").replace("|", "/")
+
+
+def _render_related_table(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Renders a related list as a header row and one value row per record.
+    Columns that are empty on every row are dropped (including the name column
+    when no record has a name), and only the most populated
+    RELATED_TABLE_MAX_COLUMNS are kept. Columns holding the same value on every
+    row (the owner, the parent account) are stated once above the table instead.
+    """
+    # Each cell is formatted once; counts decide which columns are kept
+    rows = []
+    filled: Dict[str, int] = {}
+    for item in items:
+        cells = {}
+        for key in _related_layout(tuple(item))[1]:
+            cell = _table_cell(item[key])
+            if cell is not None:
+                cells[key] = cell
+                filled[key] = filled.get(key, 0) + 1
+        rows.append(cells)
+
+    # Most populated columns win; ties and the final order follow first appearance
+    keep = set(sorted(filled, key=lambda k: -filled[k])[:RELATED_TABLE_MAX_COLUMNS])
+    columns = [key for key in filled if key in keep]
+
+    shared = []
+    if len(rows) > 1:
+        shared = [key for key in columns if filled[key] == len(rows) and len({cells[key] for cells in rows}) == 1]
+        columns = [key for key in columns if key not in shared]
+
+    with_name = any(item.get(key) for item in items for key in RELATED_NAME_FIELDS)
+
+    lines = []
+    if shared:
+        lines.append("  All: " + "; ".join(f"{key}: {rows[0][key]}" for key in shared))
+    lines.append("  " + " | ".join((["Name"] if with_name else []) + columns))
+    for item, cells in zip(items, rows):
+        row = [cells.get(key, "-") for key in columns]
+        if with_name:
+            row.insert(0, _table_cell(_related_item_name(item)) or "-")
+        lines.append("  " + " | ".join(row))
+    return lines
+
+
+def crm_record_to_text(record: Dict[str, Any], related_format: Optional[str] = None) -> str:
+    """
+    Dynamically converts ALL JSON data (Fields, Subforms, Related Lists) into text.
+
+    Args:
+        record: Record data dictionary, with related lists under "Related_<Module>"
+        related_format: "table" or "list"; defaults to CRM_RELATED_FORMAT
+    """
+    if not record:
+        return "No Data Found."
+
+    related_format = related_format or CRM_RELATED_FORMAT
+    text_output = []
+
+    # --- SECTION 1: MAIN FIELDS & CUSTOM FIELDS ---
+    text_output.append("=== ACCOUNT DETAILS ===")
+    main_fields = {k: v for k, v in record.items() if not k.startswith("Related_")}
+    text_output.extend(_memoized(("main",), main_fields, _render_main_lines))
+
+    # --- SECTION 2: RELATED LISTS (Contacts, Deals, etc.) ---
+    text_output.append("\n=== RELATED RECORDS ===")
+
+    # Related lists fetched empty are kept on the record (see related_modules) but not rendered
+    related_keys = [k for k in record.keys() if k.startswith("Related_") and record[k]]
+
+    if not related_keys:
+        text_output.append("No related records found.")
+
+    for rel_key in related_keys:
+        module_name = rel_key.replace("Related_", "")
+        text_output.extend(_memoized(
+            ("related", module_name, related_format),
+            record[rel_key],
+            lambda items: _render_related_section(module_name, items, related_format)
+        ))
+
+    return "\n".join(text_output)
+
+
+def _render_related_section(module_name: str, items: List[Dict[str, Any]], related_format: str) -> List[str]:
+    lines = [f"\n {module_name} ({len(items)} records):"]
+    if related_format == "table":
+        lines.extend(_render_related_table(items))
+        return lines
+    for i, item in enumerate(items, 1):
+        lines.extend(_render_related_item(i, item))
+    return lines
+
+
+def related_modules(record: Dict[str, Any]) -> Set[str]:
+    """Related modules fetched with the record, including ones with no records (stored as [])."""
+    return {key.replace("Related_", "") for key in record if key.startswith("Related_")}
+
+
+def crm_record_to_chunks(record: Dict[str, Any], entity_type: str = "Accounts") -> List[Dict[str, Any]]:
+    """
+    Renders a record as self-contained chunks for retrieval.
+
+    Produces one chunk per group of main fields, one per subform and one per
+    related record, using the same formatting as crm_record_to_text.
+
+    Args:
+        record: Record data dictionary, with related lists under "Related_<Module>"
+        entity_type: Module name of the main record
+
+    Returns:
+        List of {"text": str, "metadata": dict} chunks. Metadata holds the
+        section ("fields", "subform" or "related"), module, record_id,
+        modified_time, a stable chunk_key and the chunk's position (chunk_index).
+    """
+    if not record:
+        return []
+
+    record_id = record.get("id")
+    modified_time = record.get("Modified_Time")
+    chunks = []
+
+    def add_chunk(text: str, section: str, module: str, chunk_record_id: Any, chunk_modified_time: Any, key: str):
+        chunks.append({
+            "text": text,
+            "metadata": {
+                "chunk_key": key,
+                "section": section,
+                "module": module,
+                "record_id": chunk_record_id,
+                "modified_time": chunk_modified_time,
+                "chunk_index": len(chunks),
+            },
+        })
+
+    field_lines, subforms = _split_main_record(record)
+    for start in range(0, len(field_lines), MAIN_FIELDS_PER_CHUNK):
+        group = field_lines[start:start + MAIN_FIELDS_PER_CHUNK]
+        add_chunk(
+            "\n".join(["=== ACCOUNT DETAILS ==="] + group),
+            "fields", entity_type, record_id, modified_time,
+            f"fields:{start // MAIN_FIELDS_PER_CHUNK}",
+        )
+
+    for key, lines in subforms:
+        add_chunk("\n".join(lines).strip(), "subform", key, record_id, modified_time, f"subform:{key}")
+
+    for rel_key in [k for k in record.keys() if k.startswith("Related_")]:
+        module_name = rel_key.replace("Related_", "")
+        items = record[rel_key]
+        for i, item in enumerate(items, 1):
+            # No list position in the text, so a chunk only changes when its record does
+            lines = [f"{module_name}: {_related_item_name(item)}"]
+            details = _related_item_details(item)
+            if details:
+                lines.append(f"  {details}")
+            add_chunk(
+                "\n".join(lines),
+                "related",
+                module_name,
+                item.get("id"),
+                item.get("Modified_Time"),
+                f"related:{module_name}:{item.get('id') or i}",
+            )
+
+    return chunks
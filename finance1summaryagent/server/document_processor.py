@@ -1,120 +1,277 @@
 """
 Document processing utilities for file uploads.
 Handles text extraction and chunking for vectorstore ingestion.
+
+Extraction is incremental: text is produced a block at a time (a slice of a
+text file, a PDF page or a DOCX paragraph) and the splitter consumes those
+blocks as a stream, so memory use does not grow with the size of the file.
 """
-from typing import List
+import io
+import xml.etree.ElementTree as ElementTree
+import zipfile
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from pdf_extraction import PDF_EXTRACT_WORKERS, iter_pdf_pages_parallel
+
+# Characters read at a time from plain text files
+TEXT_READ_CHARS = 64 * 1024
+
+# Chunks' worth of text buffered before the splitter runs on a stream
+SPLIT_BUFFER_CHUNKS = 8
+
+# WordprocessingML namespace used in DOCX document.xml
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Run children that stand for characters in a paragraph's text, as python-docx reads them
+# (w:br only when it is a line break, see _run_text)
+WORD_TEXT_MARKS = {
+    WORD_NS + "tab": "\t", WORD_NS + "ptab": "\t", WORD_NS + "cr": "\n", WORD_NS + "noBreakHyphen": "-",
+}
+
+Source = Union[str, BinaryIO]
+
+
+def _file_ext(filename: str) -> str:
+    return filename.split(".")[-1].lower() if "." in filename else ""
+
+
+def _open(source: Source) -> Tuple[BinaryIO, bool]:
+    # Paths are opened (and closed) here; file objects belong to the caller
+    if isinstance(source, str):
+        return open(source, "rb"), True
+    return source, False
+
+
+def _iter_plain_text(source: Source) -> Iterator[Tuple[str, float]]:
+    f, owned = _open(source)
+    try:
+        size = f.seek(0, io.SEEK_END)
+        f.seek(0)
+        reader = io.TextIOWrapper(f, encoding="utf-8", errors="ignore", newline="")
+        try:
+            while True:
+                block = reader.read(TEXT_READ_CHARS)
+                if not block:
+                    break
+                yield block, min(f.tell() / size, 1.0) if size else 0.0
+        finally:
+            # Leave a caller's file object open
+            reader.detach()
+    finally:
+        if owned:
+            f.close()
+
+
+def _iter_pdf_pages(source: Source) -> Iterator[Tuple[str, float]]:
+    # Files on disk are extracted on the process pool; in-memory files in this thread
+    if isinstance(source, str) and PDF_EXTRACT_WORKERS > 0:
+        yield from iter_pdf_pages_parallel(source)
+        return
+
+    import PyPDF2
+
+    f, owned = _open(source)
+    try:
+        pdf_reader = PyPDF2.PdfReader(f)
+        page_count = len(pdf_reader.pages)
+        for i, page in enumerate(pdf_reader.pages):
+            text = page.extract_text() or ""
+            # PyPDF2 keeps every object it has parsed; drop them so memory stays per page
+            pdf_reader.resolved_objects.clear()
+            yield ("\n" if i else "") + text, (i + 1) / page_count
+    finally:
+        if owned:
+            f.close()
+
+
+def _run_text(run: ElementTree.Element) -> str:
+    parts = []
+    for node in run:
+        if node.tag == WORD_NS + "t":
+            parts.append(node.text or "")
+        elif node.tag == WORD_NS + "br":
+            # Page and column breaks add nothing
+            if node.get(WORD_NS + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif node.tag in WORD_TEXT_MARKS:
+            parts.append(WORD_TEXT_MARKS[node.tag])
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph: ElementTree.Element) -> str:
+    # Same text as python-docx's Paragraph.text: runs and hyperlinks directly in the
+    # paragraph. Text boxes (inside a run's drawing), tracked insertions, fields and
+    # tab stop definitions in the paragraph properties are left out, as there.
+    parts = []
+    for node in paragraph:
+        if node.tag == WORD_NS + "r":
+            parts.append(_run_text(node))
+        elif node.tag == WORD_NS + "hyperlink":
+            parts.extend(_run_text(run) for run in node if run.tag == WORD_NS + "r")
+    return "".join(parts)
+
+
+def _iter_docx_paragraphs(source: Source) -> Iterator[Tuple[str, float]]:
+    # Parses document.xml incrementally instead of loading the whole tree (as
+    # python-docx does); each top-level body element is dropped once read
+    f, owned = _open(source)
+    try:
+        with zipfile.ZipFile(f) as archive, archive.open("word/document.xml") as xml:
+            size = archive.getinfo("word/document.xml").file_size
+            stack: List[ElementTree.Element] = []
+            first = True
+            for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    stack.append(element)
+                    continue
+                stack.pop()
+                if not stack or stack[-1].tag != WORD_NS + "body":
+                    continue
+                # Body-level paragraphs, matching python-docx's Document.paragraphs
+                if element.tag == WORD_NS + "p":
+                    yield ("" if first else "\n") + _paragraph_text(element), min(xml.tell() / size, 1.0)
+                    first = False
+                stack[-1].remove(element)
+    finally:
+        if owned:
+            f.close()
+
+
+def iter_text_blocks(source: Source, filename: str) -> Iterator[Tuple[str, float]]:
+    """
+    Extracts text from an uploaded file a block at a time.
+
+    Args:
+        source: Path of the file, or a binary file object
+        filename: Original filename (used to determine file type)
+
+    Yields:
+        (text, fraction of the file read so far). Concatenating the text
+        blocks gives the same text as extract_text_from_file.
+
+    Raises:
+        ValueError: If the file cannot be read, or a required library is missing
+    """
+    file_ext = _file_ext(filename)
+
+    # Handle PDF files (requires PyPDF2), one page at a time
+    if file_ext == "pdf":
+        extract, kind, package = _iter_pdf_pages, "PDF", "PyPDF2"
+    # Handle DOCX files, one paragraph at a time
+    elif file_ext in ["docx", "doc"]:
+        extract, kind, package = _iter_docx_paragraphs, "DOCX", None
+    # Text files, and anything else decoded as text
+    else:
+        extract, kind, package = _iter_plain_text, "text file", None
+
+    try:
+        yield from extract(source)
+    except ImportError:
+        raise ValueError(f"{kind} processing requires {package}. Install with: pip install {package}")
+    except Exception as e:
+        if kind == "text file":
+            raise ValueError(f"Error decoding text file: {e}")
+        raise ValueError(f"Error processing {kind}: {e}")
+
 
 def extract_text_from_file(file_content: bytes, filename: str) -> str:
     """
     Extracts text content from uploaded file.
-    
+
     Args:
         file_content: Raw file bytes
         filename: Original filename (used to determine file type)
-    
+
     Returns:
         Extracted text content
     """
-    # Get file extension
-    file_ext = filename.split(".")[-1].lower() if "." in filename else ""
-    
-    # Handle text files
-    if file_ext in ["txt", "text", "md", "markdown"]:
-        try:
-            return file_content.decode("utf-8", errors="ignore")
-        except Exception as e:
-            raise ValueError(f"Error decoding text file: {e}")
-    
-    # Handle PDF files (requires PyPDF2 or pdfplumber)
-    elif file_ext == "pdf":
-        try:
-            import PyPDF2
-            from io import BytesIO
-            
-            pdf_file = BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text_parts = []
-            
-            for page in pdf_reader.pages:
-                text_parts.append(page.extract_text())
-            
-            return "\n".join(text_parts)
-        except ImportError:
-            raise ValueError("PDF processing requires PyPDF2. Install with: pip install PyPDF2")
-        except Exception as e:
-            raise ValueError(f"Error processing PDF: {e}")
-    
-    # Handle DOCX files (requires python-docx)
-    elif file_ext in ["docx", "doc"]:
-        try:
-            from docx import Document as DocxDocument
-            from io import BytesIO
-            
-            docx_file = BytesIO(file_content)
-            doc = DocxDocument(docx_file)
-            text_parts = [paragraph.text for paragraph in doc.paragraphs]
-            
-            return "\n".join(text_parts)
-        except ImportError:
-            raise ValueError("DOCX processing requires python-docx. Install with: pip install python-docx")
-        except Exception as e:
-            raise ValueError(f"Error processing DOCX: {e}")
-    
-    # Default: try to decode as text
-    else:
-        try:
-            return file_content.decode("utf-8", errors="ignore")
-        except Exception:
-            raise ValueError(f"Unsupported file type: {file_ext}")
+    return "".join(text for text, _ in iter_text_blocks(io.BytesIO(file_content), filename))
+
+
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
 
 
 def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
     """
     Splits text into chunks for vectorstore ingestion.
-    
+
     Args:
         text: Text content to chunk
         chunk_size: Maximum size of each chunk
         chunk_overlap: Overlap between chunks
-    
+
     Returns:
         List of text chunks
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-    )
-    
-    chunks = text_splitter.split_text(text)
-    return chunks
+    return _splitter(chunk_size, chunk_overlap).split_text(text)
 
 
-def process_document(file_content: bytes, filename: str, entity_id: str, entity_type: str) -> List[Document]:
+def chunk_text_stream(blocks: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[str]:
     """
-    Processes a document file and returns Document objects ready for vectorstore.
-    
+    Splits a stream of text blocks into chunks, holding only a few chunks of text at a time.
+
     Args:
-        file_content: Raw file bytes
+        blocks: Consecutive pieces of the text
+        chunk_size: Maximum size of each chunk
+        chunk_overlap: Overlap between chunks
+
+    Yields:
+        Text chunks in order
+    """
+    splitter = _splitter(chunk_size, chunk_overlap)
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        if len(buffer) < chunk_size * SPLIT_BUFFER_CHUNKS:
+            continue
+        pieces = splitter.split_text(buffer)
+        if not pieces:
+            # Whitespace only: nothing to carry into the next split
+            buffer = ""
+            continue
+        # The last chunk may continue in the next block: split it again with more text
+        yield from pieces[:-1]
+        start = buffer.rfind(pieces[-1])
+        buffer = buffer[start:] if start >= 0 else pieces[-1]
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
+
+
+def process_document_stream(
+    source: Source,
+    filename: str,
+    entity_id: str,
+    entity_type: str,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> Iterator[Document]:
+    """
+    Streaming version of process_document for files on disk.
+
+    Args:
+        source: Path of the file, or a binary file object
         filename: Original filename
         entity_id: Associated entity ID
         entity_type: Associated entity type
-    
-    Returns:
-        List of Document objects with metadata
+        on_progress: Called with the fraction of the file read so far as text is extracted
+
+    Yields:
+        Document objects with metadata, in document order
     """
-    # Extract text
-    text = extract_text_from_file(file_content, filename)
-    
-    # Chunk text
-    chunks = chunk_text(text)
-    
-    # Create Document objects with metadata
-    documents = [
-        Document(
+    def texts() -> Iterator[str]:
+        for text, fraction in iter_text_blocks(source, filename):
+            if on_progress is not None:
+                on_progress(fraction)
+            yield text
+
+    for i, chunk in enumerate(chunk_text_stream(texts())):
+        yield Document(
             page_content=chunk,
             metadata={
                 "source": filename,
@@ -123,7 +280,19 @@ def process_document(file_content: bytes, filename: str, entity_id: str, entity_
                 "chunk_index": i
             }
         )
-        for i, chunk in enumerate(chunks)
-    ]
-    
-    return documents
+
+
+def process_document(file_content: bytes, filename: str, entity_id: str, entity_type: str) -> List[Document]:
+    """
+    Processes a document file and returns Document objects ready for vectorstore.
+
+    Args:
+        file_content: Raw file bytes
+        filename: Original filename
+        entity_id: Associated entity ID
+        entity_type: Associated entity type
+
+    Returns:
+        List of Document objects with metadata
+    """
+    return list(process_document_stream(io.BytesIO(file_content), filename, entity_id, entity_type))
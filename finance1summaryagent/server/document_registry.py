@@ -0,0 +1,172 @@
+"""
+Registry of uploaded document contents.
+Every upload is fingerprinted by the SHA-256 of its bytes. The registry keeps,
+per distinct content, the hash of each of its chunks and the entities (and
+filenames) it is attached to, so an identical upload can be copied from an
+entity that already holds it, and a near-duplicate can reuse the vectors of the
+chunks it shares with known documents.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# SQLite file holding document fingerprints and entity associations
+DOCUMENT_REGISTRY_DB = os.getenv("DOCUMENT_REGISTRY_DB", os.path.join(_SERVER_DIR, "document_registry.sqlite3"))
+
+# SQLite parameters per IN (...) lookup; stays well under SQLite's variable limit
+LOOKUP_BATCH_SIZE = 500
+
+
+def file_content_hash(path: str) -> str:
+    """SHA-256 of a file's bytes, read a block at a time."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentRegistry:
+    """Document fingerprints, chunk hashes and entity associations in SQLite."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                chunks INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                content_hash TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                PRIMARY KEY (content_hash, chunk_index)
+            );
+            CREATE INDEX IF NOT EXISTS document_chunks_hash ON document_chunks (chunk_hash);
+            CREATE TABLE IF NOT EXISTS document_entities (
+                entity_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                entity_type TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (entity_id, filename)
+            );
+            CREATE INDEX IF NOT EXISTS document_entities_hash ON document_entities (content_hash, added_at);
+            """
+        )
+        self._conn.commit()
+
+    def find(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE content_hash = ?", (content_hash,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def chunk_hashes(self, content_hash: str) -> List[str]:
+        """Hashes of the document's chunks, in order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_hash FROM document_chunks WHERE content_hash = ? ORDER BY chunk_index", (content_hash,)
+            ).fetchall()
+        return [row["chunk_hash"] for row in rows]
+
+    def locations(self, content_hash: str) -> List[Tuple[str, str]]:
+        """(entity_id, filename) pairs the document is attached to, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entity_id, filename FROM document_entities WHERE content_hash = ? ORDER BY added_at",
+                (content_hash,),
+            ).fetchall()
+        return [(row["entity_id"], row["filename"]) for row in rows]
+
+    def chunk_sources(self, chunk_hashes: List[str], exclude_entity_id: str) -> Dict[str, Tuple[str, str, int]]:
+        """
+        Finds one attached copy of each chunk hash outside the given entity.
+
+        Returns:
+            Chunk hash -> (entity_id, filename, chunk_index)
+        """
+        found: Dict[str, Tuple[str, str, int]] = {}
+        with self._lock:
+            for start in range(0, len(chunk_hashes), LOOKUP_BATCH_SIZE):
+                batch = chunk_hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT c.chunk_hash, e.entity_id, e.filename, c.chunk_index "
+                    "FROM document_chunks c JOIN document_entities e ON e.content_hash = c.content_hash "
+                    f"WHERE c.chunk_hash IN ({placeholders}) AND e.entity_id != ?",
+                    (*batch, exclude_entity_id),
+                ).fetchall()
+                for row in rows:
+                    found.setdefault(row["chunk_hash"], (row["entity_id"], row["filename"], row["chunk_index"]))
+        return found
+
+    def record(
+        self,
+        content_hash: str,
+        filename: str,
+        size_bytes: int,
+        entity_id: str,
+        entity_type: str,
+        chunk_hashes: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Attaches the document to the entity under filename, replacing whatever
+        that filename held before. With chunk_hashes, (re)records the document
+        itself. Documents no longer attached anywhere are dropped.
+        """
+        now = time.time()
+        with self._lock:
+            if chunk_hashes is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (content_hash, filename, size_bytes, chunks, created_at) "
+                    "VALUES (?, ?, ?, ?, COALESCE((SELECT created_at FROM documents WHERE content_hash = ?), ?))",
+                    (content_hash, filename, size_bytes, len(chunk_hashes), content_hash, now),
+                )
+                self._conn.execute("DELETE FROM document_chunks WHERE content_hash = ?", (content_hash,))
+                self._conn.executemany(
+                    "INSERT INTO document_chunks (content_hash, chunk_index, chunk_hash) VALUES (?, ?, ?)",
+                    [(content_hash, i, chunk_hash) for i, chunk_hash in enumerate(chunk_hashes)],
+                )
+            previous = self._conn.execute(
+                "SELECT content_hash FROM document_entities WHERE entity_id = ? AND filename = ?", (entity_id, filename)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_entities (entity_id, filename, content_hash, entity_type, added_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (entity_id, filename, content_hash, entity_type, now),
+            )
+            if previous is not None and previous["content_hash"] != content_hash:
+                self._drop_if_unattached(previous["content_hash"])
+            self._conn.commit()
+
+    def _drop_if_unattached(self, content_hash: str) -> None:
+        attached = self._conn.execute(
+            "SELECT 1 FROM document_entities WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone()
+        if attached is None:
+            self._conn.execute("DELETE FROM documents WHERE content_hash = ?", (content_hash,))
+            self._conn.execute("DELETE FROM document_chunks WHERE content_hash = ?", (content_hash,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            attachments = self._conn.execute("SELECT COUNT(*) FROM document_entities").fetchone()[0]
+        return {"documents": documents, "attachments": attachments}
+
+
+document_registry = DocumentRegistry(DOCUMENT_REGISTRY_DB)
@@ -0,0 +1,258 @@
+"""
+Uploaded documents per entity.
+Uploads are chunked with process_document_stream and embedded in batches into a
+persistent per-entity index kept apart from the CRM record's index; /chat adds
+the top-k chunks most similar to the question to its prompt.
+
+Uploads are de-duplicated through the document registry: a file whose bytes
+match a document already attached to some entity is copied from that entity's
+index (text and vectors) without extracting or embedding anything, and chunks
+of a new file that match chunks of known documents reuse their vectors.
+"""
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from context_builder import CONTEXT_TOKEN_BUDGET, estimate_tokens
+from document_processor import process_document_stream
+from document_registry import document_registry, file_content_hash
+from entity_index import VECTOR_INDEX_EMBED_BATCH, EntityIndex, content_hash, entity_indexes
+
+# Document chunks added to a /chat prompt
+DOCUMENT_TOP_K = int(os.getenv("DOCUMENT_TOP_K", "4"))
+
+# Share of CONTEXT_TOKEN_BUDGET the document chunks may take; the record gets the rest
+DOCUMENT_CONTEXT_SHARE = float(os.getenv("DOCUMENT_CONTEXT_SHARE", "0.3"))
+
+# Chunks per entity at which its document index switches from exact to HNSW search
+DOCUMENT_HNSW_MIN_CHUNKS = int(os.getenv("DOCUMENT_HNSW_MIN_CHUNKS", "2048"))
+
+_counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+class _SourceChanged(Exception):
+    """The index a duplicate was being copied from changed during the copy."""
+
+
+def document_index_key(entity_id: str) -> str:
+    return f"{entity_id}__documents"
+
+
+def get_document_index(entity_id: str) -> EntityIndex:
+    return entity_indexes.get(document_index_key(entity_id), hnsw_min_vectors=DOCUMENT_HNSW_MIN_CHUNKS)
+
+
+def pinned_document_index(entity_id: str) -> ContextManager[EntityIndex]:
+    """The entity's document index, kept loaded while the block updates it."""
+    return entity_indexes.pinned(document_index_key(entity_id), hnsw_min_vectors=DOCUMENT_HNSW_MIN_CHUNKS)
+
+
+def find_document_index(entity_id: str) -> Optional[EntityIndex]:
+    """The entity's document index, or None if nothing was ever uploaded for it."""
+    return entity_indexes.find(document_index_key(entity_id), hnsw_min_vectors=DOCUMENT_HNSW_MIN_CHUNKS)
+
+
+def _module(filename: str) -> str:
+    return f"document:{filename}"
+
+
+def _find_copy(document_hash: str) -> Optional[Tuple[EntityIndex, str, List[str]]]:
+    """An entity index still holding every chunk of a known document, as (index, module, chunk hashes)."""
+    if document_registry.find(document_hash) is None:
+        return None
+    expected = document_registry.chunk_hashes(document_hash)
+    for entity_id, filename in document_registry.locations(document_hash):
+        index = find_document_index(entity_id)
+        if index is None:
+            continue
+        module = _module(filename)
+        with index.lock:
+            if all(index.manifest.get(f"{module}:{i}", {}).get("hash") == digest for i, digest in enumerate(expected)):
+                return index, module, expected
+    return None
+
+
+def _shared_vectors(entity_id: str) -> Callable[[List[str]], Dict[str, np.ndarray]]:
+    """Looks chunk hashes up among documents attached to other entities and returns their stored vectors."""
+    def lookup(chunk_hashes: List[str]) -> Dict[str, np.ndarray]:
+        by_entity: Dict[str, Dict[str, str]] = defaultdict(dict)
+        for chunk_hash, (source_id, filename, chunk_index) in document_registry.chunk_sources(chunk_hashes, entity_id).items():
+            by_entity[source_id][f"{_module(filename)}:{chunk_index}"] = chunk_hash
+        vectors: Dict[str, np.ndarray] = {}
+        for source_id, keys in by_entity.items():
+            source = find_document_index(source_id)
+            if source is not None:
+                vectors.update(source.vectors_for(keys))
+        return vectors
+
+    return lookup
+
+
+def index_document(
+    path: str,
+    filename: str,
+    entity_id: str,
+    entity_type: str,
+    on_progress: Optional[Callable[..., None]] = None,
+    document_hash: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Chunks an uploaded file and adds it to the entity's document index.
+    The file is read, split and embedded as a stream, so memory use does not
+    depend on its size. Uploading a file with the same name again replaces its
+    earlier chunks. A file already attached to an entity is copied from that
+    entity's index instead, and chunks matching those of known documents
+    reuse their vectors.
+
+    Args:
+        path: Spooled upload on disk
+        filename: Original filename
+        entity_id: Associated entity ID
+        entity_type: Associated entity type
+        on_progress: Called after each embedding batch with keyword arguments
+            fraction (of the file read), chunks (processed so far) and
+            embedded (chunks so far that had to be embedded)
+        document_hash: SHA-256 of the file, if already computed while spooling
+
+    Returns:
+        Chunk count, how many chunks were embedded and how many reused an
+        existing vector (unchanged ones included), whether the file was a
+        duplicate of a known document, plus the index's added, replaced,
+        deleted and unchanged counts.
+
+    Raises:
+        ValueError: If text cannot be extracted from the file
+    """
+    document_hash = document_hash or file_content_hash(path)
+    module = _module(filename)
+    read = 0.0
+
+    def on_read(fraction: float) -> None:
+        nonlocal read
+        read = fraction
+
+    def extracted() -> Iterator[Dict[str, Any]]:
+        for doc in process_document_stream(path, filename, entity_id, entity_type, on_progress=on_read):
+            yield {
+                "text": doc.page_content,
+                "metadata": {**doc.metadata, "module": module, "chunk_key": f"{module}:{doc.metadata['chunk_index']}"},
+            }
+
+    def copied(source: EntityIndex, source_module: str, expected: List[str]) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(expected), VECTOR_INDEX_EMBED_BATCH):
+            keys = [f"{source_module}:{i}" for i in range(start, min(start + VECTOR_INDEX_EMBED_BATCH, len(expected)))]
+            chunks = source.export_chunks(keys)
+            if [chunk["hash"] for chunk in chunks] != expected[start:start + len(keys)]:
+                raise _SourceChanged()
+            for i, chunk in enumerate(chunks, start):
+                on_read((i + 1) / len(expected))
+                yield {
+                    "text": chunk["text"],
+                    "vector": chunk["vector"],
+                    "metadata": {
+                        **chunk["metadata"],
+                        "source": filename,
+                        "entity_id": entity_id,
+                        "entity_type": entity_type,
+                        "chunk_index": i,
+                        "module": module,
+                        "chunk_key": f"{module}:{i}",
+                    },
+                }
+
+    chunk_hashes: List[str] = []
+
+    def recorded(chunks: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for chunk in chunks:
+            chunk_hashes.append(content_hash(chunk["text"]))
+            yield chunk
+
+    progress = None
+    if on_progress is not None:
+        def progress(counts: Dict[str, int]) -> None:
+            on_progress(
+                fraction=read,
+                chunks=counts["added"] + counts["replaced"] + counts["unchanged"],
+                embedded=counts["added"] + counts["replaced"] - counts["reused"],
+            )
+
+    duplicate = _find_copy(document_hash)
+    changes = None
+    with pinned_document_index(entity_id) as index:
+        if duplicate is not None:
+            try:
+                changes = index.sync_stream(copied(*duplicate), scope={module}, progress=progress)
+            except _SourceChanged:
+                # The source was re-uploaded meanwhile; nothing was swapped in, so extract the file instead
+                duplicate = None
+        if changes is None:
+            read = 0.0
+            changes = index.sync_stream(
+                recorded(extracted()), scope={module}, progress=progress, lookup=_shared_vectors(entity_id)
+            )
+    entity_indexes.evict_to_budget()
+    print(f"Document index {document_index_key(entity_id)}: {changes}")
+
+    document_registry.record(
+        document_hash, filename, os.path.getsize(path), entity_id, entity_type,
+        chunk_hashes=None if duplicate is not None else chunk_hashes,
+    )
+
+    total = changes["added"] + changes["replaced"] + changes["unchanged"]
+    embedded = changes["added"] + changes["replaced"] - changes["reused"]
+    with _counters_lock:
+        _counters["uploads"] += 1
+        _counters["duplicate_uploads"] += int(duplicate is not None)
+        _counters["chunks_embedded"] += embedded
+        _counters["chunks_reused"] += total - embedded
+    return {**changes, "chunks": total, "embedded": embedded, "reused": total - embedded, "duplicate": duplicate is not None}
+
+
+def search_documents(entity_id: str, query: str, k: int = DOCUMENT_TOP_K) -> List[Dict[str, Any]]:
+    """Returns the entity's k document chunks most similar to the query, best first."""
+    index = find_document_index(entity_id)
+    if index is None or not index.manifest:
+        return []
+    matches = index.search(query, k=k)
+    with _counters_lock:
+        _counters["searches"] += 1
+        _counters["chunks_retrieved"] += len(matches)
+    return matches
+
+
+def document_context(entity_id: str, query: str, budget: Optional[int] = None) -> str:
+    """
+    Formats the best-matching document chunks as a prompt section, or "" if there are none.
+    Chunks are added best first while the section stays within `budget` estimated
+    tokens (default: DOCUMENT_CONTEXT_SHARE of CONTEXT_TOKEN_BUDGET).
+    """
+    if budget is None:
+        budget = int(CONTEXT_TOKEN_BUDGET * DOCUMENT_CONTEXT_SHARE)
+    matches = search_documents(entity_id, query)
+    if not matches:
+        return ""
+    lines = ["\n\n--- Uploaded Documents ---"]
+    used = estimate_tokens(lines[0])
+    included = 0
+    for match in matches:
+        metadata = match["metadata"]
+        label = f"\n[{metadata.get('source')}, part {metadata.get('chunk_index', 0) + 1}]"
+        tokens = estimate_tokens(f"\n{label}\n{match['text']}")
+        if used + tokens > budget:
+            break
+        lines += [label, match["text"]]
+        used += tokens
+        included += 1
+    with _counters_lock:
+        _counters["chunks_over_budget"] += len(matches) - included
+    return "\n".join(lines) if included else ""
+
+
+def document_stats() -> Dict[str, int]:
+    with _counters_lock:
+        stats = dict(_counters)
+    return {**stats, **document_registry.stats()}
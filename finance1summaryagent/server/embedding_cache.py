@@ -0,0 +1,177 @@
+"""
+On-disk embedding cache.
+Wraps an embedding model so vectors for document text that has been embedded
+before are read from SQLite instead of being recomputed. Entries are keyed by a
+hash of the model name and the text, stored as compact float16 blobs, and the
+least recently used ones are dropped once the file holds EMBEDDING_CACHE_MAX_ENTRIES.
+Query vectors are one-off and are only kept in a small in-memory LRU.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# SQLite parameters per IN (...) lookup; stays well under SQLite's variable limit
+LOOKUP_BATCH_SIZE = 500
+
+# Document vectors kept on disk; 0 keeps every vector
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Query vectors kept in memory
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "1024"))
+
+# Share of EMBEDDING_CACHE_MAX_ENTRIES kept after pruning, so pruning does not run on every insert
+PRUNE_TO_FRACTION = 0.9
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that looks document texts up in a SQLite cache in
+    batches and only sends new or changed text to the underlying model.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: str,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.query_cache_size = query_cache_size
+        self._lock = threading.Lock()
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "query_hits": 0, "query_misses": 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "used_at" not in columns:
+            # Caches written before entries were bounded; their rows (query vectors
+            # included) count as least recently used and are pruned first
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str, kind: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float16).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, bytes]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany("UPDATE embeddings SET used_at = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, rows: List[tuple]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, used_at) VALUES (?, ?, ?)",
+                [(key, blob, now) for key, blob in rows],
+            )
+            self._entries += len(rows)
+            if self.max_entries > 0 and self._entries > self.max_entries:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        # Drops the least recently used vectors, down to PRUNE_TO_FRACTION of max_entries
+        excess = self._entries - int(self.max_entries * PRUNE_TO_FRACTION)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used_at LIMIT ?)", (excess,)
+        )
+        entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._counters["evictions"] += self._entries - entries
+        self._entries = entries
+
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text, "document") for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            # Distinct texts: repeats within the batch are neither hits nor misses
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            rows = [(key, self._encode(vector)) for key, vector in zip(missing, vectors)]
+            self._store(rows)
+            found.update(rows)
+
+        # Cached and fresh vectors both go through float16 so results do not depend on cache state
+        return [self._decode(found[key]) for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed_documents(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text, "query")
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self._counters["query_hits"] += 1
+                return list(vector)
+            self._counters["query_misses"] += 1
+        vector = self._decode(self._encode(self.embeddings.embed_query(text)))
+        if self.query_cache_size > 0:
+            with self._lock:
+                self._queries[key] = vector
+                while len(self._queries) > self.query_cache_size:
+                    self._queries.popitem(last=False)
+        return list(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "query_entries": len(self._queries),
+                "path": self.path,
+            }
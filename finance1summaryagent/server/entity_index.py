@@ -0,0 +1,527 @@
+"""
+Persistent per-entity FAISS indexes.
+Each entity's chunks are stored on local disk and updated incrementally: only
+chunks whose content hash changed are re-embedded (or take the stored vector
+of identical text), removed chunks are deleted, and unchanged chunks are reused as-is. Loaded indexes are kept in an LRU that is
+bounded by an estimate of their memory use. Indexes that can grow large (uploaded
+documents) switch from exact search to an HNSW graph past a size threshold, so a
+top-k search stays sublinear in the number of chunks.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from vectorstore_runtime import get_embeddings
+
+# Root directory for persisted indexes
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_indexes"))
+
+# Approximate memory budget (MB) for indexes kept loaded in memory
+VECTOR_INDEX_CACHE_MB = float(os.getenv("VECTOR_INDEX_CACHE_MB", "256"))
+
+# Texts embedded per call when adding chunks, bounding peak memory for large uploads
+VECTOR_INDEX_EMBED_BATCH = int(os.getenv("VECTOR_INDEX_EMBED_BATCH", "64"))
+
+# HNSW graph parameters for indexes that switch to approximate search
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+MANIFEST_FILE = "manifest.json"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _safe_name(index_key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", index_key)
+
+
+def _index_path(index_key: str) -> str:
+    return os.path.join(VECTOR_INDEX_DIR, _safe_name(index_key))
+
+
+class EntityIndex:
+    """
+    A FAISS index for one entity plus a manifest describing each indexed chunk
+    (chunk_key -> content hash, module and text length). Chunk keys are used as
+    the FAISS document ids.
+
+    With `hnsw_min_vectors` set, the exact (flat) index is rebuilt as an HNSW
+    graph once it holds that many vectors.
+    """
+
+    def __init__(self, index_key: str, hnsw_min_vectors: Optional[int] = None):
+        self.index_key = index_key
+        self.hnsw_min_vectors = hnsw_min_vectors
+        self.path = _index_path(index_key)
+        self.lock = threading.RLock()
+        self.vectorstore: Optional[FAISS] = None
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            if self.manifest:
+                self.vectorstore = FAISS.load_local(self.path, get_embeddings())
+        except Exception as e:
+            # A corrupt or incompatible index is rebuilt from scratch on the next sync
+            print(f"Could not load vector index {self.index_key}: {e}")
+            self.vectorstore = None
+            self.manifest = {}
+
+    def _save(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        if self.vectorstore is not None:
+            self.vectorstore.save_local(self.path)
+        tmp_path = os.path.join(self.path, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+    def memory_bytes(self) -> int:
+        """Rough memory footprint: float32 vectors (plus HNSW links) and stored text."""
+        if self.vectorstore is None:
+            return 0
+        index = self.vectorstore.index
+        vectors = index.ntotal * index.d * 4
+        if self._is_hnsw():
+            # Neighbour lists on the base layer dominate the graph's size
+            vectors += index.ntotal * HNSW_M * 2 * 4
+        texts = sum(entry.get("chars", 0) for entry in self.manifest.values())
+        return vectors + texts
+
+    def sync(
+        self,
+        chunks: List[Dict[str, Any]],
+        scope: Optional[Set[str]] = None,
+    ) -> Dict[str, int]:
+        """
+        Brings the index in line with the given chunks.
+
+        Args:
+            chunks: Chunks with "text" and "metadata" (including chunk_key)
+            scope: Modules covered by `chunks`. Indexed chunks of these modules
+                that are no longer present are deleted; chunks of other modules
+                are left alone. Defaults to the modules present in `chunks`.
+
+        Returns:
+            Counts of added, replaced, deleted and unchanged chunks.
+        """
+        wanted = {c["metadata"]["chunk_key"]: c for c in chunks}
+        if scope is None:
+            scope = {c["metadata"].get("module") for c in chunks}
+
+        with self.lock:
+            to_add = []
+            replaced = 0
+            for key, chunk in wanted.items():
+                digest = content_hash(chunk["text"])
+                old = self.manifest.get(key)
+                if old is not None and old["hash"] == digest:
+                    continue
+                if old is not None:
+                    replaced += 1
+                to_add.append((key, chunk, digest))
+
+            stale = [
+                key for key, entry in self.manifest.items()
+                if key not in wanted and entry.get("module") in scope
+            ]
+            to_delete = stale + [key for key, _, _ in to_add if key in self.manifest]
+
+            if to_delete and self.vectorstore is not None:
+                self._delete(to_delete)
+            for key in to_delete:
+                self.manifest.pop(key, None)
+
+            self._add_chunks(to_add)
+
+            if to_add or stale:
+                self._save()
+
+            return {
+                "added": len(to_add) - replaced,
+                "replaced": replaced,
+                "deleted": len(stale),
+                "unchanged": len(wanted) - len(to_add),
+            }
+
+    def sync_stream(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        scope: Set[str],
+        progress: Optional[Callable[[Dict[str, int]], None]] = None,
+        lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Like sync, for chunks produced incrementally (e.g. while a large upload
+        is read). Chunks are compared and embedded a batch at a time, without
+        holding the lock while embedding, so searches are not held up for the
+        whole upload.
+
+        New and changed chunks are staged with their vectors and swapped in
+        together when the stream ends: searches see the old chunks until then,
+        a stream that raises leaves the index untouched, and replaced and
+        stale chunks are deleted at once (a single rebuild for an HNSW graph).
+
+        A new or changed chunk whose text is already indexed here or staged
+        under another key, or that `lookup` can supply a vector for, reuses
+        that vector instead of being embedded again. A chunk may also carry
+        its own "vector".
+
+        Args:
+            chunks: Chunks with "text" and "metadata" (including chunk_key)
+            scope: Modules covered by `chunks`; their indexed chunks that do not
+                appear in the stream are deleted at the end
+            progress: Called with the running counts after each batch
+            lookup: Called (without this index's lock held) with content hashes
+                of chunks to add; returns vectors it has for any of them
+
+        Returns:
+            Counts of added, replaced, deleted and unchanged chunks, and how
+            many of the added or replaced ones reused a vector.
+        """
+        counts = {"added": 0, "replaced": 0, "deleted": 0, "unchanged": 0, "reused": 0}
+        seen: Set[str] = set()
+        # Chunks to swap in (chunk_key -> chunk, content hash) and their vectors by content hash
+        staged: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        staged_vectors: Dict[str, np.ndarray] = {}
+        with self.lock:
+            # Indexed keys by content hash
+            by_hash = {entry["hash"]: key for key, entry in self.manifest.items()}
+        batch: List[Dict[str, Any]] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= VECTOR_INDEX_EMBED_BATCH:
+                self._stage_batch(batch, seen, counts, by_hash, staged, staged_vectors, lookup)
+                batch = []
+                if progress is not None:
+                    progress(dict(counts))
+        if batch:
+            self._stage_batch(batch, seen, counts, by_hash, staged, staged_vectors, lookup)
+            if progress is not None:
+                progress(dict(counts))
+
+        with self.lock:
+            # Classified again: another sync may have changed the index meanwhile
+            replaced = [key for key in staged if key in self.manifest]
+            stale = [
+                key for key, entry in self.manifest.items()
+                if key not in seen and entry.get("module") in scope
+            ]
+            to_delete = replaced + stale
+            if to_delete and self.vectorstore is not None:
+                self._delete(to_delete)
+            for key in to_delete:
+                self.manifest.pop(key, None)
+            self._add_chunks([(key, chunk, digest) for key, (chunk, digest) in staged.items()], staged_vectors)
+            counts["added"] = len(staged) - len(replaced)
+            counts["replaced"] = len(replaced)
+            counts["deleted"] = len(stale)
+
+            if staged or stale:
+                self._save()
+        return counts
+
+    def _stage_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        seen: Set[str],
+        counts: Dict[str, int],
+        by_hash: Dict[str, str],
+        staged: Dict[str, Tuple[Dict[str, Any], str]],
+        staged_vectors: Dict[str, np.ndarray],
+        lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]],
+    ) -> None:
+        digests = [content_hash(chunk["text"]) for chunk in batch]
+        vectors = {digest: chunk["vector"] for chunk, digest in zip(batch, digests) if "vector" in chunk}
+        if lookup is not None:
+            # Asked before taking the lock: the lookup may read other indexes
+            missing = list(dict.fromkeys(
+                d for d in digests if d not in by_hash and d not in vectors and d not in staged_vectors
+            ))
+            if missing:
+                vectors.update(lookup(missing))
+
+        with self.lock:
+            to_stage = []
+            for chunk, digest in zip(batch, digests):
+                key = chunk["metadata"]["chunk_key"]
+                seen.add(key)
+                old = self.manifest.get(key)
+                if old is not None and old["hash"] == digest:
+                    counts["unchanged"] += 1
+                    continue
+                counts["replaced" if old is not None else "added"] += 1
+                to_stage.append((key, chunk, digest))
+            # Vectors of identical text already indexed here under another key
+            local = {
+                by_hash[d]: d for _, _, d in to_stage
+                if d in by_hash and d not in vectors and d not in staged_vectors
+            }
+            vectors.update(self._vectors_by_key(local))
+
+        missing = {digest: chunk["text"] for _, chunk, digest in to_stage if digest not in vectors and digest not in staged_vectors}
+        if missing:
+            vectors.update(zip(missing, get_embeddings().embed_documents(list(missing.values()))))
+        counts["reused"] += len(to_stage) - len(missing)
+        for key, chunk, digest in to_stage:
+            if digest not in staged_vectors:
+                staged_vectors[digest] = np.asarray(vectors[digest], dtype=np.float32)
+            staged[key] = ({"text": chunk["text"], "metadata": chunk["metadata"]}, digest)
+
+    def _add_chunks(
+        self,
+        to_add: List[Tuple[str, Dict[str, Any], str]],
+        vectors: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Adds (key, chunk, hash) entries in batches and records them in the
+        manifest. Vectors are taken from `vectors` (by content hash) where
+        present; other texts are embedded, each distinct text once.
+
+        Returns:
+            Number of texts embedded.
+        """
+        if not to_add:
+            return 0
+        vectors = dict(vectors or {})
+        embeddings = get_embeddings()
+        embedded = 0
+        for start in range(0, len(to_add), VECTOR_INDEX_EMBED_BATCH):
+            batch = to_add[start:start + VECTOR_INDEX_EMBED_BATCH]
+            missing = {digest: chunk["text"] for _, chunk, digest in batch if digest not in vectors}
+            if missing:
+                vectors.update(zip(missing, embeddings.embed_documents(list(missing.values()))))
+                embedded += len(missing)
+            text_embeddings = [(chunk["text"], vectors[digest]) for _, chunk, digest in batch]
+            metadatas = [dict(chunk["metadata"]) for _, chunk, _ in batch]
+            ids = [key for key, _, _ in batch]
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+            else:
+                self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self._maybe_use_hnsw()
+        for key, chunk, digest in to_add:
+            self.manifest[key] = {
+                "hash": digest,
+                "module": chunk["metadata"].get("module"),
+                "chars": len(chunk["text"]),
+            }
+        return embedded
+
+    def _vectors_by_key(self, keys: Dict[str, str]) -> Dict[str, np.ndarray]:
+        # keys: chunk_key -> content hash; returns content hash -> stored vector,
+        # skipping chunks whose text no longer has that hash
+        keys = {key: digest for key, digest in keys.items() if self.manifest.get(key, {}).get("hash") == digest}
+        if not keys or self.vectorstore is None:
+            return {}
+        store = self.vectorstore
+        return {
+            keys[key]: store.index.reconstruct(position)
+            for position, key in store.index_to_docstore_id.items()
+            if key in keys
+        }
+
+    def vectors_for(self, keys: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """
+        Stored vectors of indexed chunks, for chunk_key -> content hash pairs.
+        Chunks whose text no longer has that hash are left out.
+
+        Returns:
+            Content hash -> vector.
+        """
+        with self.lock:
+            return self._vectors_by_key(keys)
+
+    def export_chunks(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Text, metadata, content hash and stored vector of the given indexed chunks, in order."""
+        with self.lock:
+            if self.vectorstore is None:
+                return []
+            store = self.vectorstore
+            wanted = set(keys)
+            positions = {key: position for position, key in store.index_to_docstore_id.items() if key in wanted}
+            exported = []
+            for key in keys:
+                if key not in positions:
+                    continue
+                doc = store.docstore.search(key)
+                exported.append({
+                    "text": doc.page_content,
+                    "metadata": dict(doc.metadata),
+                    "hash": self.manifest[key]["hash"],
+                    "vector": store.index.reconstruct(positions[key]),
+                })
+            return exported
+
+    def _is_hnsw(self) -> bool:
+        return self.vectorstore is not None and isinstance(self.vectorstore.index, faiss.IndexHNSW)
+
+    def _build_index(self, vectors: np.ndarray, dimension: int) -> Any:
+        if self.hnsw_min_vectors is not None and len(vectors) >= self.hnsw_min_vectors:
+            index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        else:
+            index = faiss.IndexFlatL2(dimension)
+        if len(vectors):
+            index.add(vectors)
+        return index
+
+    def _maybe_use_hnsw(self) -> None:
+        """Rebuilds a flat index as HNSW once it reaches hnsw_min_vectors. Vector positions are kept."""
+        index = self.vectorstore.index
+        if self.hnsw_min_vectors is None or self._is_hnsw() or index.ntotal < self.hnsw_min_vectors:
+            return
+        self.vectorstore.index = self._build_index(index.reconstruct_n(0, index.ntotal), index.d)
+
+    def _delete(self, keys: List[str]) -> None:
+        if not self._is_hnsw():
+            self.vectorstore.delete(keys)
+            return
+        # HNSW graphs cannot remove vectors; rebuild from the ones that remain
+        store = self.vectorstore
+        doomed = set(keys)
+        remaining = [(i, key) for i, key in sorted(store.index_to_docstore_id.items()) if key not in doomed]
+        vectors = store.index.reconstruct_n(0, store.index.ntotal)[[i for i, _ in remaining]]
+        store.index = self._build_index(vectors, store.index.d)
+        store.docstore.delete(list(doomed))
+        store.index_to_docstore_id = {position: key for position, (_, key) in enumerate(remaining)}
+
+    def search(
+        self,
+        query: str,
+        allowed_keys: Optional[Set[str]] = None,
+        k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns indexed chunks ordered by similarity to the query.
+
+        Args:
+            query: Search text
+            allowed_keys: If given, only chunks with these keys are returned
+            k: If given, only the k best chunks are searched for and returned
+
+        Returns:
+            List of {"text", "metadata", "score"} dictionaries, best first.
+        """
+        with self.lock:
+            if self.vectorstore is None or self.vectorstore.index.ntotal == 0:
+                return []
+            total = self.vectorstore.index.ntotal
+            fetch = total if k is None or allowed_keys is not None else min(k, total)
+            if self._is_hnsw():
+                self.vectorstore.index.hnsw.efSearch = max(HNSW_EF_SEARCH, fetch)
+            results = self.vectorstore.similarity_search_with_score(query, k=fetch)
+
+        matches = []
+        for doc, score in results:
+            key = doc.metadata.get("chunk_key")
+            if allowed_keys is not None and key not in allowed_keys:
+                continue
+            matches.append({"text": doc.page_content, "metadata": doc.metadata, "score": float(score)})
+        return matches[:k] if k is not None else matches
+
+
+class EntityIndexStore:
+    """
+    LRU of loaded entity indexes, bounded by estimated memory use.
+
+    Indexes being updated are pinned (see `pinned`) and never evicted: an
+    evicted index would be loaded again as a second object with its own lock,
+    and the two would overwrite each other's saves.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[str, EntityIndex]" = OrderedDict()
+        self._pins: Counter = Counter()
+        self._lock = threading.Lock()
+        self._counters = {"loads": 0, "hits": 0, "evictions": 0}
+
+    def _get(self, index_key: str, options: Dict[str, Any]) -> EntityIndex:
+        # Called with self._lock held
+        index = self._indexes.get(index_key)
+        if index is not None:
+            self._indexes.move_to_end(index_key)
+            self._counters["hits"] += 1
+            return index
+        index = EntityIndex(index_key, **options)
+        self._indexes[index_key] = index
+        self._counters["loads"] += 1
+        return index
+
+    def get(self, index_key: str, **options: Any) -> EntityIndex:
+        """Returns the loaded index for the key, loading it with `options` (EntityIndex arguments) if needed."""
+        with self._lock:
+            return self._get(index_key, options)
+
+    @contextmanager
+    def pinned(self, index_key: str, **options: Any) -> Iterator[EntityIndex]:
+        """Like get, keeping the index loaded (and the only object for its key) until the block exits. Use it to sync."""
+        with self._lock:
+            index = self._get(index_key, options)
+            self._pins[index_key] += 1
+        try:
+            yield index
+        finally:
+            with self._lock:
+                self._pins[index_key] -= 1
+                if not self._pins[index_key]:
+                    del self._pins[index_key]
+
+    def find(self, index_key: str, **options: Any) -> Optional[EntityIndex]:
+        """
+        Like get, but returns None rather than creating an index that was never
+        saved, so looking up keys without an index does not fill the LRU.
+        """
+        with self._lock:
+            index = self._indexes.get(index_key)
+            if index is not None:
+                self._indexes.move_to_end(index_key)
+                self._counters["hits"] += 1
+                return index
+        if not os.path.exists(os.path.join(_index_path(index_key), MANIFEST_FILE)):
+            return None
+        return self.get(index_key, **options)
+
+    def evict_to_budget(self) -> None:
+        """Drops least recently used indexes until the memory estimate fits. Indexes are already on disk."""
+        with self._lock:
+            total = sum(index.memory_bytes() for index in self._indexes.values())
+            # The most recently used index always stays
+            for index_key in list(self._indexes)[:-1]:
+                if total <= self.max_bytes:
+                    break
+                if index_key in self._pins:
+                    continue
+                total -= self._indexes.pop(index_key).memory_bytes()
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "loaded": len(self._indexes),
+                "pinned": len(self._pins),
+                "memory_bytes": sum(index.memory_bytes() for index in self._indexes.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+entity_indexes = EntityIndexStore(max_bytes=int(VECTOR_INDEX_CACHE_MB * 1024 * 1024))
@@ -0,0 +1,145 @@
+"""
+Deterministic answers for direct field lookups.
+Questions such as "what's their phone number" or "who is the owner" are matched
+against the account's field names; when exactly one populated field fits, its
+value is returned without calling Gemini. Anything ambiguous returns None so
+the caller falls back to the full pipeline.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from crm_to_text import MAIN_SKIP_FIELDS
+
+# Openers of a single-value question; the rest of the question names the field
+LOOKUP_PREFIX = re.compile(
+    r"^(?:what(?:'s|s| is| are| was)|who(?:'s| is| was)|which is|give me|tell me|show me)\s+",
+    re.IGNORECASE
+)
+
+# Questions with these words need reasoning over the record, not a single value
+NON_LOOKUP_WORDS = {
+    "summary", "summarise", "summarize", "overview", "why", "how", "should", "compare", "recommend",
+    "suggest", "analyse", "analyze", "explain", "risk", "risks", "all", "list", "latest", "recent",
+    "next", "last", "and", "or", "related", "any", "many", "much",
+}
+
+# Words that do not name a field ("what is THE phone number OF THIS client")
+FILLER_WORDS = {
+    "the", "their", "his", "her", "its", "this", "that", "these", "client", "account", "customer",
+    "household", "record", "of", "for", "on", "in", "a", "an", "current", "please", "me", "us",
+}
+
+# Alternate words for common field-name words
+SYNONYMS = {
+    "telephone": "phone", "tel": "phone", "cell": "mobile", "e-mail": "email", "mail": "email",
+    "site": "website", "web": "website", "url": "website",
+}
+
+# Question words that also name a field through one of its words ("address" for Billing_Street,
+# "number" for Phone); in a question they count as that field word
+FIELD_WORD_ALIASES = {
+    "street": {"address"}, "phone": {"number"}, "mobile": {"number"}, "fax": {"number"},
+}
+
+# Longest target phrase still treated as a direct lookup
+MAX_TARGET_WORDS = 5
+
+# Minimum overlap between the target phrase and a field name
+MIN_MATCH_SCORE = 0.5
+
+
+def _words(text: str) -> List[str]:
+    # Split API names ("Total_Asset_Value", "AnnualRevenue") and questions into lowercase words
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [SYNONYMS.get(w, w) for w in re.findall(r"[a-z0-9][a-z0-9-]*", text.lower())]
+
+
+def _target_words(query: str) -> Optional[Set[str]]:
+    """Returns the words naming the requested field, or None if the query is not a plain lookup."""
+    query = query.strip().rstrip("?.! ")
+    match = LOOKUP_PREFIX.match(query)
+    if not match:
+        return None
+
+    words = _words(query[match.end():].replace("'s", ""))
+    if not words or len(words) > MAX_TARGET_WORDS + 4 or NON_LOOKUP_WORDS.intersection(words):
+        return None
+
+    target = {w for w in words if w not in FILLER_WORDS}
+    if not target or len(target) > MAX_TARGET_WORDS:
+        return None
+    return target
+
+
+def _match_score(target: Set[str], name: Set[str]) -> Tuple[float, int]:
+    """
+    Share of the field name covered by the question (0 if the question asks for
+    more than the field holds), and how many question words matched exactly, so
+    "account number" prefers Account_Number over Phone.
+    """
+    covered = set(target & name)
+    exact = len(covered)
+    for word in target - name:
+        covered.add(next((field_word for field_word in name if word in FIELD_WORD_ALIASES.get(field_word, ())), word))
+    # Every word of the question must be covered, so "phone of the spouse" never matches Phone
+    if not covered <= name:
+        return 0.0, 0
+    return len(covered) / len(name), exact
+
+
+def looks_like_field_lookup(query: str) -> bool:
+    """Cheap check, before any record is fetched, that the fast path may apply."""
+    return _target_words(query) is not None
+
+
+def _format_value(value: Any) -> Optional[str]:
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, dict):
+        return value.get("name")
+    if isinstance(value, list):
+        # Subforms and multi-selects need the full pipeline to be described well
+        return None
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+def resolve_field_lookup(record: Dict[str, Any], query: str) -> Optional[Tuple[str, str]]:
+    """
+    Answers a direct field lookup from the main record.
+
+    Args:
+        record: Main account record from Zoho
+        query: User question
+
+    Returns:
+        (field API name, answer text) when exactly one populated field clearly
+        matches, None otherwise. Empty fields are not considered, so "what is
+        their address" finds the one address that is filled in.
+    """
+    target = _target_words(query)
+    if target is None:
+        return None
+
+    scored = []
+    for key, value in record.items():
+        if key in MAIN_SKIP_FIELDS or key.startswith("Related_") or key.startswith("$"):
+            continue
+        name = set(_words(key)) - FILLER_WORDS
+        formatted = _format_value(value)
+        if not name or formatted is None:
+            continue
+        score = _match_score(target, name)
+        if score[0] >= MIN_MATCH_SCORE:
+            scored.append((score, key, formatted))
+
+    if not scored:
+        return None
+    scored.sort(key=lambda item: item[0], reverse=True)
+    if len(scored) > 1 and scored[1][0] == scored[0][0]:
+        return None
+
+    _, key, formatted = scored[0]
+    label = key.replace("_", " ")
+    return key, f"The {label} for this account is {formatted}."
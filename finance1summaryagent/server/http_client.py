@@ -0,0 +1,74 @@
+"""
+Shared HTTP client for Zoho API calls.
+Keeps one connection-pooled async client per process so repeated calls to the
+Zoho OAuth and CRM endpoints reuse open keep-alive connections (HTTP/2 when the
+h2 package is installed) instead of paying a new TCP + TLS handshake each time.
+"""
+import os
+from typing import Optional
+
+import httpx
+
+# Maximum open connections (and keep-alive connections) in the shared pool
+ZOHO_HTTP_POOL_SIZE = int(os.getenv("ZOHO_HTTP_POOL_SIZE", "20"))
+
+# Seconds an idle keep-alive connection is kept open
+ZOHO_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ZOHO_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Creates an httpx AsyncClient with a sized keep-alive pool.
+
+    Returns:
+        Configured httpx AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=ZOHO_HTTP_POOL_SIZE,
+        max_keepalive_connections=ZOHO_HTTP_POOL_SIZE,
+        keepalive_expiry=ZOHO_HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits, http2=HTTP2_AVAILABLE)
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """
+    Creates the shared client if it does not exist yet.
+    Called once from the FastAPI app lifespan.
+
+    Returns:
+        The shared httpx AsyncClient
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client, creating it lazily when used outside the app
+    lifespan (e.g. scripts).
+
+    Returns:
+        The shared httpx AsyncClient
+    """
+    if _client is not None and not _client.is_closed:
+        return _client
+    return init_http_client()
+
+
+async def close_http_client() -> None:
+    """Closes the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,335 @@
+"""
+Background document ingestion.
+/upload streams the file to a spool directory in fixed-size blocks (up to a
+size cap), hashing it on the way, records a job in a local SQLite store and
+returns at once; a pool of worker threads extracts, chunks and embeds the file
+into the entity's document index (or copies it, if the same content was
+uploaded before) and records progress on the job. Jobs still
+queued or running when the server stopped are picked up again on startup.
+"""
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from cpu_executor import run_cpu_bound
+from document_store import index_document
+
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Worker threads processing uploads
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+
+# SQLite file holding upload jobs
+INGESTION_JOB_DB = os.getenv("INGESTION_JOB_DB", os.path.join(_SERVER_DIR, "ingestion_jobs.sqlite3"))
+
+# Directory where uploaded files wait for a worker; each is deleted once its job ends
+INGESTION_SPOOL_DIR = os.getenv("INGESTION_SPOOL_DIR", os.path.join(_SERVER_DIR, "upload_spool"))
+
+# Largest accepted upload file
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Bytes read from the request and written to the spool file at a time
+UPLOAD_SPOOL_CHUNK_BYTES = int(os.getenv("UPLOAD_SPOOL_CHUNK_BYTES", str(1024 * 1024)))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_COLUMNS = (
+    "job_id", "entity_id", "entity_type", "filename", "path", "size_bytes", "status", "stage",
+    "progress", "chunks_total", "chunks_embedded", "chunks_reused", "chunks_unchanged", "content_hash",
+    "duplicate", "error", "worker",
+    "created_at", "started_at", "finished_at",
+)
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+    def __init__(self, max_bytes: int):
+        limit = f"{max_bytes // (1024 * 1024)} MB" if max_bytes >= 1024 * 1024 else f"{max_bytes} byte"
+        super().__init__(f"File exceeds the {limit} upload limit")
+        self.max_bytes = max_bytes
+
+
+def _append_block(f: Any, digest: Any, block: bytes) -> None:
+    digest.update(block)
+    f.write(block)
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class JobStore:
+    """Upload jobs in SQLite, shared by the request handlers and the workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                entity_id TEXT NOT NULL,
+                entity_type TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                chunks_total INTEGER,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                chunks_reused INTEGER,
+                chunks_unchanged INTEGER,
+                content_hash TEXT,
+                duplicate INTEGER,
+                error TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        # Columns added since the first job stores were created
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in (
+            ("progress", "REAL NOT NULL DEFAULT 0"),
+            ("chunks_reused", "INTEGER"),
+            ("content_hash", "TEXT"),
+            ("duplicate", "INTEGER"),
+        ):
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(
+        self, entity_id: str, entity_type: str, filename: str, path: str, size_bytes: int, content_hash: str,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, entity_id, entity_type, filename, path, size_bytes, content_hash, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, entity_id, entity_type, filename, path, size_bytes, content_hash, QUEUED, time.time()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def unfinished(self) -> List[str]:
+        """IDs of queued or interrupted jobs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job for GET /upload/{job_id}."""
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": 1.0 if job["status"] == SUCCEEDED else round(job["progress"], 3),
+        "entity_id": job["entity_id"],
+        "entity_type": job["entity_type"],
+        "filename": job["filename"],
+        "size_bytes": job["size_bytes"],
+        "content_hash": job["content_hash"],
+        "chunks_total": job["chunks_total"],
+        "chunks_embedded": job["chunks_embedded"],
+        "chunks_reused": job["chunks_reused"],
+        "chunks_unchanged": job["chunks_unchanged"],
+        # Known once the job has succeeded: whether the file was copied from an entity that already held it
+        "duplicate": None if job["duplicate"] is None else bool(job["duplicate"]),
+        "error": job["error"],
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(job["started_at"]),
+        "finished_at": _iso(job["finished_at"]),
+    }
+
+
+class IngestionWorkers:
+    """
+    Fixed pool of worker threads draining the job queue. Throughput is counted
+    per worker (jobs, chunks and bytes against busy time).
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._queue = queue.Queue()
+        # Jobs interrupted by a restart run again from the spooled file
+        for job_id in self.store.unfinished():
+            self.store.update(
+                job_id, status=QUEUED, stage=None, worker=None,
+                progress=0, chunks_total=None, chunks_embedded=0, chunks_reused=None,
+            )
+            self._queue.put(job_id)
+        for i in range(self.workers):
+            name = f"ingest-{i}"
+            self._counters[name] = {"jobs": 0, "failed": 0, "chunks": 0, "chunks_embedded": 0, "bytes": 0, "busy_seconds": 0.0}
+            thread = threading.Thread(target=self._run, args=(name,), name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the workers after their current job. Queued and interrupted jobs resume on the next start."""
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    async def spool(self, upload: Any) -> Tuple[str, int, str]:
+        """
+        Copies an upload (anything with an async read(size), such as
+        FastAPI's UploadFile) to a new spool file a block at a time.
+
+        Returns:
+            (spool path, size in bytes, SHA-256 of the content)
+
+        Raises:
+            UploadTooLarge: If the file exceeds UPLOAD_MAX_BYTES; nothing is kept
+        """
+        os.makedirs(INGESTION_SPOOL_DIR, exist_ok=True)
+        path = os.path.join(INGESTION_SPOOL_DIR, uuid.uuid4().hex)
+        size = 0
+        digest = hashlib.sha256()
+        # File writes and hashing run on the CPU executor, off the event loop
+        f = await run_cpu_bound(open, path, "wb")
+        try:
+            try:
+                while True:
+                    block = await upload.read(UPLOAD_SPOOL_CHUNK_BYTES)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > UPLOAD_MAX_BYTES:
+                        raise UploadTooLarge(UPLOAD_MAX_BYTES)
+                    await run_cpu_bound(_append_block, f, digest, block)
+            finally:
+                await run_cpu_bound(f.close)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, size, digest.hexdigest()
+
+    def submit(
+        self, entity_id: str, entity_type: str, filename: str, path: str, size_bytes: int, content_hash: str,
+    ) -> str:
+        """Records a queued job for a spooled upload and returns its ID."""
+        job_id = self.store.create(entity_id, entity_type, filename, path, size_bytes, content_hash)
+        self._queue.put(job_id)
+        return job_id
+
+    def _run(self, worker: str) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None or self._stopping.is_set():
+                return
+            try:
+                self._process(job_id, worker)
+            except Exception as e:
+                print(f"Ingestion worker {worker} crashed on job {job_id}: {e}")
+
+    def _process(self, job_id: str, worker: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            return
+        started = time.time()
+        self.store.update(job_id, status=RUNNING, stage="extracting", worker=worker, started_at=started)
+
+        def on_progress(fraction: float, chunks: int, embedded: int) -> None:
+            # Extraction and embedding are interleaved; the last page or block may still be embedding
+            self.store.update(
+                job_id, stage="embedding", progress=min(fraction, 0.99),
+                chunks_total=chunks, chunks_embedded=embedded, chunks_reused=chunks - embedded,
+            )
+
+        counters = self._counters[worker]
+        try:
+            result = index_document(
+                job["path"], job["filename"], job["entity_id"], job["entity_type"], on_progress,
+                document_hash=job["content_hash"],
+            )
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, stage=None, error=str(e), finished_at=time.time())
+            print(f"Ingestion job {job_id} ({job['filename']}) failed: {e}")
+            with self._lock:
+                counters["failed"] += 1
+        else:
+            self.store.update(
+                job_id, status=SUCCEEDED, stage=None, chunks_total=result["chunks"],
+                chunks_embedded=result["embedded"], chunks_reused=result["reused"],
+                chunks_unchanged=result["unchanged"], duplicate=int(result["duplicate"]), finished_at=time.time(),
+            )
+            with self._lock:
+                counters["jobs"] += 1
+                counters["chunks"] += result["chunks"]
+                counters["chunks_embedded"] += result["embedded"]
+                counters["bytes"] += job["size_bytes"]
+        finally:
+            with self._lock:
+                counters["busy_seconds"] += time.time() - started
+
+        try:
+            os.remove(job["path"])
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            workers = {}
+            for name, counters in self._counters.items():
+                busy = counters["busy_seconds"]
+                workers[name] = {
+                    **counters,
+                    "busy_seconds": round(busy, 3),
+                    "chunks_per_second": round(counters["chunks"] / busy, 2) if busy else 0.0,
+                    "bytes_per_second": round(counters["bytes"] / busy) if busy else 0,
+                }
+        return {"queued": self._queue.qsize(), "jobs": self.store.status_counts(), "workers": workers}
+
+
+ingestion_workers = IngestionWorkers(JobStore(INGESTION_JOB_DB), INGESTION_WORKERS)
@@ -0,0 +1,228 @@
+"""
+Admission control for Gemini calls.
+Every generate_content call takes a slot from one shared scheduler, which caps
+concurrent calls and estimated tokens per minute. Waiting calls are admitted in
+priority order (interactive chat, then scan, then batch work); lower-priority
+work is deferred while the token budget runs low and shed once its queue is full.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    CHAT = 0
+    SCAN = 1
+    BATCH = 2
+
+
+class LLMOverloaded(Exception):
+    """Raised when a call is shed because its priority class's queue is full."""
+
+    def __init__(self, priority: Priority, retry_after: int):
+        super().__init__(f"Gemini is busy; {priority.name.lower()} request shed, retry in {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+# Concurrent Gemini calls across all endpoints (a stream holds its slot until it ends)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Estimated prompt + answer tokens admitted per rolling minute; 0 disables the budget
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+
+# Share of the token budget only chat may use, so scans and batch work are
+# deferred before interactive requests start waiting on the budget
+LLM_CHAT_RESERVE = float(os.getenv("LLM_CHAT_RESERVE", "0.2"))
+
+# Waiting calls per class beyond which new ones are shed; 0 means unbounded
+LLM_MAX_QUEUE = {
+    Priority.CHAT: int(os.getenv("LLM_MAX_QUEUE_CHAT", "0")),
+    Priority.SCAN: int(os.getenv("LLM_MAX_QUEUE_SCAN", "16")),
+    Priority.BATCH: int(os.getenv("LLM_MAX_QUEUE_BATCH", "64")),
+}
+
+# Answer tokens assumed per call when charging the budget
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1024"))
+
+BUDGET_WINDOW = 60.0
+
+
+class LLMScheduler:
+    """
+    Priority admission queue in front of Gemini.
+
+    A call is admitted when a concurrency slot is free, no higher-priority call
+    is waiting and its estimated tokens fit the rolling one-minute budget
+    (minus the chat reserve for lower classes). Otherwise it waits in a heap
+    ordered by (priority, arrival).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        tokens_per_minute: int,
+        max_queue: Dict[Priority, int],
+        chat_reserve: float = 0.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self.max_queue = max_queue
+        self.chat_reserve = min(max(chat_reserve, 0.0), 1.0)
+        self._active = 0
+        self._waiting: List[Tuple[int, int, asyncio.Future, int]] = []
+        self._queued = {p: 0 for p in Priority}
+        self._seq = itertools.count()
+        # (admitted at, tokens) of calls charged to the rolling budget
+        self._spent: Deque[Tuple[float, int]] = deque()
+        self._spent_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._counters = {
+            p: {"admitted": 0, "shed": 0, "wait_total": 0.0, "wait_max": 0.0, "queue_max": 0}
+            for p in Priority
+        }
+
+    # --- budget ---
+
+    def _expire(self, now: float) -> None:
+        while self._spent and now - self._spent[0][0] >= BUDGET_WINDOW:
+            self._spent_tokens -= self._spent.popleft()[1]
+
+    def _budget_for(self, priority: Priority) -> float:
+        if priority == Priority.CHAT:
+            return self.tokens_per_minute
+        return self.tokens_per_minute * (1 - self.chat_reserve)
+
+    def _fits(self, priority: Priority, tokens: int) -> bool:
+        if not self.tokens_per_minute:
+            return True
+        # A single call larger than the budget still runs once the window is empty
+        return self._spent_tokens == 0 or self._spent_tokens + tokens <= self._budget_for(priority)
+
+    def _charge(self, tokens: int, now: float) -> None:
+        if self.tokens_per_minute:
+            self._spent.append((now, tokens))
+            self._spent_tokens += tokens
+
+    # --- queue ---
+
+    def _admit(self, priority: Priority, tokens: int, now: float) -> None:
+        self._active += 1
+        self._charge(tokens, now)
+        self._counters[priority]["admitted"] += 1
+
+    def _dispatch(self) -> None:
+        """Admits waiting calls in priority order while slots and budget allow."""
+        now = time.monotonic()
+        self._expire(now)
+        while self._waiting and self._active < self.max_concurrency:
+            priority, _, future, tokens = self._waiting[0]
+            if future.done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiting)
+                continue
+            if not self._fits(Priority(priority), tokens):
+                # Strict priority: lower classes do not overtake a deferred call
+                self._schedule_budget_retry(now)
+                break
+            heapq.heappop(self._waiting)
+            self._queued[Priority(priority)] -= 1
+            self._admit(Priority(priority), tokens, now)
+            future.set_result(now)
+
+    def _schedule_budget_retry(self, now: float) -> None:
+        if self._timer is not None or not self._spent:
+            return
+        delay = max(self._spent[0][0] + BUDGET_WINDOW - now, 0.01)
+
+        def retry() -> None:
+            self._timer = None
+            self._dispatch()
+
+        self._timer = asyncio.get_running_loop().call_later(delay, retry)
+
+    def _retry_after(self) -> int:
+        if self._spent and self.tokens_per_minute:
+            return max(1, int(self._spent[0][0] + BUDGET_WINDOW - time.monotonic()) + 1)
+        return 1
+
+    async def acquire(self, priority: Priority, tokens: int) -> float:
+        """Waits for admission and returns the seconds spent queued."""
+        now = time.monotonic()
+        self._expire(now)
+        if not self._waiting and self._active < self.max_concurrency and self._fits(priority, tokens):
+            self._admit(priority, tokens, now)
+            return 0.0
+
+        limit = self.max_queue.get(priority, 0)
+        if limit and self._queued[priority] >= limit:
+            self._counters[priority]["shed"] += 1
+            raise LLMOverloaded(priority, self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (int(priority), next(self._seq), future, tokens))
+        self._queued[priority] += 1
+        counters = self._counters[priority]
+        counters["queue_max"] = max(counters["queue_max"], self._queued[priority])
+        # A higher-priority call may be waiting on the budget only; let this one be considered
+        self._dispatch()
+
+        try:
+            admitted_at = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller went away: hand the slot on
+                self.release()
+            else:
+                future.cancel()
+                self._queued[priority] -= 1
+            raise
+
+        waited = admitted_at - now
+        counters["wait_total"] += waited
+        counters["wait_max"] = max(counters["wait_max"], waited)
+        return waited
+
+    def release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, tokens: int):
+        """Holds one Gemini slot for the duration of the block."""
+        await self.acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire(time.monotonic())
+        classes = {}
+        for priority in Priority:
+            counters = self._counters[priority]
+            admitted = counters["admitted"]
+            classes[priority.name.lower()] = {
+                "queued": self._queued[priority],
+                "queue_max": counters["queue_max"],
+                "admitted": admitted,
+                "shed": counters["shed"],
+                "wait_avg_ms": round(counters["wait_total"] / admitted * 1000, 1) if admitted else 0.0,
+                "wait_max_ms": round(counters["wait_max"] * 1000, 1),
+            }
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "tokens_last_minute": self._spent_tokens,
+            "tokens_per_minute": self.tokens_per_minute,
+            "classes": classes,
+        }
+
+
+llm_scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_TOKENS_PER_MINUTE, LLM_MAX_QUEUE, LLM_CHAT_RESERVE)
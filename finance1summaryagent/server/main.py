@@ -1,10 +1,14 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Any
+from starlette.datastructures import Headers
+from typing import Optional, List, Any, Dict, Tuple
+from contextlib import asynccontextmanager
 import uvicorn
 import os
 import json
+from collections import Counter
 from dotenv import load_dotenv
 import google.generativeai as genai
 
@@ -13,9 +17,21 @@ load_dotenv()
 
 # Custom Modules
 from zoho_auth import get_access_token
-from zoho_crm_api_call import get_account_data
-from crm_to_text import crm_record_to_text
-from vectorstore_runtime import build_vectorstore
+from zoho_crm_api_call import get_account_data, get_account_data_with_prefetch, prefetch_stats, record_cache, zoho_fetches
+from single_flight import SingleFlight
+from field_lookup import looks_like_field_lookup, resolve_field_lookup
+from crm_to_text import crm_record_to_text, crm_record_to_chunks, related_modules, render_cache_stats
+from vectorstore_runtime import embeddings_ready, warm_up_embeddings, embedding_cache_stats
+from context_builder import CONTEXT_TOKEN_BUDGET, estimate_tokens, select_context, retrieval_stats
+from entity_index import entity_indexes
+from document_store import document_context, document_stats
+from ingestion_jobs import UPLOAD_MAX_BYTES, UploadTooLarge, ingestion_workers, job_status
+from http_client import init_http_client, close_http_client
+from answer_cache import answer_cache, answer_cache_key, get_cached_answer, store_answer
+from cpu_executor import get_cpu_executor, run_cpu_bound, shutdown_cpu_executor
+from pdf_extraction import pdf_extraction_stats, shutdown_pdf_pool
+from module_router import route_modules, warm_up_router, MODULE_ROUTER_CONFIDENCE_THRESHOLD
+from llm_scheduler import LLMOverloaded, Priority, llm_scheduler, LLM_OUTPUT_TOKEN_ESTIMATE
 
 # --- CONFIGURATION ---
 # Load API Key from Environment Variable
@@ -28,7 +44,77 @@ else:
 # Using Flash for speed, as it handles the routing logic very quickly
 model = genai.GenerativeModel('gemini-2.5-flash')
 
-app = FastAPI(title="Zoho CRM Agent API")
+
+def llm_slot(priority: Priority, prompt: str):
+    """Scheduler slot for one Gemini call, charged with the prompt's estimated tokens plus an answer."""
+    return llm_scheduler.slot(priority, estimate_tokens(prompt) + LLM_OUTPUT_TOKEN_ESTIMATE)
+
+
+def llm_overloaded_error(error: LLMOverloaded) -> HTTPException:
+    """503 for a request shed by the LLM scheduler, telling the client when to retry."""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+
+async def generate_content(prompt: str, priority: Priority):
+    """Non-streaming Gemini call admitted through the LLM scheduler."""
+    async with llm_slot(priority, prompt):
+        return await model.generate_content_async(prompt)
+
+
+def _warm_up_models():
+    warm_up_embeddings()
+    warm_up_router()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared keep-alive connection pool for all Zoho calls
+    init_http_client()
+    # Load the embedding model in the background; /health reports when it is warm
+    get_cpu_executor().submit(_warm_up_models)
+    # Background upload ingestion, resuming jobs left unfinished by the last run
+    ingestion_workers.start()
+    yield
+    ingestion_workers.stop()
+    await close_http_client()
+    shutdown_cpu_executor()
+    shutdown_pdf_pool()
+
+
+app = FastAPI(title="Zoho CRM Agent API", lifespan=lifespan)
+
+# Room in an /upload request body for the form fields and multipart framing around the file
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimit:
+    """
+    Rejects /upload requests by their Content-Length before the body is read:
+    FastAPI parses the whole form (spooling the file to a temporary file)
+    before the handler runs, so the spool's own size check comes too late to
+    spare the server an oversized body. Requests without a Content-Length
+    are refused, so every accepted body has a known size.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/upload":
+            length = Headers(scope=scope).get("content-length")
+            response = None
+            if length is None or not length.isdigit():
+                response = JSONResponse({"detail": "Content-Length is required"}, status_code=411)
+            elif int(length) > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+                response = JSONResponse({"detail": str(UploadTooLarge(UPLOAD_MAX_BYTES))}, status_code=413)
+            if response is not None:
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+# Added before CORS so that CORS wraps it and rejections carry CORS headers
+app.add_middleware(UploadSizeLimit)
 
 # PRIORITY 1 FIX: CORS middleware - Required for frontend integration
 app.add_middleware(
@@ -40,6 +126,10 @@ app.add_middleware(
 )
 
 
+# Concurrent /chat and /scan requests with the same answer cache key share one generation
+answer_flights = SingleFlight("answers")
+
+
 # Request/Response Models
 class ChatRequest(BaseModel):
     entity_id: Optional[str] = None  # Optional to support backward compatibility with account_id
@@ -59,6 +149,7 @@ class Action(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     actions: Optional[List[Action]] = None
+    cached: bool = False  # True when served from the answer cache
 
 
 class ScanRequest(BaseModel):
@@ -75,6 +166,7 @@ class Recommendation(BaseModel):
 
 class ScanResponse(BaseModel):
     recommendations: List[Recommendation]
+    cached: bool = False  # True when served from the answer cache
 
 
 # --- 1. DEFINE AVAILABLE MODULES ---
@@ -104,7 +196,22 @@ AVAILABLE_MODULES = [
 ]
 
 
-def identify_relevant_modules(user_query: str) -> list:
+async def identify_relevant_modules(user_query: str) -> list:
+    """
+    Identifies which Zoho CRM modules are relevant to the user's question.
+    Uses the local keyword/embedding router and only asks the LLM when the
+    local router is not confident enough.
+    """
+    modules, confidence = await run_cpu_bound(route_modules, user_query)
+    if modules and confidence >= MODULE_ROUTER_CONFIDENCE_THRESHOLD:
+        print(f"Local router picked {modules} (confidence {confidence:.2f})")
+        return modules
+
+    print(f"Local router confidence {confidence:.2f} below threshold, asking LLM router")
+    return await identify_relevant_modules_with_llm(user_query)
+
+
+async def identify_relevant_modules_with_llm(user_query: str) -> list:
     """
     Uses AI to identify which Zoho CRM modules are relevant to the user's question.
     """
@@ -129,7 +236,7 @@ Example Output:
 """
 
     try:
-        response = model.generate_content(prompt)
+        response = await generate_content(prompt, Priority.CHAT)
         text = response.text.strip()
 
         # Clean up potential markdown formatting from AI response
@@ -182,62 +289,7 @@ def parse_structured_response(response_text: str, response_type: str = "chat") -
             return {"recommendations": []}
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    """
-    Chat endpoint for user queries about a CRM record.
-    Returns structured response with optional actions.
-    """
-    # PRIORITY 2 FIX: Handle backward compatibility and entity generalization
-    entity_id = req.entity_id or req.account_id
-    if not entity_id:
-        raise HTTPException(status_code=400, detail="entity_id or account_id is required")
-    
-    entity_type = req.entity_type or "Accounts"
-    
-    # For now, we support Accounts with intelligent module routing
-    # TODO: Extend to support other entity types (Deals, Contacts, etc.)
-    if entity_type != "Accounts":
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Entity type '{entity_type}' not yet supported. Currently only 'Accounts' is supported."
-        )
-    
-    print(f"\nReceived chat request for Account: {entity_id}")
-    print(f"User Query: {req.query}")
-
-    try:
-        # 1. Authenticate
-        token = get_access_token()
-        if not token:
-            print("Authentication failed.")
-            raise HTTPException(status_code=500, detail="Failed to get Zoho Token")
-
-        # 2. INTELLIGENT FETCHING (The Router)
-        # Ask AI which modules are needed based on the user's query
-        target_modules = identify_relevant_modules(req.query)
-        print(f"AI Router decided to fetch: {target_modules}")
-
-        # 3. Get Data (Fetching ONLY the identified modules)
-        record = get_account_data(entity_id, token, related_modules_to_fetch=target_modules)
-
-        if not record:
-            raise HTTPException(status_code=404, detail="Account not found in CRM")
-
-        # 4. Convert Data to Text
-        text_data = crm_record_to_text(record)
-
-        # 5. Create Vector Store & Search
-        # We rebuild the vector store per request for real-time accuracy
-        vs = build_vectorstore(text_data, entity_id)
-
-        # Search for context (k=1 since we only have one document)
-        docs = vs.similarity_search(req.query, k=1)
-        context = "\n".join([d.page_content for d in docs])
-
-        # 6. Generate Final Response with Structured Output
-        # PRIORITY 2 FIX: Request structured JSON response with actions
-        prompt = f"""
+CHAT_GUIDELINES = """
 You are an intelligent, friendly, and professional CRM AI assistant designed to help relationship managers understand their clients better.
 
 Your responsibilities:
@@ -266,97 +318,371 @@ STRICT DATA SAFETY RULE:
 You must ONLY answer based on the Account Context below.
 If the question goes outside this data, respond with:
 "I don't have that information available for this account."
+"""
 
+CHAT_JSON_FORMAT = """
 IMPORTANT: You must respond in JSON format with the following structure:
-{{
+{
     "response": "Your text response here",
     "actions": [
-        {{
+        {
             "label": "Action button label (e.g., 'Update Status')",
             "type": "UPDATE_FIELD",
             "field": "Field_API_Name (e.g., 'Status')",
             "value": "New value (e.g., 'Active')"
-        }}
+        }
     ]
-}}
+}
 
 If the user's query suggests an action (like updating a field, creating a record, etc.), include structured actions in the actions array.
 If no actions are needed, set "actions" to an empty array [].
+"""
+
+# Separates the streamed answer text from the trailing actions JSON
+ACTIONS_MARKER = "<<<ACTIONS>>>"
+
+CHAT_STREAM_FORMAT = f"""
+IMPORTANT: Write your answer as plain text (Markdown is fine). Do NOT wrap it in JSON.
+
+If the user's query suggests an action (like updating a field, creating a record, etc.), then AFTER your answer
+add a line containing only {ACTIONS_MARKER} followed by a JSON array of actions with this structure:
+[
+    {{
+        "label": "Action button label (e.g., 'Update Status')",
+        "type": "UPDATE_FIELD",
+        "field": "Field_API_Name (e.g., 'Status')",
+        "value": "New value (e.g., 'Active')"
+    }}
+]
+
+If no actions are needed, do not add the {ACTIONS_MARKER} line.
+"""
+
 
+def build_chat_prompt(context: str, query: str, streaming: bool = False) -> str:
+    """
+    Builds the answer prompt. The streaming variant asks for plain text with
+    actions after ACTIONS_MARKER so text can be forwarded as it is generated.
+    """
+    output_format = CHAT_STREAM_FORMAT if streaming else CHAT_JSON_FORMAT
+    closing = (
+        "Now provide the best possible answer following the format specified above."
+        if streaming else
+        "Now provide the best possible answer in the JSON format specified above."
+    )
+    return f"""{CHAT_GUIDELINES}{output_format}
 --------------------
 Account Context:
 {context}
 --------------------
 
 User Question:
-{req.query}
+{query}
 
-Now provide the best possible answer in the JSON format specified above.
+{closing}
 """
 
-        res = model.generate_content(prompt)
-        parsed_response = parse_structured_response(res.text, "chat")
-        
-        # Parse actions if present
-        actions = None
-        if parsed_response.get("actions"):
-            try:
-                actions = [Action(**action) for action in parsed_response["actions"]]
-            except Exception as e:
-                print(f"Error parsing actions: {e}")
-                actions = None
-        
-        return ChatResponse(
-            response=parsed_response.get("response", res.text),
-            actions=actions
+
+def parse_actions(raw_actions: Any) -> Optional[List[Action]]:
+    """Converts action dictionaries from the model into Action objects, or None."""
+    if not raw_actions:
+        return None
+    try:
+        return [Action(**action) for action in raw_actions]
+    except Exception as e:
+        print(f"Error parsing actions: {e}")
+        return None
+
+
+def resolve_chat_entity(req: ChatRequest) -> str:
+    """Validates the chat request's entity and returns its ID."""
+    # PRIORITY 2 FIX: Handle backward compatibility and entity generalization
+    entity_id = req.entity_id or req.account_id
+    if not entity_id:
+        raise HTTPException(status_code=400, detail="entity_id or account_id is required")
+
+    entity_type = req.entity_type or "Accounts"
+
+    # For now, we support Accounts with intelligent module routing
+    # TODO: Extend to support other entity types (Deals, Contacts, etc.)
+    if entity_type != "Accounts":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Entity type '{entity_type}' not yet supported. Currently only 'Accounts' is supported."
         )
+    return entity_id
+
+
+def build_record_context(record: dict, query: str, entity_id: str, budget: Optional[int] = None) -> str:
+    """
+    Renders a fetched record and selects the prompt context for a query, within
+    `budget` tokens (default: CONTEXT_TOKEN_BUDGET).
+    CPU-bound (rendering, and embedding + FAISS search for large records), so
+    async callers run it on the CPU executor.
+    """
+    # Convert Data to Text
+    text_data = crm_record_to_text(record)
+
+    # Small records go straight into the prompt; large ones are ranked by section and packed into the budget
+    selection = select_context(
+        text_data, query, entity_id,
+        chunks=crm_record_to_chunks(record), budget=budget, related_modules=related_modules(record),
+    )
+    print(
+        f"Context path: {selection.mode}, {selection.tokens_used} tokens used, "
+        f"{selection.tokens_dropped} dropped ({selection.sections_truncated} sections truncated, "
+        f"{selection.sections_dropped} dropped)"
+    )
+    return selection.text
+
+
+# How many chat requests each path answered: field_lookup, answer_cache or llm
+chat_path_counts: Counter = Counter()
+
+
+def record_chat_path(path: str, detail: str = "") -> None:
+    chat_path_counts[path] += 1
+    print(f"Chat path: {path}{f' ({detail})' if detail else ''}")
+
+
+async def load_chat_context(entity_id: str, query: str) -> Tuple[Optional[str], str]:
+    """
+    Fetches the account data needed for a query and returns (direct answer, prompt context).
+
+    Direct field lookups ("what's their phone number") are answered from the
+    main account record as soon as it arrives, without calling Gemini; routing
+    and the related fetches are then stopped and the context is empty. Anything
+    else returns (None, context).
+    """
+    # 1. Authenticate
+    token = await get_access_token()
+    if not token:
+        print("Authentication failed.")
+        raise HTTPException(status_code=500, detail="Failed to get Zoho Token")
+
+    # 2. INTELLIGENT FETCHING (The Router)
+    # Work out which modules are needed based on the user's query
+    async def route() -> list:
+        target_modules = await identify_relevant_modules(query)
+        print(f"Router decided to fetch: {target_modules}")
+        return target_modules
+
+    lookup = {}
+
+    def answer_lookup(main_record: dict) -> bool:
+        resolved = resolve_field_lookup(main_record, query)
+        if resolved is None:
+            return False
+        lookup["field"], lookup["answer"] = resolved
+        return True
+
+    # 3. Get Data (Fetching ONLY the identified modules)
+    # The main account and default modules are prefetched while the router runs
+    record = await get_account_data_with_prefetch(
+        entity_id, token, route(), shortcut=answer_lookup if looks_like_field_lookup(query) else None
+    )
+
+    if not record:
+        raise HTTPException(status_code=404, detail="Account not found in CRM")
+
+    if lookup:
+        record_chat_path("field_lookup", lookup["field"])
+        return lookup["answer"], ""
+
+    # 4. The uploaded document chunks most relevant to the query, within their share of the budget
+    documents = await run_cpu_bound(document_context, entity_id, query)
+
+    # 5. Convert Data to Text and Select Context in the budget the documents left
+    record_budget = CONTEXT_TOKEN_BUDGET - estimate_tokens(documents)
+    context = await run_cpu_bound(build_record_context, record, query, entity_id, record_budget)
+    return None, context + documents
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    """
+    Chat endpoint for user queries about a CRM record.
+    Returns structured response with optional actions.
+    """
+    entity_id = resolve_chat_entity(req)
+
+    print(f"\nReceived chat request for Account: {entity_id}")
+    print(f"User Query: {req.query}")
+
+    try:
+        # Direct field lookups are answered from the record without Gemini
+        answer, context = await load_chat_context(entity_id, req.query)
+        if answer is not None:
+            return ChatResponse(response=answer)
+
+        # Same context and question as an earlier request: reuse its answer
+        cache_key = answer_cache_key("chat", entity_id, context, req.query)
+        cached = get_cached_answer(cache_key)
+        if cached is not None:
+            record_chat_path("answer_cache")
+            return ChatResponse(**cached, cached=True)
+
+        record_chat_path("llm")
+
+        # 6. Generate Final Response with Structured Output
+        # PRIORITY 2 FIX: Request structured JSON response with actions
+        # Identical concurrent questions share one Gemini call
+        async def generate() -> dict:
+            res = await generate_content(build_chat_prompt(context, req.query), Priority.CHAT)
+            parsed_response = parse_structured_response(res.text, "chat")
+
+            result = ChatResponse(
+                response=parsed_response.get("response", res.text),
+                actions=parse_actions(parsed_response.get("actions"))
+            )
+            payload = result.model_dump(exclude={"cached"})
+            store_answer(cache_key, payload)
+            return payload
+
+        return ChatResponse(**await answer_flights.do(cache_key, generate))
     
     except HTTPException:
         # Re-raise HTTPException to preserve status codes (404, 500, etc.)
         raise
+    except LLMOverloaded as e:
+        raise llm_overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
 
-@app.post("/scan", response_model=ScanResponse)
-def scan(req: ScanRequest):
+def sse_event(event: str, data: Any) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_chat_answer(prompt: str, cache_key: Optional[tuple] = None):
     """
-    PRIORITY 1 FIX: Proactive scan endpoint that analyzes a record and returns recommendations
-    without requiring a user query.
+    Streams a Gemini answer as SSE events.
+
+    Yields "token" events with answer text as it arrives, then one "actions"
+    event with the parsed actions, then "done". Text after ACTIONS_MARKER is
+    held back and parsed as the actions JSON. Failures are sent as an "error"
+    event since the response has already started. A completed answer is stored
+    in the answer cache under `cache_key`.
     """
-    entity_type = req.entity_type or "Accounts"
-    
-    # For now, we support Accounts only
-    if entity_type != "Accounts":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Entity type '{entity_type}' not yet supported. Currently only 'Accounts' is supported."
-        )
-    
-    print(f"\nReceived scan request for Account: {req.entity_id}")
+    pending = ""
+    actions_text = None
+    answer = ""
 
     try:
-        # 1. Authenticate
-        token = get_access_token()
-        if not token:
-            raise HTTPException(status_code=500, detail="Failed to get Zoho Token")
+        # The slot is held until the stream ends
+        async with llm_slot(Priority.CHAT, prompt):
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                try:
+                    piece = chunk.text
+                except ValueError:
+                    # Chunks without text (e.g. safety metadata only)
+                    continue
+
+                if actions_text is not None:
+                    actions_text += piece
+                    continue
+
+                pending += piece
+                marker_at = pending.find(ACTIONS_MARKER)
+                if marker_at >= 0:
+                    text, actions_text = pending[:marker_at], pending[marker_at + len(ACTIONS_MARKER):]
+                    pending = ""
+                    if text:
+                        answer += text
+                        yield sse_event("token", {"text": text})
+                    continue
+
+                # Hold back a possible partial marker at the end of the buffer
+                safe = len(pending) - (len(ACTIONS_MARKER) - 1)
+                if safe > 0:
+                    answer += pending[:safe]
+                    yield sse_event("token", {"text": pending[:safe]})
+                    pending = pending[safe:]
+
+        if pending:
+            answer += pending
+            yield sse_event("token", {"text": pending})
 
-        # 2. Get Data (Fetch all relevant modules for comprehensive analysis)
-        # For scan, we fetch common modules to get a full picture
-        target_modules = ["Contacts", "Deals", "Notes", "Tasks", "Meetings"]
-        record = get_account_data(req.entity_id, token, related_modules_to_fetch=target_modules)
+        actions = None
+        if actions_text and actions_text.strip():
+            parsed = parse_structured_response(actions_text, "chat")
+            if isinstance(parsed, list):
+                actions = parse_actions(parsed)
+        action_dicts = [action.model_dump() for action in actions] if actions else []
+        yield sse_event("actions", {"actions": action_dicts})
+        yield sse_event("done", {"cached": False})
+
+        if cache_key is not None:
+            store_answer(cache_key, {"response": answer, "actions": action_dicts or None})
+    except Exception as e:
+        print(f"Error streaming chat response: {e}")
+        yield sse_event("error", {"detail": f"Error processing chat request: {str(e)}"})
 
-        if not record:
-            raise HTTPException(status_code=404, detail="Account not found in CRM")
 
-        # 3. Convert Data to Text
-        text_data = crm_record_to_text(record)
+async def stream_ready_answer(payload: dict, cached: bool = False):
+    """Sends an already available answer with the same events as a live stream."""
+    yield sse_event("token", {"text": payload["response"]})
+    yield sse_event("actions", {"actions": payload.get("actions") or []})
+    yield sse_event("done", {"cached": cached})
 
-        # 4. Create Vector Store
-        vs = build_vectorstore(text_data, req.entity_id)
 
-        # 5. Generate Proactive Recommendations
-        prompt = f"""
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Answer text is sent as "token" events while Gemini generates it; the
+    actions array follows in a final "actions" event.
+    """
+    entity_id = resolve_chat_entity(req)
+
+    print(f"\nReceived streaming chat request for Account: {entity_id}")
+    print(f"User Query: {req.query}")
+
+    try:
+        answer, context = await load_chat_context(entity_id, req.query)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
+
+    if answer is not None:
+        events = stream_ready_answer({"response": answer})
+    else:
+        cache_key = answer_cache_key("chat", entity_id, context, req.query)
+        cached = get_cached_answer(cache_key)
+        if cached is not None:
+            record_chat_path("answer_cache")
+            events = stream_ready_answer(cached, cached=True)
+        else:
+            record_chat_path("llm")
+            events = stream_chat_answer(build_chat_prompt(context, req.query, streaming=True), cache_key)
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop reverse proxies (nginx) from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+# What /scan looks for; used to rank record sections when the account exceeds the token budget
+SCAN_FOCUS = (
+    "Missing critical information such as phone numbers, emails and addresses, overdue follow-ups "
+    "or tasks, incomplete records, data quality issues, opportunities and important relationships"
+)
+
+
+async def generate_scan_recommendations(text_data: str) -> dict:
+    """
+    Asks Gemini for proactive recommendations on a rendered account and
+    returns the ScanResponse payload (without the cached flag).
+    """
+    prompt = f"""
 You are an AI assistant analyzing a Zoho CRM account record to provide proactive recommendations.
 
 Analyze this account and provide 2-3 proactive recommendations. Look for:
@@ -396,52 +722,106 @@ Account Context:
 Provide proactive recommendations in the JSON format specified above.
 """
 
-        res = model.generate_content(prompt)
-        parsed_response = parse_structured_response(res.text, "scan")
-        
-        # Parse recommendations
-        recommendations_data = parsed_response.get("recommendations", [])
-        recommendations = []
+    res = await generate_content(prompt, Priority.SCAN)
+    parsed_response = parse_structured_response(res.text, "scan")
+    
+    # Parse recommendations
+    recommendations_data = parsed_response.get("recommendations", [])
+    recommendations = []
+    
+    for rec in recommendations_data:
+        actions = None
+        if rec.get("actions"):
+            try:
+                actions = [Action(**action) for action in rec["actions"]]
+            except Exception as e:
+                print(f"Error parsing recommendation actions: {e}")
+                actions = None
         
-        for rec in recommendations_data:
-            actions = None
-            if rec.get("actions"):
-                try:
-                    actions = [Action(**action) for action in rec["actions"]]
-                except Exception as e:
-                    print(f"Error parsing recommendation actions: {e}")
-                    actions = None
-            
-            recommendations.append(
-                Recommendation(
-                    type=rec.get("type", "suggestion"),
-                    message=rec.get("message", ""),
-                    priority=rec.get("priority", "medium"),
-                    actions=actions
-                )
+        recommendations.append(
+            Recommendation(
+                type=rec.get("type", "suggestion"),
+                message=rec.get("message", ""),
+                priority=rec.get("priority", "medium"),
+                actions=actions
             )
-        
-        # Ensure we have at least some recommendations
-        if not recommendations:
-            recommendations.append(
-                Recommendation(
-                    type="suggestion",
-                    message="No specific recommendations at this time. Account data looks complete.",
-                    priority="low",
-                    actions=None
-                )
+        )
+    
+    # Ensure we have at least some recommendations
+    if not recommendations:
+        recommendations.append(
+            Recommendation(
+                type="suggestion",
+                message="No specific recommendations at this time. Account data looks complete.",
+                priority="low",
+                actions=None
             )
-        
-        return ScanResponse(recommendations=recommendations)
+        )
+    
+    result = ScanResponse(recommendations=recommendations)
+    return result.model_dump(exclude={"cached"})
+
+
+@app.post("/scan", response_model=ScanResponse)
+async def scan(req: ScanRequest):
+    """
+    PRIORITY 1 FIX: Proactive scan endpoint that analyzes a record and returns recommendations
+    without requiring a user query.
+    """
+    entity_type = req.entity_type or "Accounts"
+    
+    # For now, we support Accounts only
+    if entity_type != "Accounts":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Entity type '{entity_type}' not yet supported. Currently only 'Accounts' is supported."
+        )
+    
+    print(f"\nReceived scan request for Account: {req.entity_id}")
+
+    try:
+        # 1. Authenticate
+        token = await get_access_token()
+        if not token:
+            raise HTTPException(status_code=500, detail="Failed to get Zoho Token")
+
+        # 2. Get Data (Fetch all relevant modules for comprehensive analysis)
+        # For scan, we fetch common modules to get a full picture
+        target_modules = ["Contacts", "Deals", "Notes", "Tasks", "Meetings"]
+        record = await get_account_data(req.entity_id, token, related_modules_to_fetch=target_modules)
+
+        if not record:
+            raise HTTPException(status_code=404, detail="Account not found in CRM")
+
+        # 3. Convert Data to Text, keeping the sections most relevant to the scan within the token budget
+        text_data = await run_cpu_bound(build_record_context, record, SCAN_FOCUS, req.entity_id)
+
+        # Unchanged record since an earlier scan: reuse its recommendations
+        cache_key = answer_cache_key("scan", req.entity_id, text_data)
+        cached = get_cached_answer(cache_key)
+        if cached is not None:
+            print("Answer cache hit")
+            return ScanResponse(**cached, cached=True)
+
+        # 4. Generate Proactive Recommendations
+        # Identical concurrent scans share one Gemini call
+        async def generate() -> dict:
+            payload = await generate_scan_recommendations(text_data)
+            store_answer(cache_key, payload)
+            return payload
+
+        return ScanResponse(**await answer_flights.do(cache_key, generate))
     
     except HTTPException:
         # Re-raise HTTPException to preserve status codes (404, 500, etc.)
         raise
+    except LLMOverloaded as e:
+        raise llm_overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing scan request: {str(e)}")
 
 
-@app.post("/upload")
+@app.post("/upload", status_code=202)
 async def upload_document(
     entity_id: str = Form(...),
     entity_type: str = Form("Accounts"),
@@ -449,7 +829,8 @@ async def upload_document(
 ):
     """
     PRIORITY 1 FIX: Upload endpoint for document ingestion into the vectorstore.
-    Processes the file and adds it to the RAG context for the entity.
+    Queues the file for background ingestion into the entity's document index
+    and returns a job ID to poll at GET /upload/{job_id}.
     """
     # For now, we support Accounts only
     if entity_type != "Accounts":
@@ -458,81 +839,32 @@ async def upload_document(
             detail=f"Entity type '{entity_type}' not yet supported. Currently only 'Accounts' is supported."
         )
     
+    # Bug fix: Check if filename is None before string operations
+    if file.filename is None:
+        raise HTTPException(status_code=400, detail="File filename is missing")
+
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Basic file processing - extract text
-        # For text files, decode directly
-        # Bug fix: Check if filename is None before string operations
-        if file.filename is None:
-            raise HTTPException(status_code=400, detail="File filename is missing")
-        
-        file_ext = file.filename.split(".")[-1].lower() if "." in file.filename else ""
-        
-        if file_ext in ["txt", "text", "md", "markdown"]:
-            try:
-                text = file_content.decode("utf-8", errors="ignore")
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error decoding text file: {e}")
-        elif file_ext == "pdf":
-            try:
-                import PyPDF2
-                from io import BytesIO
-                pdf_file = BytesIO(file_content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text_parts = [page.extract_text() for page in pdf_reader.pages]
-                text = "\n".join(text_parts)
-            except ImportError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="PDF processing requires PyPDF2. Install with: pip install PyPDF2"
-                )
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error processing PDF: {e}")
-        elif file_ext in ["docx", "doc"]:
-            try:
-                from docx import Document as DocxDocument
-                from io import BytesIO
-                docx_file = BytesIO(file_content)
-                doc = DocxDocument(docx_file)
-                text_parts = [paragraph.text for paragraph in doc.paragraphs]
-                text = "\n".join(text_parts)
-            except ImportError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="DOCX processing requires python-docx. Install with: pip install python-docx"
-                )
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Error processing DOCX: {e}")
-        else:
-            # Try to decode as text
-            try:
-                text = file_content.decode("utf-8", errors="ignore")
-            except Exception:
-                raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_ext}")
-        
-        # Note: In a production system, you would:
-        # 1. Store files in persistent storage (S3, etc.)
-        # 2. Process and chunk the document
-        # 3. Add to a persistent vectorstore (Pinecone, Weaviate, etc.)
-        # 4. Associate with entity_id for retrieval in future queries
-        # 
-        # For this implementation, we process the document and return success.
-        # The actual vectorstore persistence would be implemented based on your
-        # chosen vector database solution.
-        
-        # Count approximate chunks (simple split by paragraphs)
-        chunks = [chunk for chunk in text.split("\n\n") if chunk.strip()]
-        
+        # Copy the upload to disk in fixed-size blocks instead of reading it into memory
+        try:
+            path, size_bytes, content_hash = await ingestion_workers.spool(file)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        # Extraction, chunking and embedding run on the ingestion workers; whether
+        # the content was reused is only known from the job's result
+        job_id = await run_cpu_bound(
+            ingestion_workers.submit, entity_id, entity_type, file.filename, path, size_bytes, content_hash
+        )
+
         return {
             "success": True,
-            "message": f"Document '{file.filename}' processed successfully for {entity_type} {entity_id}",
+            "message": f"Document '{file.filename}' accepted for processing for {entity_type} {entity_id}",
+            "job_id": job_id,
+            "status": "queued",
             "entity_id": entity_id,
             "entity_type": entity_type,
             "filename": file.filename,
-            "chunks_created": len(chunks),
-            "text_length": len(text)
+            "content_hash": content_hash,
         }
     
     except HTTPException:
@@ -541,10 +873,43 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
 
+@app.get("/upload/{job_id}")
+async def upload_status(job_id: str):
+    """Progress and chunk counts of an upload job."""
+    # SQLite read; kept off the event loop like the rest of the upload path
+    job = await run_cpu_bound(ingestion_workers.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job_status(job)
+
+
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint. `embeddings_ready` is false until the embedding model is loaded."""
+    return {"status": "healthy", "embeddings_ready": embeddings_ready()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Cache counters for sizing and monitoring."""
+    return {
+        "record_cache": record_cache.stats(),
+        "context_paths": retrieval_stats(),
+        "entity_indexes": entity_indexes.stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "prefetch": prefetch_stats(),
+        "answer_cache": answer_cache.stats(),
+        "chat_paths": dict(chat_path_counts),
+        "render_cache": render_cache_stats(),
+        "documents": document_stats(),
+        "ingestion": ingestion_workers.stats(),
+        "pdf_extraction": pdf_extraction_stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "coalescing": {
+            "answers": answer_flights.stats(),
+            "zoho_fetches": zoho_fetches.stats(),
+        },
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+"""
+Local module router.
+Picks the Zoho CRM related modules needed to answer a question using keyword
+rules and MiniLM similarity against precomputed module descriptions, so most
+queries are routed in milliseconds without an LLM call.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vectorstore_runtime import get_embeddings
+
+# Below this confidence the caller should fall back to the LLM router
+MODULE_ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("MODULE_ROUTER_CONFIDENCE_THRESHOLD", "0.45"))
+
+# Modules within this similarity of the best match are also selected
+MODULE_ROUTER_SIMILARITY_MARGIN = float(os.getenv("MODULE_ROUTER_SIMILARITY_MARGIN", "0.05"))
+
+SUMMARY_MODULES = ["Contacts", "Deals", "Notes"]
+
+SUMMARY_KEYWORDS = ["summary", "summarise", "summarize", "overview", "tell me about", "brief me", "profile"]
+
+# Module API name -> (description used for embeddings, keyword/synonym rules)
+MODULE_DESCRIPTIONS: Dict[str, Tuple[str, List[str]]] = {
+    "Contacts": (
+        "People linked to the client: family members, spouse, partner, children, their phone numbers, emails and addresses",
+        ["contact", "people", "person", "member", "spouse", "partner", "wife", "husband", "child", "children", "family",
+         "phone", "mobile", "email", "address"],
+    ),
+    "Deals": (
+        "Sales opportunities and deals in the pipeline, their stage, amount and closing date",
+        ["deal", "opportunity", "opportunities", "pipeline", "sale", "stage", "closing"],
+    ),
+    "Notes": (
+        "Notes and comments written about the client, history of discussions and latest updates",
+        ["note", "comment", "remark", "history", "discussion", "latest update"],
+    ),
+    "Tasks": (
+        "Tasks, to-dos and follow-ups with due dates and status, including overdue items",
+        ["task", "todo", "to-do", "to do", "follow up", "follow-up", "overdue", "reminder", "pending"],
+    ),
+    "Meetings": (
+        "Meetings, appointments and scheduled calls or reviews with the client",
+        ["meeting", "appointment", "calendar", "catch up", "catch-up", "scheduled call"],
+    ),
+    "Attachments": (
+        "Files, documents and attachments uploaded against the account",
+        ["attachment", "file", "document", "pdf", "upload"],
+    ),
+    "Household_to_Household_N": (
+        "Links between this household and other related households",
+        ["other household", "linked household", "related household", "households"],
+    ),
+    "Client_Household_Roles_N": (
+        "Roles each client plays in the household, such as head of household or dependant",
+        ["household role", "head of household", "dependant", "dependent", "role"],
+    ),
+    "Client_to_Client_Realtion": (
+        "Relationships between individual clients, who is related to whom",
+        ["relationship", "related to", "connection", "relation"],
+    ),
+    "Professional_Contacts_New": (
+        "Professional contacts and employment: accountant, lawyer, solicitor, financial adviser, employer, job and occupation",
+        ["accountant", "lawyer", "solicitor", "adviser", "advisor", "professional", "employer", "job", "occupation", "work"],
+    ),
+    "Liabilites_New": (
+        "Liabilities and debts: mortgages, loans, credit cards and outstanding balances owed",
+        ["debt", "liability", "liabilities", "mortgage", "credit card", "owe", "owing", "borrowing", "loan balance"],
+    ),
+    "Expenses_New": (
+        "Expenses, living costs, spending, bills and budget outgoings",
+        ["expense", "spending", "spend", "cost", "outgoing", "bill", "budget"],
+    ),
+    "Income_Profile_New": (
+        "Income profile: salary, wages, earnings, dividends and other sources of money coming in",
+        ["income", "salary", "wage", "earning", "pay", "money", "dividend", "cash flow", "cashflow"],
+    ),
+    "Asset_Ownership_New": (
+        "Assets owned: property, houses, shares, superannuation, savings, net worth and wealth",
+        ["asset", "property", "properties", "house", "home", "shares", "super", "superannuation", "savings", "net worth", "wealth"],
+    ),
+    "Insurance_Policies_New": (
+        "Insurance policies held: life, income protection, health and general cover, premiums and insurers",
+        ["insurance", "policy", "policies", "cover", "premium", "insurer"],
+    ),
+    "Insurance_Policy_Holder_N": (
+        "Who holds or is insured under each insurance policy",
+        ["policy holder", "policyholder", "insured person", "life insured"],
+    ),
+    "Policy_Renewals_New": (
+        "Upcoming insurance policy renewals and expiry dates",
+        ["renewal", "renew", "expiry", "expiring", "expire"],
+    ),
+    "Policy_Benefits": (
+        "Benefits paid by insurance policies: sums insured, payouts and coverage amounts",
+        ["benefit", "sum insured", "payout", "coverage amount"],
+    ),
+    "Associated_portfolios": (
+        "Investment portfolios, holdings, funds and their performance",
+        ["portfolio", "investment", "holding", "fund", "performance"],
+    ),
+    "Tax_profile": (
+        "Tax profile: tax file number, tax bracket, tax residency and deductions",
+        ["tax", "tfn", "deduction", "residency"],
+    ),
+    "Loan_Applications": (
+        "Loan and lending applications submitted for the client and their status",
+        ["loan application", "apply for a loan", "lending", "finance application", "loan"],
+    ),
+}
+
+
+def _compile_keyword_pattern(keywords: List[str]) -> "re.Pattern":
+    # Allow simple plurals so "policies", "deals", "tasks" match their stems
+    alternatives = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})(?:s|es)?\b", re.IGNORECASE)
+
+
+_KEYWORD_PATTERNS = {
+    module: _compile_keyword_pattern(keywords)
+    for module, (_, keywords) in MODULE_DESCRIPTIONS.items()
+}
+_SUMMARY_PATTERN = _compile_keyword_pattern(SUMMARY_KEYWORDS)
+
+_module_names: List[str] = list(MODULE_DESCRIPTIONS)
+_module_vectors: Optional[np.ndarray] = None
+_vectors_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _get_module_vectors() -> np.ndarray:
+    """Embeds the module descriptions once per process."""
+    global _module_vectors
+    if _module_vectors is None:
+        with _vectors_lock:
+            if _module_vectors is None:
+                texts = [
+                    f"{module.replace('_', ' ')}: {description}"
+                    for module, (description, _) in MODULE_DESCRIPTIONS.items()
+                ]
+                vectors = np.asarray(get_embeddings().embed_documents(texts), dtype=np.float32)
+                _module_vectors = _normalize(vectors)
+    return _module_vectors
+
+
+def warm_up_router() -> None:
+    """Precomputes the module description embeddings."""
+    try:
+        _get_module_vectors()
+    except Exception as e:
+        print(f"Module router warm-up failed: {e}")
+
+
+def match_keywords(user_query: str) -> List[str]:
+    """
+    Returns the modules whose keyword rules match the query, in module order.
+    """
+    return [module for module, pattern in _KEYWORD_PATTERNS.items() if pattern.search(user_query)]
+
+
+def rank_by_similarity(user_query: str) -> List[Tuple[str, float]]:
+    """
+    Ranks modules by cosine similarity between the query and module descriptions.
+
+    Returns:
+        List of (module, similarity) pairs, best first.
+    """
+    query_vector = np.asarray(get_embeddings().embed_query(user_query), dtype=np.float32)
+    scores = _get_module_vectors() @ _normalize(query_vector)
+    order = np.argsort(-scores)
+    return [(_module_names[i], float(scores[i])) for i in order]
+
+
+def route_modules(user_query: str) -> Tuple[List[str], float]:
+    """
+    Picks related modules for a query without calling the LLM.
+
+    Keyword and summary rules are treated as fully confident. Otherwise the
+    best-matching module descriptions are chosen and the top similarity is
+    returned as the confidence.
+
+    Args:
+        user_query: The user's question
+
+    Returns:
+        (modules, confidence) where confidence is between 0 and 1.
+    """
+    keyword_modules = match_keywords(user_query)
+    if keyword_modules:
+        return keyword_modules, 1.0
+
+    if _SUMMARY_PATTERN.search(user_query):
+        return list(SUMMARY_MODULES), 1.0
+
+    try:
+        ranked = rank_by_similarity(user_query)
+    except Exception as e:
+        print(f"Local router embedding error: {e}")
+        return [], 0.0
+
+    best_score = ranked[0][1]
+    modules = [
+        module for module, score in ranked
+        if score >= best_score - MODULE_ROUTER_SIMILARITY_MARGIN
+    ]
+    return modules, best_score
@@ -0,0 +1,248 @@
+"""
+Parallel PDF text extraction.
+PyPDF2 extracts text in pure Python, one page at a time on one core. For a
+spooled PDF the pages are split into shards of consecutive pages, extracted on
+a pool of worker processes and yielded back in page order. Only a few shards
+are in flight at once, so memory stays bounded however many pages the file
+has. A per-page timer in the workers skips pages that take too long, and a
+deadline per shard fails the job (and replaces the pool) if a worker hangs
+where the timer cannot reach it.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Worker processes extracting PDF pages; 0 extracts in the calling thread
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Consecutive pages extracted per task
+PDF_PAGES_PER_SHARD = int(os.getenv("PDF_PAGES_PER_SHARD", "16"))
+
+# Seconds a single page may take before it is skipped (left empty)
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))
+
+# Shards queued or running per document, per worker process
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+# Seconds a shard may take beyond PDF_PAGE_TIMEOUT per page (worker start-up, queueing)
+SHARD_TIMEOUT_MARGIN = 60.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+class _PageTimeout(BaseException):
+    # Not an Exception, so PyPDF2's own error handling cannot swallow it
+    pass
+
+
+def _on_alarm(signum, frame) -> None:
+    raise _PageTimeout()
+
+
+# Per worker process: the file and reader of the last document it worked on, so
+# later shards of the same document skip parsing the xref table and page tree again
+_open_document: Dict[str, Any] = {}
+_open_document_lock = threading.Lock()
+
+# Seconds between checks in each worker for a cached document to close
+DOCUMENT_CHECK_INTERVAL = 1.0
+
+# A cached document unused for this many seconds is closed even if its file still exists
+DOCUMENT_IDLE_SECONDS = 30.0
+
+
+def _reader_for(path: str):
+    import PyPDF2
+
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if _open_document.get("key") != key:
+        _close_document()
+        f = open(path, "rb")
+        _open_document.update(key=key, file=f, reader=PyPDF2.PdfReader(f))
+    return _open_document["reader"]
+
+
+def _close_document() -> None:
+    if "file" in _open_document:
+        _open_document["file"].close()
+    _open_document.clear()
+
+
+def _close_finished_documents() -> None:
+    # Only the worker that runs a document's last shard closes it there; the
+    # others close it here once the job has deleted the spool file, or once it
+    # has gone unused, so no worker keeps a deleted file's space allocated
+    while True:
+        time.sleep(DOCUMENT_CHECK_INTERVAL)
+        with _open_document_lock:
+            f = _open_document.get("file")
+            if f is None:
+                continue
+            idle = time.monotonic() - _open_document["used_at"] > DOCUMENT_IDLE_SECONDS
+            if idle or os.fstat(f.fileno()).st_nlink == 0:
+                _close_document()
+
+
+def _init_worker() -> None:
+    threading.Thread(target=_close_finished_documents, name="pdf-document-closer", daemon=True).start()
+
+
+def _extract_pages(path: str, start: int, end: int, page_timeout: float, last: bool) -> List[Optional[str]]:
+    """
+    Runs in a worker process: extracts pages [start, end) of the PDF at path.
+    A page that takes longer than page_timeout seconds comes back as None.
+    The file is closed after the document's last shard (by this worker) or
+    once it is deleted or idle (by the others, see _close_finished_documents).
+    """
+    # Worker processes run tasks on their main thread, so an interval timer can interrupt PyPDF2
+    use_timer = page_timeout > 0 and hasattr(signal, "setitimer")
+    if use_timer:
+        signal.signal(signal.SIGALRM, _on_alarm)
+    texts: List[Optional[str]] = []
+    with _open_document_lock:
+        pdf_reader = _reader_for(path)
+        for i in range(start, end):
+            # Look the page up before the timer starts; an interrupted lookup would
+            # leave PyPDF2's page list half built for the pages after it
+            page = pdf_reader.pages[i]
+            if use_timer:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                texts.append(page.extract_text() or "")
+            except _PageTimeout:
+                texts.append(None)
+            finally:
+                if use_timer:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            # PyPDF2 keeps every object it has parsed; drop them so memory stays per page
+            pdf_reader.resolved_objects.clear()
+        _open_document["used_at"] = time.monotonic()
+        if last:
+            _close_document()
+    return texts
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Returns the shared extraction pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the server process runs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, PDF_EXTRACT_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor, terminate: bool = False) -> None:
+    # A worker died (e.g. killed for memory) or hung; the next document gets a fresh pool
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # shutdown() forgets the worker processes, so take them first
+    processes = list((getattr(pool, "_processes", None) or {}).values()) if terminate else []
+    pool.shutdown(wait=False, cancel_futures=True)
+    # A hung worker never picks up the shutdown; stop it instead of leaving it running
+    for process in processes:
+        process.terminate()
+
+
+def _page_count(path: str) -> int:
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def iter_pdf_pages_parallel(path: str) -> Iterator[Tuple[str, float]]:
+    """
+    Extracts the text of a PDF on disk on the process pool.
+
+    Yields:
+        (page text, fraction of pages done) in page order; pages after the
+        first start with a newline, as in the serial extractor. Pages that
+        time out yield "".
+
+    Raises:
+        TimeoutError: If a shard does not come back within PDF_PAGE_TIMEOUT
+            per page plus SHARD_TIMEOUT_MARGIN (a page stuck where the
+            worker's timer cannot interrupt it); the pool is replaced
+    """
+    page_count = _page_count(path)
+    if not page_count:
+        return
+    workers = max(1, PDF_EXTRACT_WORKERS)
+    # Small documents are still spread over every worker
+    shard_size = max(1, min(PDF_PAGES_PER_SHARD, -(-page_count // workers)))
+    shards = iter(range(0, page_count, shard_size))
+    pool = get_pdf_pool()
+    pending: Deque[Tuple[int, int, Future]] = deque()
+
+    def submit_next() -> None:
+        start = next(shards, None)
+        if start is not None:
+            end = min(start + shard_size, page_count)
+            pending.append((start, end, pool.submit(_extract_pages, path, start, end, PDF_PAGE_TIMEOUT, end == page_count)))
+
+    done = timed_out = 0
+    try:
+        for _ in range(workers * SHARDS_IN_FLIGHT_PER_WORKER):
+            submit_next()
+        while pending:
+            start, end, future = pending.popleft()
+            # The worker's timer only covers text extraction; this bounds the whole shard
+            deadline = (end - start) * PDF_PAGE_TIMEOUT + SHARD_TIMEOUT_MARGIN if PDF_PAGE_TIMEOUT > 0 else None
+            try:
+                texts = future.result(timeout=deadline)
+            except FutureTimeout:
+                with _counters_lock:
+                    _counters["shards_timed_out"] += 1
+                _discard_pool(pool, terminate=True)
+                raise TimeoutError(f"pages {start + 1}-{end} did not finish within {deadline:.0f}s")
+            submit_next()
+            for offset, text in enumerate(texts):
+                page = start + offset
+                if text is None:
+                    timed_out += 1
+                    print(f"PDF page {page + 1} of {os.path.basename(path)} timed out after {PDF_PAGE_TIMEOUT}s; skipped")
+                    text = ""
+                done += 1
+                yield ("\n" if page else "") + text, (page + 1) / page_count
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # Stop queued shards if the consumer gave up early
+        for _, _, future in pending:
+            future.cancel()
+        with _counters_lock:
+            _counters["documents"] += 1
+            _counters["pages"] += done
+            _counters["pages_timed_out"] += timed_out
+
+
+def pdf_extraction_stats() -> Dict[str, int]:
+    with _counters_lock:
+        return {"workers": PDF_EXTRACT_WORKERS, **_counters}
+
+
+def shutdown_pdf_pool() -> None:
+    """Stops the pool's worker processes; queued shards are cancelled."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
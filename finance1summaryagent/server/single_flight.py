@@ -0,0 +1,53 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight call instead of
+each repeating the same Zoho fetch or Gemini generation.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers that arrive while a call
+    for their key is running await its result (or exception) instead.
+
+    The shared call runs as its own task, so a caller that disconnects or is
+    cancelled does not cancel the work the others are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._counters = {"executed": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of func(), shared with concurrent callers using the same key.
+
+        Args:
+            key: Identifies identical work
+            func: Zero-argument coroutine function doing the work
+
+        Returns:
+            The (possibly shared) result. Callers must not mutate it.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["executed"] += 1
+            task = asyncio.get_running_loop().create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "in_flight": len(self._inflight)}
@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+import pytest
+from langchain.embeddings.base import Embeddings
+
+# Tests import the server modules the way main.py does, from the server directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The document registry opens its database on import; keep it out of the server directory
+os.environ.setdefault("DOCUMENT_REGISTRY_DB", os.path.join(tempfile.mkdtemp(), "document_registry.sqlite3"))
+# Likewise for main: a Gemini key (never used, the model is faked), the job store and no embedding cache file
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("INGESTION_JOB_DB", os.path.join(tempfile.mkdtemp(), "ingestion_jobs.sqlite3"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+
+class FakeEmbeddings(Embeddings):
+    """Bag-of-words vectors, counting the texts it embeds."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(64)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch, tmp_path):
+    """Indexes are created under a temporary directory and embedded with FakeEmbeddings."""
+    import entity_index
+
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(entity_index, "VECTOR_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(entity_index, "get_embeddings", lambda: embeddings)
+    return embeddings
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for the Gemini model; `reply` is returned whole, `stream` piece by piece."""
+
+    def __init__(self):
+        self.prompts: List[str] = []
+        self.reply = '{"response": "From Gemini", "actions": []}'
+        self.stream = ["From ", "Gemini"]
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.prompts.append(prompt)
+        if not stream:
+            return FakeResponse(self.reply)
+
+        async def pieces():
+            for piece in self.stream:
+                yield FakeResponse(piece)
+
+        return pieces()
+
+
+@pytest.fixture
+def chat_app(monkeypatch, fake_embeddings):
+    """
+    main.app with Zoho and Gemini faked. `record` is what Zoho returns (with
+    `routed` as the router's answer), `model` records the prompts it gets, and
+    `request(method, path, **kwargs)` sends a request through the app in-process.
+    """
+    import httpx
+    import main
+
+    app = SimpleNamespace(record={"id": "A1", "Account_Name": "Acme", "Phone": "555"}, routed=[], model=FakeModel())
+
+    async def get_access_token():
+        return "token"
+
+    async def identify_relevant_modules(query):
+        return app.routed
+
+    async def get_account_data_with_prefetch(account_id, token, route, shortcut=None):
+        record = copy.deepcopy(app.record)
+        if shortcut is not None and shortcut(record):
+            route.close()
+            return record
+        await route
+        return record
+
+    async def request(method, path, **kwargs):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    monkeypatch.setattr(main, "model", app.model)
+    monkeypatch.setattr(main, "get_access_token", get_access_token)
+    monkeypatch.setattr(main, "identify_relevant_modules", identify_relevant_modules)
+    monkeypatch.setattr(main, "get_account_data_with_prefetch", get_account_data_with_prefetch)
+    main.answer_cache.clear()
+    app.request = request
+    yield app
+    main.answer_cache.clear()
@@ -0,0 +1,48 @@
+import asyncio
+
+from answer_cache import answer_cache_key, normalize_query
+
+
+def _chat(chat_app, query="Summarise the account"):
+    response = asyncio.run(chat_app.request("POST", "/chat", json={"entity_id": "A1", "query": query}))
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_key_ignores_case_and_punctuation_but_not_context():
+    assert normalize_query("  What's   the RISK?? ") == "what s the risk"
+    assert answer_cache_key("chat", "A1", "ctx", "Any risk?") == answer_cache_key("chat", "A1", "ctx", "any risk")
+    assert answer_cache_key("chat", "A1", "ctx", "any risk") != answer_cache_key("chat", "A1", "ctx 2", "any risk")
+    assert answer_cache_key("chat", "A1", "ctx") != answer_cache_key("scan", "A1", "ctx")
+
+
+def test_repeated_question_is_answered_from_the_cache(chat_app):
+    first = _chat(chat_app)
+    second = _chat(chat_app, "summarise the account!")
+    assert first["cached"] is False and second["cached"] is True
+    assert second["response"] == first["response"] == "From Gemini"
+    assert len(chat_app.model.prompts) == 1
+
+
+def test_changed_record_invalidates_the_cached_answer(chat_app):
+    _chat(chat_app)
+    chat_app.record["Phone"] = "556"
+    chat_app.model.reply = '{"response": "Updated", "actions": []}'
+
+    answer = _chat(chat_app)
+    assert answer == {"response": "Updated", "actions": None, "cached": False}
+    assert len(chat_app.model.prompts) == 2 and "556" in chat_app.model.prompts[1]
+
+    # The new answer is now the cached one for this record
+    assert _chat(chat_app)["cached"] is True and len(chat_app.model.prompts) == 2
+
+
+def test_streamed_question_is_replayed_from_the_cache(chat_app):
+    chat_app.model.stream = ["Cached ", "answer"]
+    for _ in range(2):
+        response = asyncio.run(
+            chat_app.request("POST", "/chat/stream", json={"entity_id": "A1", "query": "summarise the account"})
+        )
+    assert response.text.startswith('event: token\ndata: {"text": "Cached answer"}\n\n')
+    assert response.text.endswith('event: done\ndata: {"cached": true}\n\n')
+    assert len(chat_app.model.prompts) == 1
@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+import main
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def _stream(chat_app, query="summarise the account"):
+    response = asyncio.run(chat_app.request("POST", "/chat/stream", json={"entity_id": "A1", "query": query}))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+
+def test_marker_split_across_chunks_is_never_sent_as_text(chat_app):
+    action = {"label": "Update Status", "type": "UPDATE_FIELD", "field": "Status", "value": "Active"}
+    marker = main.ACTIONS_MARKER
+    chat_app.model.stream = ["The account ", "is fine.\n<<", marker[2:7], marker[7:] + "\n[", json.dumps(action) + "]"]
+
+    events = _stream(chat_app)
+    names = [name for name, _ in events]
+    assert names[-2:] == ["actions", "done"] and set(names[:-2]) == {"token"}
+    text = "".join(data["text"] for name, data in events if name == "token")
+    assert text == "The account is fine.\n"
+    assert events[-2][1] == {"actions": [{**action, "zohoAction": None}]}
+    assert events[-1][1] == {"cached": False}
+
+
+def test_text_that_only_resembles_the_marker_is_forwarded(chat_app):
+    chat_app.model.stream = ["Compare <<", "<A and B>>>", " done"]
+
+    events = _stream(chat_app)
+    assert "".join(data["text"] for name, data in events if name == "token") == "Compare <<<A and B>>> done"
+    assert events[-2:] == [("actions", {"actions": []}), ("done", {"cached": False})]
+
@@ -0,0 +1,75 @@
+from context_builder import estimate_tokens, select_context
+from crm_to_text import crm_record_to_chunks, crm_record_to_text, related_modules
+from entity_index import entity_indexes
+
+
+def _record(notes=5, deals=5, subform=True):
+    record = {"id": "A1", "Account_Name": "Acme", "Phone": "555"}
+    if subform:
+        record["Beneficiaries"] = [{"Name": f"Person {i}", "Share": 10} for i in range(3)]
+    if notes is not None:
+        record["Related_Notes"] = [
+            {"id": f"n{i}", "Note_Title": f"note {i}", "Note_Content": "renewal premium " * 40} for i in range(notes)
+        ]
+    if deals is not None:
+        record["Related_Deals"] = [{"id": f"d{i}", "Deal_Name": f"deal {i}", "Stage": "Won " * 40} for i in range(deals)]
+    return record
+
+
+def _select(record, entity_id):
+    return select_context(
+        crm_record_to_text(record), "premium", entity_id,
+        chunks=crm_record_to_chunks(record), budget=100, related_modules=related_modules(record),
+    )
+
+
+def _modules(entity_id):
+    return sorted({entry["module"] for entry in entity_indexes.get(entity_id).manifest.values()})
+
+
+def test_sync_deletes_chunks_of_emptied_modules(fake_embeddings):
+    assert _select(_record(), "CB1").mode == "retrieval"
+    assert _modules("CB1") == ["Beneficiaries", "Deals", "Notes"]
+
+    # Notes fetched but now empty, the subform cleared, Deals not fetched for this question
+    _select(_record(notes=0, deals=None, subform=False) | {"Related_Tasks": [{"id": "t1", "Subject": "call " * 200}]}, "CB1")
+    assert _modules("CB1") == ["Deals", "Tasks"]
+
+
+def test_empty_related_lists_are_not_rendered():
+    text = crm_record_to_text(_record(notes=0, deals=None, subform=False))
+    assert "Notes" not in text
+    assert "No related records found." in text
+
+
+def test_small_record_is_passed_through_without_an_index(monkeypatch):
+    def no_index(*args, **kwargs):
+        raise AssertionError("no index should be built for a record that fits the budget")
+
+    monkeypatch.setattr("context_builder.create_vectorstore", no_index)
+    monkeypatch.setattr("context_builder.entity_indexes.pinned", no_index)
+    record = _record(notes=1, deals=1, subform=False)
+    text = crm_record_to_text(record)
+
+    selection = select_context(text, "premium", "CB2", chunks=crm_record_to_chunks(record), budget=10_000)
+    assert selection.mode == "passthrough" and selection.text == text
+    assert selection.tokens_used == estimate_tokens(text) and selection.tokens_dropped == 0
+
+
+def test_budget_keeps_fields_and_newest_notes(fake_embeddings):
+    record = {"id": "A1", "Account_Name": "Acme", "Phone": "555", "Related_Notes": [
+        {"id": f"n{i}", "Note_Title": f"note {i}", "Note_Content": f"premium {i} " * 40, "Modified_Time": f"2024-01-0{i}T10:00:00+00:00"}
+        for i in range(1, 6)
+    ]}
+    chunks = crm_record_to_chunks(record)
+    note_tokens = estimate_tokens(chunks[1]["text"])
+    budget = estimate_tokens(chunks[0]["text"]) + 2 * note_tokens
+
+    selection = select_context(
+        crm_record_to_text(record), "premium", "CB3", chunks=chunks, budget=budget, related_modules={"Notes"}
+    )
+    assert selection.mode == "retrieval" and selection.tokens_used <= budget
+    assert selection.text.startswith("=== ACCOUNT DETAILS ===")
+    assert [n for n in range(1, 6) if f"note {n}" in selection.text] == [4, 5]
+    assert (selection.sections_included, selection.sections_truncated, selection.sections_dropped) == (1, 1, 0)
+    assert selection.tokens_dropped == 3 * note_tokens
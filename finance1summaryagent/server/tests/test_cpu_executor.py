@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cpu_executor import run_cpu_bound
+
+
+def test_work_runs_on_cpu_threads_while_the_loop_keeps_serving():
+    def work(delay, scale=1):
+        time.sleep(delay)
+        return threading.current_thread().name, scale * 2
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        result = await run_cpu_bound(work, 0.1, scale=21)
+        ticking.cancel()
+        return result, ticks
+
+    (thread_name, value), ticks = asyncio.run(run())
+    assert thread_name.startswith("cpu") and value == 42
+    # The loop kept running other tasks while the work slept
+    assert ticks >= 5
+
+
+def test_errors_reach_the_caller():
+    def fail():
+        raise ValueError("bad record")
+
+    with pytest.raises(ValueError, match="bad record"):
+        asyncio.run(run_cpu_bound(fail))
@@ -0,0 +1,71 @@
+import copy
+
+from crm_to_text import crm_record_to_chunks, crm_record_to_text, render_cache
+
+
+def _record():
+    owner = {"name": "Jane Adviser", "id": "u1"}
+    return {
+        "id": "A1",
+        "Account_Name": "Acme",
+        "Related_Deals": [
+            {"id": "d1", "Deal_Name": "Review", "Stage": "Proposal", "Amount": 5000, "Contact_Name": owner, "Type": "New"},
+            {"id": "d2", "Deal_Name": "Renewal", "Stage": "Closed Won", "Amount": None, "Contact_Name": owner, "Type": "New"},
+        ],
+        "Related_Notes": [{"id": "n1", "Note_Title": "Call", "Note_Content": "Line one\nline | two"}],
+    }
+
+
+def test_table_states_shared_columns_once():
+    text = crm_record_to_text(_record(), related_format="table")
+    assert "  All: Contact_Name: Jane Adviser; Type: New\n  Deal_Name | Stage | Amount\n" in text
+    assert "  Review | Proposal | 5000\n  Renewal | Closed Won | -" in text
+    # A single row keeps every column in the table
+    assert "  Note_Title | Note_Content\n  Call | Line one line / two" in text
+
+
+def test_table_is_smaller_than_list_and_keeps_values():
+    record = _record()
+    table = crm_record_to_text(record, related_format="table")
+    listed = crm_record_to_text(record, related_format="list")
+    assert len(table) < len(listed)
+    for value in ["Review", "Renewal", "Proposal", "Closed Won", "5000", "Call"]:
+        assert value in table
+
+
+def test_chunks_follow_sections_with_stable_keys():
+    record = _record()
+    record["Beneficiaries"] = [{"Name": "Sam", "Share": 100}]
+    chunks = crm_record_to_chunks(record)
+    keys = [c["metadata"]["chunk_key"] for c in chunks]
+    assert keys == ["fields:0", "subform:Beneficiaries", "related:Deals:d1", "related:Deals:d2", "related:Notes:n1"]
+    assert [c["metadata"]["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert "Deal_Name: Review" in chunks[2]["text"] and chunks[2]["metadata"]["record_id"] == "d1"
+
+    # A new record shifts positions but leaves the other chunks' keys and text alone
+    record["Related_Deals"].insert(0, {"id": "d0", "Deal_Name": "Intro"})
+    moved = {c["metadata"]["chunk_key"]: c["text"] for c in crm_record_to_chunks(record)}
+    assert all(moved[c["metadata"]["chunk_key"]] == c["text"] for c in chunks)
+
+
+def test_unchanged_sections_are_served_from_the_render_cache():
+    render_cache.clear()
+    record = _record()
+    cold = crm_record_to_text(record, related_format="table")
+    before = render_cache.stats()
+
+    assert crm_record_to_text(copy.deepcopy(record), related_format="table") == cold
+    warm = render_cache.stats()
+    assert (warm["hits"] - before["hits"], warm["misses"] - before["misses"]) == (3, 0)
+
+    # Only the changed related list is rendered again, and the change shows
+    record["Related_Deals"][0]["Stage"] = "Closed Lost"
+    changed = crm_record_to_text(record, related_format="table")
+    after = render_cache.stats()
+    assert (after["hits"] - warm["hits"], after["misses"] - warm["misses"]) == (2, 1)
+    assert "Closed Lost" in changed and changed != cold
+
+    # Each format has its own entries for the related lists
+    assert "  1. Record\n     [Deal_Name: Review, Stage: Closed Lost" in crm_record_to_text(record, related_format="list")
+    listed = render_cache.stats()
+    assert (listed["hits"] - after["hits"], listed["misses"] - after["misses"]) == (1, 2)
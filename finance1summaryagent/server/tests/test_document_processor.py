@@ -0,0 +1,61 @@
+import io
+
+import docx
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from document_processor import chunk_text, chunk_text_stream, extract_text_from_file
+
+
+def _blocks(text, size=500):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_stream_matches_whole_text():
+    text = "\n\n".join(f"Paragraph {i}: " + "premium balance renewal " * 20 for i in range(60))
+    assert list(chunk_text_stream(_blocks(text))) == chunk_text(text)
+
+
+def test_stream_skips_whitespace_only_buffer():
+    # A full buffer of blank lines splits into no chunks at all
+    text = "\n" * 70000 + "Policy renewed on 2024-01-01. " * 100
+    assert list(chunk_text_stream(_blocks(text))) == chunk_text(text)
+
+
+def test_stream_of_only_whitespace_yields_nothing():
+    assert list(chunk_text_stream(_blocks(" \n" * 20000))) == []
+
+
+def _docx_fixture():
+    # Body paragraphs covering what a hand-rolled reader can get wrong, next to plain ones
+    document = docx.Document()
+    document.add_paragraph("Policy schedule")
+    body = document.element.body
+    for xml in [
+        # Tab stop definitions, tab, line break, page break, carriage return and a non-breaking hyphen
+        '<w:p {}><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>'
+        '<w:r><w:t>Premium</w:t><w:tab/><w:t xml:space="preserve">1,200 </w:t><w:br/><w:t>due</w:t>'
+        '<w:br w:type="page"/><w:cr/><w:t>2024</w:t><w:noBreakHyphen/><w:t>01</w:t></w:r></w:p>',
+        # Hyperlink text
+        '<w:p {}><w:r><w:t xml:space="preserve">See </w:t></w:r>'
+        '<w:hyperlink><w:r><w:t>terms</w:t></w:r></w:hyperlink></w:p>',
+        # A text box anchored in a run
+        '<w:p {}><w:r><w:t>Anchor</w:t><w:drawing><w:txbxContent><w:p><w:r><w:t>Boxed</w:t></w:r></w:p>'
+        '</w:txbxContent></w:drawing></w:r></w:p>',
+        # Tracked insertion and a table (whose cells are not body paragraphs)
+        '<w:p {}><w:ins><w:r><w:t>Inserted</w:t></w:r></w:ins><w:r><w:t>Kept</w:t></w:r></w:p>',
+        '<w:tbl {}><w:tr><w:tc><w:p><w:r><w:t>Cell</w:t></w:r></w:p></w:tc></w:tr></w:tbl>',
+    ]:
+        body.insert(len(body) - 1, parse_xml(xml.format(nsdecls("w"))))
+    document.add_paragraph("")
+    document.add_paragraph("Signed")
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def test_docx_text_matches_python_docx_paragraphs():
+    content = _docx_fixture()
+    expected = "\n".join(paragraph.text for paragraph in docx.Document(io.BytesIO(content)).paragraphs)
+    assert "Premium\t1,200 \ndue\n2024-01" in expected and "Boxed" not in expected
+    assert extract_text_from_file(content, "schedule.docx") == expected
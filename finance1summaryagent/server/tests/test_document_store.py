@@ -0,0 +1,38 @@
+import random
+
+import document_store
+from context_builder import estimate_tokens
+
+WORDS = "insurance policy premium renewal mortgage loan estate trust portfolio property tax income".split()
+
+
+def _upload(tmp_path, name, paragraphs, seed=1):
+    rng = random.Random(seed)
+    path = tmp_path / name
+    path.write_text("\n\n".join(" ".join(rng.choice(WORDS) for _ in range(150)) for _ in range(paragraphs)))
+    return str(path)
+
+
+def test_document_context_fits_budget(tmp_path, fake_embeddings):
+    document_store.index_document(_upload(tmp_path, "a.txt", 20), "a.txt", "B1", "Accounts")
+
+    full = document_store.document_context("B1", "mortgage tax", budget=100000)
+    assert full.count("[a.txt, part") == document_store.DOCUMENT_TOP_K
+
+    context = document_store.document_context("B1", "mortgage tax", budget=300)
+    assert 0 < context.count("[a.txt, part") < document_store.DOCUMENT_TOP_K
+    assert estimate_tokens(context) <= 300
+    assert full.startswith(context)
+
+    assert document_store.document_context("B1", "mortgage tax", budget=10) == ""
+
+
+def test_search_without_uploads_loads_no_index(tmp_path, fake_embeddings):
+    loaded = document_store.entity_indexes.stats()["loaded"]
+    assert document_store.search_documents("NO-UPLOADS", "tax") == []
+    assert document_store.document_context("NO-UPLOADS", "tax") == ""
+    assert document_store.entity_indexes.stats()["loaded"] == loaded
+
+    document_store.index_document(_upload(tmp_path, "a.txt", 3), "a.txt", "NO-UPLOADS", "Accounts")
+    assert document_store.search_documents("NO-UPLOADS", "tax")
+    assert document_store.entity_indexes.stats()["loaded"] == loaded + 1
@@ -0,0 +1,48 @@
+import sqlite3
+
+from embedding_cache import CachedEmbeddings
+
+
+def _cache(fake, tmp_path, **options):
+    return CachedEmbeddings(fake, "fake-model", str(tmp_path / "embeddings.sqlite3"), **options)
+
+
+def _rows(tmp_path):
+    with sqlite3.connect(tmp_path / "embeddings.sqlite3") as conn:
+        return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_counts_distinct_lookups(tmp_path, fake_embeddings):
+    cache = _cache(fake_embeddings, tmp_path)
+    cache.embed_documents(["premium", "premium", "renewal"])
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 2)
+    assert fake_embeddings.embedded == 2
+
+    cache.embed_documents(["premium", "premium", "balance"])
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 3)
+
+
+def test_queries_are_not_persisted(tmp_path, fake_embeddings):
+    cache = _cache(fake_embeddings, tmp_path, query_cache_size=2)
+    first = cache.embed_query("what is the premium")
+    assert cache.embed_query("what is the premium") == first
+    cache.embed_query("when is the renewal")
+    cache.embed_query("who is the insurer")
+
+    stats = cache.stats()
+    assert (stats["query_hits"], stats["query_misses"], stats["query_entries"]) == (1, 3, 2)
+    assert _rows(tmp_path) == 0
+
+
+def test_document_entries_are_bounded(tmp_path, fake_embeddings):
+    cache = _cache(fake_embeddings, tmp_path, max_entries=10)
+    cache.embed_documents([f"text {i}" for i in range(8)])
+    # Used again, so kept over newer text when the cache is pruned
+    cache.embed_documents(["text 0"])
+    cache.embed_documents([f"text {i}" for i in range(8, 14)])
+
+    assert cache.stats()["entries"] == _rows(tmp_path) == 9
+    assert cache.stats()["evictions"] == 5
+    embedded = fake_embeddings.embedded
+    cache.embed_documents(["text 0"])
+    assert fake_embeddings.embedded == embedded
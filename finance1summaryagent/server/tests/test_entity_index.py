@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from entity_index import EntityIndex, EntityIndexStore
+
+
+def _chunks(texts, module="document:a.pdf"):
+    return [
+        {"text": text, "metadata": {"module": module, "chunk_key": f"{module}:{i}"}}
+        for i, text in enumerate(texts)
+    ]
+
+
+def _texts(index):
+    return sorted(match["text"] for match in index.search("premium"))
+
+
+def _failing(chunks, after):
+    for i, chunk in enumerate(chunks):
+        if i == after:
+            raise RuntimeError("extraction failed")
+        yield chunk
+
+
+@pytest.mark.parametrize("hnsw_min_vectors", [None, 10])
+def test_failed_stream_leaves_index_unchanged(fake_embeddings, hnsw_min_vectors):
+    index = EntityIndex("entity__documents", hnsw_min_vectors=hnsw_min_vectors)
+    original = [f"premium statement line {i}" for i in range(150)]
+    index.sync_stream(_chunks(original), scope={"document:a.pdf"})
+    manifest = dict(index.manifest)
+
+    changed = [f"premium renewal notice {i}" for i in range(150)]
+    with pytest.raises(RuntimeError):
+        # Fails after two embedding batches have been staged
+        index.sync_stream(_failing(_chunks(changed), after=140), scope={"document:a.pdf"})
+
+    assert index.manifest == manifest
+    assert index.vectorstore.index.ntotal == 150
+    assert _texts(index) == sorted(original)
+    # Nothing half-applied was saved either
+    assert EntityIndex("entity__documents").manifest == manifest
+
+
+def test_stream_swaps_in_replacements_and_deletes_stale(fake_embeddings):
+    index = EntityIndex("entity__documents", hnsw_min_vectors=10)
+    index.sync_stream(_chunks([f"premium line {i}" for i in range(100)]), scope={"document:a.pdf"})
+    index.sync_stream(_chunks(["premium other file"], module="document:b.pdf"), scope={"document:b.pdf"})
+
+    texts = [f"premium line {i}" for i in range(70)] + [f"premium new line {i}" for i in range(10)]
+    counts = index.sync_stream(_chunks(texts), scope={"document:a.pdf"})
+
+    assert counts == {"added": 0, "replaced": 10, "deleted": 20, "unchanged": 70, "reused": 0}
+    assert index.vectorstore.index.ntotal == 81
+    assert _texts(index) == sorted(texts + ["premium other file"])
+    assert len(index.manifest) == 81
+
+
+def test_stream_reuses_vectors_of_identical_text(fake_embeddings):
+    index = EntityIndex("entity__documents")
+    index.sync_stream(_chunks(["premium one", "premium two"]), scope={"document:a.pdf"})
+    embedded = fake_embeddings.embedded
+
+    # Same texts under another file, plus a text repeated within the stream
+    counts = index.sync_stream(
+        _chunks(["premium two", "premium one", "premium three", "premium three"], module="document:b.pdf"),
+        scope={"document:b.pdf"},
+    )
+
+    assert counts["added"] == 4 and counts["reused"] == 3
+    assert fake_embeddings.embedded == embedded + 1
+
+
+def test_concurrent_syncs_survive_eviction(fake_embeddings):
+    # A budget of one byte evicts every index but the most recent after each sync
+    store = EntityIndexStore(max_bytes=1)
+    errors = []
+
+    def worker(module):
+        try:
+            for round_ in range(15):
+                with store.pinned("shared") as index:
+                    index.sync(_chunks([f"premium {module} round {round_} line {i}" for i in range(5)], module=module))
+                store.get(f"other-{module}")
+                store.evict_to_budget()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(module,)) for module in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    saved = EntityIndex("shared")
+    assert {entry["module"] for entry in saved.manifest.values()} == {"a", "b"}
+    assert len(saved.manifest) == saved.vectorstore.index.ntotal == 10
+    assert _texts(saved) == sorted(f"premium {m} round 14 line {i}" for m in ("a", "b") for i in range(5))
+    assert store.stats()["pinned"] == 0
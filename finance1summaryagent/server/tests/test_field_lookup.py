@@ -0,0 +1,35 @@
+from field_lookup import looks_like_field_lookup, resolve_field_lookup
+
+RECORD = {
+    "id": "A1",
+    "Account_Name": "Acme",
+    "Phone": "555-0100",
+    "Mobile": "555-0199",
+    "Fax": None,
+    "Billing_Street": "1 Main St",
+    "Shipping_Street": "",
+    "Account_Number": "A-9",
+    "Owner": {"name": "Dana", "id": "u1"},
+}
+
+
+def _field(query, record=RECORD):
+    answer = resolve_field_lookup(record, query)
+    return answer and answer[0]
+
+
+def test_address_and_number_match_field_labels():
+    assert looks_like_field_lookup("what is their address")
+    assert _field("what is their address?") == "Billing_Street"
+    assert _field("what's the billing address") == "Billing_Street"
+    assert _field("what's their phone number") == "Phone"
+    assert _field("what is their cell number") == "Mobile"
+    assert _field("what is the account number") == "Account_Number"
+
+
+def test_ambiguous_or_unmatched_lookups_fall_through():
+    # Two populated addresses: the full pipeline decides
+    assert _field("what is their address", {**RECORD, "Shipping_Street": "2 Dock Rd"}) is None
+    assert _field("what is the phone of the spouse") is None
+    assert _field("what is the fax number") is None
+    assert not looks_like_field_lookup("summarise the account")
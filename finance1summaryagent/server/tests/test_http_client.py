@@ -0,0 +1,29 @@
+import asyncio
+
+import http_client
+
+
+def test_one_client_is_shared_until_closed(monkeypatch):
+    monkeypatch.setattr(http_client, "_client", None)
+
+    async def run():
+        first = http_client.get_http_client()
+        assert http_client.get_http_client() is first and http_client.init_http_client() is first
+        await http_client.close_http_client()
+        assert first.is_closed
+        # Used after shutdown (e.g. from a script): a new client is created lazily
+        second = http_client.get_http_client()
+        await http_client.close_http_client()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second is not first and http_client._client is None
+
+
+def test_pool_is_sized_from_settings(monkeypatch):
+    monkeypatch.setattr(http_client, "ZOHO_HTTP_POOL_SIZE", 3)
+    monkeypatch.setattr(http_client, "ZOHO_HTTP_KEEPALIVE_EXPIRY", 5.0)
+    client = http_client.create_http_client()
+    pool = client._transport._pool
+    assert (pool._max_connections, pool._max_keepalive_connections, pool._keepalive_expiry) == (3, 3, 5.0)
+    asyncio.run(client.aclose())
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+
+import pytest
+
+from ingestion_jobs import FAILED, SUCCEEDED, IngestionWorkers, JobStore, job_status
+
+
+@pytest.fixture
+def workers(tmp_path, fake_embeddings):
+    pool = IngestionWorkers(JobStore(str(tmp_path / "jobs.sqlite3")), 1)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def _spool(tmp_path, content: bytes) -> str:
+    path = tmp_path / uuid.uuid4().hex
+    path.write_bytes(content)
+    return str(path)
+
+
+def _submit(workers, tmp_path, entity_id, filename, content):
+    path = _spool(tmp_path, content)
+    return workers.submit(entity_id, "Accounts", filename, path, len(content), None)
+
+
+def _wait(workers, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = workers.store.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job_status(job)
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_duplicate_is_reported_once_the_job_succeeds(workers, tmp_path):
+    content = " ".join(f"Statement line {i}: premium {uuid.uuid4().hex}." for i in range(300)).encode()
+    first = _wait(workers, _submit(workers, tmp_path, "J1", "statement.txt", content))
+    second_id = _submit(workers, tmp_path, "J2", "statement.txt", content)
+    assert job_status(workers.store.get(second_id))["duplicate"] is None
+    second = _wait(workers, second_id)
+
+    assert first["status"] == second["status"] == SUCCEEDED
+    assert first["duplicate"] is False and first["chunks_embedded"] == first["chunks_total"] > 0
+    assert second["duplicate"] is True and second["chunks_embedded"] == 0
+    assert second["chunks_reused"] == second["chunks_total"] == first["chunks_total"]
+
+
+def test_failed_job_has_no_duplicate_flag(workers, tmp_path):
+    failed = _wait(workers, _submit(workers, tmp_path, "J3", "broken.pdf", b"not a pdf"))
+    assert failed["status"] == FAILED and failed["duplicate"] is None and failed["error"]
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path, fake_embeddings):
+    db = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db)
+    contents = [f"Policy schedule {uuid.uuid4().hex}".encode() for _ in range(2)]
+    paths = [_spool(tmp_path, content) for content in contents]
+    queued = store.create("J4", "Accounts", "queued.txt", paths[0], len(contents[0]), None)
+    # Interrupted halfway through by the restart
+    running = store.create("J4", "Accounts", "running.txt", paths[1], len(contents[1]), None)
+    store.update(running, status="running", stage="embedding", worker="ingest-0", progress=0.5, chunks_embedded=3)
+
+    restarted = IngestionWorkers(JobStore(db), 1)
+    restarted.start()
+    try:
+        jobs = [_wait(restarted, job_id) for job_id in (queued, running)]
+    finally:
+        restarted.stop()
+
+    assert [job["status"] for job in jobs] == [SUCCEEDED, SUCCEEDED]
+    assert jobs[1]["chunks_embedded"] == jobs[1]["chunks_total"] == 1
+    assert restarted.store.unfinished() == []
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_upload_returns_a_job_to_poll(chat_app, workers, tmp_path, monkeypatch):
+    import ingestion_jobs
+    import main
+
+    monkeypatch.setattr(ingestion_jobs, "INGESTION_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(main, "ingestion_workers", workers)
+    content = f"Adviser notes {uuid.uuid4().hex}".encode()
+
+    accepted = asyncio.run(chat_app.request(
+        "POST", "/upload", data={"entity_id": "J5"}, files={"file": ("notes.txt", content, "text/plain")},
+    ))
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    assert accepted.json()["content_hash"] == hashlib.sha256(content).hexdigest()
+
+    _wait(workers, job_id)
+    status = asyncio.run(chat_app.request("GET", f"/upload/{job_id}")).json()
+    assert status["status"] == SUCCEEDED and status["progress"] == 1.0 and status["filename"] == "notes.txt"
+    assert asyncio.run(chat_app.request("GET", "/upload/missing")).status_code == 404
@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import LLMOverloaded, LLMScheduler, Priority
+
+NO_LIMITS = {p: 0 for p in Priority}
+
+
+async def _hold(scheduler, priority, tokens, order, release):
+    async with scheduler.slot(priority, tokens):
+        order.append(priority)
+        await release.wait()
+
+
+def test_waiting_calls_are_admitted_in_priority_order():
+    async def run():
+        scheduler = LLMScheduler(1, 0, NO_LIMITS)
+        order, release = [], asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, Priority.BATCH, 10, order, release))
+        await asyncio.sleep(0)
+        # Arrive lowest priority first while the only slot is taken
+        waiting = [asyncio.create_task(_hold(scheduler, p, 10, order, release)) for p in
+                   (Priority.BATCH, Priority.SCAN, Priority.CHAT, Priority.SCAN)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["classes"]["scan"]["queued"] == 2
+        release.set()
+        await asyncio.gather(first, *waiting)
+        return order
+
+    assert asyncio.run(run()) == [Priority.BATCH, Priority.CHAT, Priority.SCAN, Priority.SCAN, Priority.BATCH]
+
+
+def test_token_budget_defers_calls_until_the_window_frees(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "BUDGET_WINDOW", 0.2)
+
+    async def run():
+        scheduler = LLMScheduler(8, 100, NO_LIMITS)
+        assert await scheduler.acquire(Priority.CHAT, 60) == 0.0
+        scheduler.release()
+        started = time.monotonic()
+        # 60 + 60 tokens exceed the budget: the second call waits for the first to age out
+        waited = await scheduler.acquire(Priority.CHAT, 60)
+        scheduler.release()
+        return waited, time.monotonic() - started, scheduler.stats()
+
+    waited, elapsed, stats = asyncio.run(run())
+    assert 0.15 <= waited <= elapsed < 1
+    assert stats["tokens_last_minute"] == 60 and stats["classes"]["chat"]["admitted"] == 2
+
+
+def test_chat_reserve_defers_scans_but_not_chat(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "BUDGET_WINDOW", 0.2)
+
+    async def run():
+        scheduler = LLMScheduler(8, 100, NO_LIMITS, chat_reserve=0.5)
+        await scheduler.acquire(Priority.CHAT, 40)
+        # 40 + 20 is over the 50 tokens scans may use, but within chat's 100
+        scan = asyncio.create_task(scheduler.acquire(Priority.SCAN, 20))
+        await asyncio.sleep(0.01)
+        assert not scan.done()
+        # Chat goes ahead of the deferred scan at once
+        assert await scheduler.acquire(Priority.CHAT, 20) < 0.01
+        assert not scan.done()
+        # The scan is admitted once the window frees
+        return await scan
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_full_queue_sheds_with_retry_after():
+    async def run():
+        scheduler = LLMScheduler(1, 0, {**NO_LIMITS, Priority.SCAN: 1})
+        await scheduler.acquire(Priority.CHAT, 10)
+        queued = asyncio.create_task(scheduler.acquire(Priority.SCAN, 10))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded) as shed:
+            await scheduler.acquire(Priority.SCAN, 10)
+        # Chat has no queue limit and is never shed
+        chat = asyncio.create_task(scheduler.acquire(Priority.CHAT, 10))
+        await asyncio.sleep(0)
+        scheduler.release()
+        await chat
+        scheduler.release()
+        await queued
+        scheduler.release()
+        return shed.value, scheduler.stats()
+
+    error, stats = asyncio.run(run())
+    assert error.priority == Priority.SCAN and error.retry_after >= 1
+    assert stats["classes"]["scan"]["shed"] == 1 and stats["classes"]["scan"]["admitted"] == 1
+    assert stats["active"] == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        scheduler = LLMScheduler(1, 0, NO_LIMITS)
+        await scheduler.acquire(Priority.CHAT, 10)
+        waiter = asyncio.create_task(scheduler.acquire(Priority.SCAN, 10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0 and stats["classes"]["scan"]["queued"] == 0
+
+
+def test_shed_chat_request_gets_503(chat_app, monkeypatch):
+    import main
+
+    scheduler = LLMScheduler(1, 0, {**NO_LIMITS, Priority.CHAT: 1})
+    monkeypatch.setattr(main, "llm_scheduler", scheduler)
+
+    async def run():
+        # The only slot is busy and one chat call already waits for it
+        await scheduler.acquire(Priority.CHAT, 10)
+        waiting = asyncio.create_task(scheduler.acquire(Priority.CHAT, 10))
+        await asyncio.sleep(0)
+        response = await chat_app.request("POST", "/chat", json={"entity_id": "A1", "query": "summarise the account"})
+        waiting.cancel()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert chat_app.model.prompts == []
+
+
+def test_shed_scan_request_gets_503(chat_app, monkeypatch):
+    import main
+
+    scheduler = LLMScheduler(1, 0, {**NO_LIMITS, Priority.SCAN: 1})
+    monkeypatch.setattr(main, "llm_scheduler", scheduler)
+
+    async def get_account_data(account_id, token, related_modules_to_fetch=None):
+        return dict(chat_app.record)
+
+    monkeypatch.setattr(main, "get_account_data", get_account_data)
+
+    async def run():
+        await scheduler.acquire(Priority.CHAT, 10)
+        waiting = asyncio.create_task(scheduler.acquire(Priority.SCAN, 10))
+        await asyncio.sleep(0)
+        response = await chat_app.request("POST", "/scan", json={"entity_id": "A1"})
+        waiting.cancel()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert scheduler.stats()["classes"]["scan"]["shed"] == 1
+    assert chat_app.model.prompts == []
+
+
+def test_streamed_answer_holds_its_slot_until_the_stream_ends(chat_app, monkeypatch):
+    import main
+
+    scheduler = LLMScheduler(1, 0, NO_LIMITS)
+    monkeypatch.setattr(main, "llm_scheduler", scheduler)
+    chat_app.model.stream = ["Streamed ", "answer"]
+
+    async def run():
+        events = main.stream_chat_answer("prompt")
+        first = await events.__anext__()
+        active_while_streaming = scheduler.stats()["active"]
+        rest = [event async for event in events]
+        return first, active_while_streaming, rest
+
+    first, active_while_streaming, rest = asyncio.run(run())
+    assert first.startswith("event: token") and active_while_streaming == 1
+    assert rest[-1].startswith("event: done")
+    assert scheduler.stats()["active"] == 0
@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import module_router
+from module_router import MODULE_DESCRIPTIONS, MODULE_ROUTER_SIMILARITY_MARGIN, route_modules
+
+MODULES = list(MODULE_DESCRIPTIONS)
+
+
+class WeightedEmbeddings:
+    """One axis per module description; the query vector is set per test as weights by module."""
+
+    def __init__(self):
+        self.query_weights = {}
+
+    def embed_documents(self, texts):
+        return np.eye(len(texts)).tolist()
+
+    def embed_query(self, text):
+        return [self.query_weights.get(module, 0.0) for module in MODULES]
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    fake = WeightedEmbeddings()
+    monkeypatch.setattr(module_router, "get_embeddings", lambda: fake)
+    monkeypatch.setattr(module_router, "_module_vectors", None)
+    return fake
+
+
+def test_keyword_rules_are_fully_confident(embeddings):
+    assert route_modules("Which policies are up for renewal?") == (
+        ["Insurance_Policies_New", "Policy_Renewals_New"], 1.0
+    )
+    assert route_modules("Give me an overview") == (["Contacts", "Deals", "Notes"], 1.0)
+
+
+def test_similarity_keeps_modules_within_the_margin(embeddings):
+    embeddings.query_weights = {"Tasks": 0.9, "Meetings": 0.9 - MODULE_ROUTER_SIMILARITY_MARGIN / 2, "Notes": 0.5}
+    modules, confidence = route_modules("what is coming up next quarter")
+    assert modules == ["Tasks", "Meetings"]
+    assert confidence == pytest.approx(0.9 / np.linalg.norm(list(embeddings.query_weights.values())), abs=1e-6)
+
+
+def test_embedding_failure_has_no_confidence(monkeypatch):
+    def broken():
+        raise RuntimeError("model not loaded")
+
+    monkeypatch.setattr(module_router, "get_embeddings", broken)
+    monkeypatch.setattr(module_router, "_module_vectors", None)
+    assert route_modules("what is coming up next quarter") == ([], 0.0)
+
+
+def test_low_confidence_falls_back_to_the_llm_router(embeddings, monkeypatch):
+    import main
+
+    prompts = []
+
+    class RouterModel:
+        async def generate_content_async(self, prompt):
+            prompts.append(prompt)
+            return type("Response", (), {"text": '```json\n["Liabilites_New"]\n```'})()
+
+    monkeypatch.setattr(main, "model", RouterModel())
+
+    # Spread evenly over every module: the best similarity is far below the threshold
+    embeddings.query_weights = {module: 1.0 for module in MODULES}
+    assert asyncio.run(main.identify_relevant_modules("anything unusual lately")) == ["Liabilites_New"]
+    assert len(prompts) == 1 and "anything unusual lately" in prompts[0]
+
+    # A confident local match never reaches Gemini
+    embeddings.query_weights = {"Tasks": 1.0}
+    assert asyncio.run(main.identify_relevant_modules("what is coming up next quarter")) == ["Tasks"]
+    assert len(prompts) == 1
+
+
+def test_module_descriptions_are_embedded_once(embeddings, monkeypatch):
+    calls = []
+    embed_documents = embeddings.embed_documents
+    monkeypatch.setattr(embeddings, "embed_documents", lambda texts: calls.append(len(texts)) or embed_documents(texts))
+
+    module_router.warm_up_router()
+    embeddings.query_weights = {"Tasks": 1.0}
+    route_modules("what is coming up next quarter")
+    route_modules("anything unusual lately")
+    assert calls == [len(MODULES)]
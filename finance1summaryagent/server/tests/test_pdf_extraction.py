@@ -0,0 +1,65 @@
+import io
+import os
+import time
+
+import pytest
+
+import pdf_extraction
+from benchmarks.pdf_extraction_benchmark import synthetic_pdf
+from document_processor import _iter_pdf_pages
+
+
+def _open_in(pids, path):
+    held = []
+    for pid in pids:
+        fd_dir = f"/proc/{pid}/fd"
+        for fd in os.listdir(fd_dir):
+            try:
+                if os.readlink(os.path.join(fd_dir, fd)).startswith(path):
+                    held.append(pid)
+            except OSError:
+                pass
+    return held
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_workers_release_deleted_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PDF_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(pdf_extraction, "PDF_PAGES_PER_SHARD", 2)
+    pdf_extraction.shutdown_pdf_pool()
+    path = str(tmp_path / "statement.pdf")
+    with open(path, "wb") as f:
+        f.write(synthetic_pdf(12))
+    try:
+        pages = list(pdf_extraction.iter_pdf_pages_parallel(path))
+        assert len(pages) == 12 and all(text.strip() for text, _ in pages)
+        pids = list(pdf_extraction.get_pdf_pool()._processes)
+
+        os.remove(path)
+        deadline = time.monotonic() + 5 * pdf_extraction.DOCUMENT_CHECK_INTERVAL
+        while _open_in(pids, path) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert _open_in(pids, path) == []
+    finally:
+        pdf_extraction.shutdown_pdf_pool()
+
+
+def test_parallel_pages_match_serial_extraction(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PDF_EXTRACT_WORKERS", 3)
+    monkeypatch.setattr(pdf_extraction, "PDF_PAGES_PER_SHARD", 2)
+    pdf_extraction.shutdown_pdf_pool()
+    data = synthetic_pdf(9)
+    path = str(tmp_path / "statement.pdf")
+    with open(path, "wb") as f:
+        f.write(data)
+    try:
+        before = pdf_extraction.pdf_extraction_stats()["pages"]
+        parallel = list(pdf_extraction.iter_pdf_pages_parallel(path))
+        assert pdf_extraction.pdf_extraction_stats()["pages"] - before == 9
+    finally:
+        pdf_extraction.shutdown_pdf_pool()
+
+    # In-memory files are extracted serially in the calling thread
+    serial = list(_iter_pdf_pages(io.BytesIO(data)))
+    assert parallel == serial
+    assert [fraction for _, fraction in parallel] == [(i + 1) / 9 for i in range(9)]
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)), flights.do("other", work))
+        return results, flights.stats()
+
+    results, stats = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results[:5])
+    assert stats == {"executed": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_finished_call_is_not_reused():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await flights.do("k", work) for _ in range(2)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_errors_are_shared_with_every_waiter():
+    flights = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("Zoho down")
+
+    async def run():
+        return await asyncio.gather(flights.do("k", fail), flights.do("k", fail), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flights.stats()["executed"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flights.do("k", work))
+        second = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [1]
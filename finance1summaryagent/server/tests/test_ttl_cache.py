@@ -0,0 +1,25 @@
+from ttl_cache import TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a").value == 1 and cache.get("c").value == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stale_entries_are_kept_for_revalidation():
+    cache = TTLCache(max_entries=4, ttl=0)
+    cache.set("a", 1, validator="v1")
+    assert cache.get("a") is None
+    stale = cache.get("a", allow_stale=True)
+    assert stale.value == 1 and stale.validator == "v1"
+
+    cache.ttl = 60
+    cache.mark_revalidated("a")
+    assert cache.get("a").value == 1
+    stats = cache.stats()
+    assert (stats["stale"], stats["revalidated"], stats["hits"]) == (2, 1, 1)
@@ -0,0 +1,71 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+import ingestion_jobs
+import main
+from ingestion_jobs import IngestionWorkers, JobStore, UploadTooLarge
+
+
+class FakeUpload:
+    """Async read(size) over bytes, like FastAPI's UploadFile."""
+
+    def __init__(self, content: bytes):
+        self._file = io.BytesIO(content)
+        self.reads = 0
+
+    async def read(self, size: int) -> bytes:
+        self.reads += 1
+        return self._file.read(size)
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion_jobs, "INGESTION_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(ingestion_jobs, "UPLOAD_SPOOL_CHUNK_BYTES", 4)
+    monkeypatch.setattr(ingestion_jobs, "UPLOAD_MAX_BYTES", 10)
+    return IngestionWorkers(JobStore(str(tmp_path / "jobs.sqlite3")), 1)
+
+
+def test_upload_without_content_length_gets_411(chat_app):
+    async def body():
+        yield b"entity_id=A1"
+
+    response = asyncio.run(chat_app.request(
+        "POST", "/upload", content=body(), headers={"Content-Type": "application/x-www-form-urlencoded"},
+    ))
+    assert response.status_code == 411
+
+
+def test_oversized_upload_gets_413_before_the_form_is_read(chat_app, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 1024)
+    monkeypatch.setattr(main, "UPLOAD_FORM_OVERHEAD_BYTES", 0)
+
+    async def spool(upload):
+        raise AssertionError("an oversized body must not reach the handler")
+
+    monkeypatch.setattr(main.ingestion_workers, "spool", spool)
+    response = asyncio.run(chat_app.request(
+        "POST", "/upload", data={"entity_id": "A1"}, files={"file": ("big.txt", b"x" * 2048, "text/plain")},
+    ))
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File exceeds the 1024 byte upload limit"}
+
+
+def test_spool_copies_in_blocks_and_hashes(spool):
+    path, size, content_hash = asyncio.run(spool.spool(FakeUpload(b"0123456789")))
+    with open(path, "rb") as f:
+        assert f.read() == b"0123456789"
+    assert size == 10
+    assert content_hash == "84d89877f0d4041efb6bf91a16f0248f2fd573e6af05c19f96bedb9f882f7882"
+
+
+def test_spool_stops_at_the_limit_and_keeps_nothing(spool):
+    upload = FakeUpload(b"x" * 100)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool.spool(upload))
+    # Stopped after the block that crossed 10 bytes
+    assert upload.reads == 3
+    assert os.listdir(ingestion_jobs.INGESTION_SPOOL_DIR) == []
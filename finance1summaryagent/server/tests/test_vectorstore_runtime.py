@@ -0,0 +1,47 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import vectorstore_runtime
+from conftest import FakeEmbeddings
+from embedding_cache import CachedEmbeddings
+
+
+def _loader(loads):
+    def load(model_name):
+        loads.append(model_name)
+        # Slow enough that concurrent first callers overlap
+        time.sleep(0.05)
+        return FakeEmbeddings()
+
+    return load
+
+
+def test_model_is_loaded_once_for_concurrent_callers(monkeypatch):
+    loads = []
+    monkeypatch.setattr(vectorstore_runtime, "HuggingFaceEmbeddings", _loader(loads))
+    monkeypatch.setattr(vectorstore_runtime, "EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setattr(vectorstore_runtime, "_embeddings", None)
+
+    assert not vectorstore_runtime.embeddings_ready()
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        return vectorstore_runtime.get_embeddings()
+
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(lambda _: get(), range(8)))
+    assert len(loads) == 1 and all(model is models[0] for model in models)
+    assert vectorstore_runtime.embeddings_ready()
+
+
+def test_model_is_wrapped_in_the_embedding_cache(monkeypatch, tmp_path):
+    loads = []
+    monkeypatch.setattr(vectorstore_runtime, "HuggingFaceEmbeddings", _loader(loads))
+    monkeypatch.setattr(vectorstore_runtime, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(vectorstore_runtime, "_embeddings", None)
+
+    vectorstore_runtime.warm_up_embeddings()
+    assert isinstance(vectorstore_runtime.get_embeddings(), CachedEmbeddings)
+    assert vectorstore_runtime.embedding_cache_stats() is not None and len(loads) == 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+import zoho_auth
+
+TOKEN_URL = "https://accounts.example.test/oauth/v2/token"
+
+
+@pytest.fixture
+def token_endpoint(monkeypatch):
+    """Fake Zoho OAuth endpoint; records every refresh POST."""
+    state = {"posts": [], "expires_in": 3600}
+
+    async def handler(request):
+        state["posts"].append(request)
+        # Slow enough that every concurrent caller arrives while the refresh is in flight
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"access_token": f"token-{len(state['posts'])}", "expires_in": state["expires_in"]})
+
+    for name in ("ZOHO_REFRESH_TOKEN", "ZOHO_CLIENT_ID", "ZOHO_CLIENT_SECRET"):
+        monkeypatch.setenv(name, "x")
+    monkeypatch.setattr(zoho_auth, "ZOHO_TOKEN_URL", TOKEN_URL)
+    monkeypatch.setattr(zoho_auth, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    zoho_auth.reset_access_token_cache()
+    yield state
+    zoho_auth.reset_access_token_cache()
+
+
+async def _concurrent_tokens(callers=20):
+    return await asyncio.gather(*(zoho_auth.get_access_token() for _ in range(callers)))
+
+
+def test_concurrent_callers_share_one_refresh(token_endpoint):
+    assert asyncio.run(_concurrent_tokens()) == ["token-1"] * 20
+    assert [str(request.url.copy_with(query=None)) for request in token_endpoint["posts"]] == [TOKEN_URL]
+    assert token_endpoint["posts"][0].method == "POST"
+
+
+def test_refresh_lock_works_across_event_loops(token_endpoint):
+    # The lock is created in the running loop, so a second loop (or a restarted app) can use it
+    asyncio.run(_concurrent_tokens())
+    zoho_auth.reset_access_token_cache()
+    assert asyncio.run(_concurrent_tokens()) == ["token-2"] * 20
+    assert len(token_endpoint["posts"]) == 2
+
+
+def test_token_near_expiry_is_served_while_one_refresh_runs(token_endpoint):
+    token_endpoint["expires_in"] = zoho_auth.ZOHO_TOKEN_REFRESH_MARGIN - 60
+
+    async def run():
+        first = await zoho_auth.get_access_token()
+        token_endpoint["expires_in"] = 3600
+        # Inside the refresh margin: callers keep the current token and one background refresh starts
+        served = await _concurrent_tokens()
+        await asyncio.sleep(0.1)
+        return first, served, await zoho_auth.get_access_token()
+
+    first, served, after = asyncio.run(run())
+    assert first == "token-1" and served == ["token-1"] * 20
+    assert after == "token-2"
+    assert len(token_endpoint["posts"]) == 2
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import zoho_crm_api_call as zoho
+
+
+@pytest.fixture
+def zoho_api(monkeypatch):
+    """
+    Fake Zoho CRM API. `records` maps record IDs to records, `related` maps
+    (record ID, module) to a related list or an HTTP status code. Requests are
+    recorded, with the peak number in flight.
+    """
+    api = SimpleNamespace(records={}, related={}, requests=[], in_flight=0, max_in_flight=0, delay=0.01)
+
+    async def handler(request):
+        api.requests.append(request)
+        api.in_flight += 1
+        api.max_in_flight = max(api.max_in_flight, api.in_flight)
+        try:
+            await asyncio.sleep(api.delay)
+        finally:
+            api.in_flight -= 1
+        parts = request.url.path.split("/")[3:]  # /crm/v3/<Module>/<id>[/<related>]
+        if len(parts) == 2:
+            record = api.records.get(parts[1])
+            if record is None:
+                return httpx.Response(204)
+            since = request.headers.get("If-Modified-Since")
+            if since is not None and since == record.get("Modified_Time"):
+                return httpx.Response(304)
+            return httpx.Response(200, json={"data": [record]})
+        related = api.related.get((parts[1], parts[2]), 204)
+        if isinstance(related, int):
+            return httpx.Response(related)
+        return httpx.Response(200, json={"data": related})
+
+    monkeypatch.setattr(zoho, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    zoho.record_cache.clear()
+    yield api
+    zoho.record_cache.clear()
+
+
+def test_related_lists_are_fetched_concurrently_up_to_the_limit(zoho_api, monkeypatch):
+    monkeypatch.setattr(zoho, "ZOHO_RELATED_FETCH_WORKERS", 2)
+    modules = ["Contacts", "Deals", "Notes", "Tasks", "Meetings"]
+    for module in modules:
+        zoho_api.related[("F1", module)] = [{"id": f"{module}-1"}]
+
+    related = asyncio.run(zoho.fetch_related_modules("Accounts", "F1", modules + ["Notes"], "token"))
+    assert list(related) == modules
+    assert len(zoho_api.requests) == 5 and zoho_api.max_in_flight == 2
+
+
+def test_failed_modules_are_left_out_and_empty_ones_kept(zoho_api):
+    zoho_api.records["F2"] = {"id": "F2", "Account_Name": "Acme"}
+    zoho_api.related[("F2", "Contacts")] = [{"id": "c1"}]
+    zoho_api.related[("F2", "Deals")] = 500
+    zoho_api.related[("F2", "Tasks")] = []
+    # Notes answers 204 No Content
+
+    account = asyncio.run(zoho.get_account_data("F2", "token", ["Contacts", "Deals", "Notes", "Tasks"]))
+    assert account["Account_Name"] == "Acme"
+    assert {k: v for k, v in account.items() if k.startswith("Related_")} == {
+        "Related_Contacts": [{"id": "c1"}], "Related_Notes": [], "Related_Tasks": [],
+    }
+
+
+def test_stale_record_is_revalidated_with_if_modified_since(zoho_api, monkeypatch):
+    zoho_api.records["R1"] = {"id": "R1", "Phone": "555", "Modified_Time": "2024-01-01T10:00:00+00:00"}
+
+    async def fetch():
+        return await zoho.get_record_data("Accounts", "R1", "token")
+
+    assert asyncio.run(fetch())["Phone"] == "555"
+    # Fresh: served from the cache
+    assert asyncio.run(fetch())["Phone"] == "555" and len(zoho_api.requests) == 1
+
+    monkeypatch.setattr(zoho.record_cache, "ttl", 0)
+    revalidated = zoho.record_cache.stats()["revalidated"]
+    assert asyncio.run(fetch())["Phone"] == "555"
+    assert zoho_api.requests[-1].headers["If-Modified-Since"] == "2024-01-01T10:00:00+00:00"
+    assert zoho.record_cache.stats()["revalidated"] == revalidated + 1
+
+    # Changed in Zoho: the 200 replaces the cached copy and its validator
+    zoho_api.records["R1"] = {"id": "R1", "Phone": "777", "Modified_Time": "2024-02-01T10:00:00+00:00"}
+    assert asyncio.run(fetch())["Phone"] == "777"
+    assert zoho.record_cache.get(("Accounts", "R1", None), allow_stale=True).validator == "2024-02-01T10:00:00+00:00"
+
+
+def test_stale_related_lists_are_fetched_in_full(zoho_api, monkeypatch):
+    zoho_api.related[("R2", "Notes")] = [{"id": "n1"}, {"id": "n2"}]
+
+    async def fetch():
+        return await zoho.get_related_records("Accounts", "R2", "Notes", "token")
+
+    assert len(asyncio.run(fetch())) == 2
+    assert len(asyncio.run(fetch())) == 2 and len(zoho_api.requests) == 1
+
+    monkeypatch.setattr(zoho.record_cache, "ttl", 0)
+    zoho_api.related[("R2", "Notes")] = [{"id": "n2"}]
+    assert asyncio.run(fetch()) == [{"id": "n2"}]
+    assert "If-Modified-Since" not in zoho_api.requests[-1].headers
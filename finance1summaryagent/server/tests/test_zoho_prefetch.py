@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import zoho_crm_api_call as zoho
+
+
+@pytest.fixture
+def fake_zoho(monkeypatch):
+    """Fake Zoho fetches; records which related fetches were cancelled."""
+    state = {"cancelled": [], "main_error": None, "delays": {}, "empty": set()}
+
+    async def get_record_data(module, record_id, token):
+        await asyncio.sleep(state["delays"].get("main", 0.01))
+        if state["main_error"]:
+            raise state["main_error"]
+        return {"id": record_id, "Account_Name": "Acme"}
+
+    async def fetch_related_modules(entity_type, entity_id, modules, token):
+        try:
+            await asyncio.sleep(state["delays"].get("related", 0.01))
+        except asyncio.CancelledError:
+            state["cancelled"].extend(modules)
+            raise
+        return {module: [] if module in state["empty"] else [{"id": f"{module}-1"}] for module in modules}
+
+    monkeypatch.setattr(zoho, "get_record_data", get_record_data)
+    monkeypatch.setattr(zoho, "fetch_related_modules", fetch_related_modules)
+    monkeypatch.setattr(zoho, "ZOHO_PREFETCH_MODULES", ["Deals", "Notes"])
+    return state
+
+
+async def _route(modules, delay=0.01, error=None):
+    await asyncio.sleep(delay)
+    if error:
+        raise error
+    return modules
+
+
+def test_prefetch_keeps_routed_modules(fake_zoho):
+    record = asyncio.run(zoho.get_account_data_with_prefetch("A1", "t", _route(["Notes", "Tasks"])))
+    assert sorted(k for k in record if k.startswith("Related_")) == ["Related_Notes", "Related_Tasks"]
+
+
+def test_prefetch_keeps_empty_related_lists(fake_zoho):
+    # Chunks of a module that emptied out are only deleted if the record says it was fetched
+    fake_zoho["empty"] = {"Notes", "Tasks"}
+    record = asyncio.run(zoho.get_account_data_with_prefetch("A1", "t", _route(["Notes", "Tasks"])))
+    assert record["Related_Notes"] == [] and record["Related_Tasks"] == []
+    assert "Related_Deals" not in record
+
+
+def test_shortcut_answers_from_main_record_and_stops_routing(fake_zoho):
+    fake_zoho["delays"]["related"] = 1
+    routed = []
+
+    async def slow_route():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            routed.append("cancelled")
+            raise
+        return ["Notes"]
+
+    record = asyncio.run(zoho.get_account_data_with_prefetch(
+        "A1", "t", slow_route(), shortcut=lambda main: main["Account_Name"] == "Acme"
+    ))
+    assert record == {"id": "A1", "Account_Name": "Acme"}
+    assert routed == ["cancelled"]
+    assert fake_zoho["cancelled"] == ["Deals", "Notes"]
+
+
+def test_shortcut_miss_keeps_the_main_fetch(fake_zoho):
+    seen = []
+    record = asyncio.run(zoho.get_account_data_with_prefetch(
+        "A1", "t", _route(["Notes"]), shortcut=lambda main: seen.append(dict(main)) or False
+    ))
+    assert seen == [{"id": "A1", "Account_Name": "Acme"}]
+    assert record["Related_Notes"] == [{"id": "Notes-1"}]
+
+
+def test_router_failure_cancels_fetches(fake_zoho):
+    fake_zoho["delays"]["related"] = 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(zoho.get_account_data_with_prefetch("A1", "t", _route([], error=RuntimeError("router"))))
+    assert fake_zoho["cancelled"] == ["Deals", "Notes"]
+
+
+def test_main_fetch_failure_cancels_related_fetches(fake_zoho):
+    fake_zoho["main_error"] = RuntimeError("main")
+    fake_zoho["delays"]["related"] = 1
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await zoho.get_account_data_with_prefetch("A1", "t", _route(["Notes", "Tasks"]))
+        # Give cancelled tasks a turn to finish
+        await asyncio.sleep(0.05)
+
+    loop = asyncio.new_event_loop()
+    unobserved = []
+    loop.set_exception_handler(lambda loop, context: unobserved.append(context))
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert sorted(fake_zoho["cancelled"]) == ["Deals", "Notes", "Tasks"]
+    assert unobserved == []
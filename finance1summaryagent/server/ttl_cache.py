@@ -0,0 +1,107 @@
+"""
+Thread-safe in-memory cache with TTL expiry and LRU eviction.
+Used to keep recently fetched CRM data in memory between requests.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    validator: Optional[str] = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.monotonic() - self.stored_at < ttl
+
+
+class TTLCache:
+    """
+    LRU cache whose entries go stale after `ttl` seconds.
+
+    Stale entries are kept (until evicted) so callers can revalidate them
+    cheaply with the stored validator (e.g. a Modified_Time) instead of
+    refetching from scratch.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidated": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """
+        Looks up an entry.
+
+        Args:
+            key: Cache key
+            allow_stale: Return expired entries too, so the caller can revalidate them
+
+        Returns:
+            The cache entry, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.is_fresh(self.ttl):
+                self._counters["hits"] += 1
+                return entry
+
+            self._counters["stale"] += 1
+            return entry if allow_stale else None
+
+    def set(self, key: Hashable, value: Any, validator: Optional[str] = None) -> None:
+        """Stores a value, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = CacheEntry(value=value, stored_at=time.monotonic(), validator=validator)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def mark_revalidated(self, key: Hashable) -> None:
+        """Resets the age of an entry after the source confirmed it is unchanged."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+                self._counters["revalidated"] += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current size, for sizing the cache."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"] + self._counters["stale"]
+            served = self._counters["hits"] + self._counters["revalidated"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+            }
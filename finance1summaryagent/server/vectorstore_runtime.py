@@ -1,12 +1,73 @@
 """
 FAISS vectorstore creation and management for RAG.
 Creates temporary vectorstores for record context.
+
+The sentence-transformer model is loaded once per process and shared by every
+vectorstore built here (and by the module router).
 """
+import os
+import threading
 from typing import List, Optional
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
 
+from embedding_cache import CachedEmbeddings
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+
+# SQLite file caching computed embeddings across requests; set to an empty string to disable
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.sqlite3")
+)
+
+_embeddings: Optional[Embeddings] = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Returns the process-wide embedding model, loading it on first use.
+    Wrapped in the on-disk embedding cache unless EMBEDDING_CACHE_PATH is empty.
+
+    Returns:
+        Shared Embeddings instance
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+                if EMBEDDING_CACHE_PATH:
+                    embeddings = CachedEmbeddings(embeddings, EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_PATH)
+                _embeddings = embeddings
+    return _embeddings
+
+
+def embedding_cache_stats() -> Optional[dict]:
+    """Returns embedding cache counters, or None if the cache is disabled or not loaded yet."""
+    if isinstance(_embeddings, CachedEmbeddings):
+        return _embeddings.stats()
+    return None
+
+
+def embeddings_ready() -> bool:
+    """Returns True once the embedding model has been loaded."""
+    return _embeddings is not None
+
+
+def warm_up_embeddings() -> None:
+    """
+    Loads the embedding model and runs one tiny embedding so the first real
+    request does not pay for model loading. Safe to call more than once.
+    """
+    try:
+        get_embeddings().embed_query("warm up")
+    except Exception as e:
+        print(f"Embedding model warm-up failed: {e}")
+
 
 def create_vectorstore(texts: List[str], metadata: Optional[List[dict]] = None) -> FAISS:
     """
@@ -19,11 +80,9 @@ def create_vectorstore(texts: List[str], metadata: Optional[List[dict]] = None)
     Returns:
         FAISS vectorstore instance
     """
-    # Use HuggingFace embeddings (lightweight, no API key needed)
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    
+    # Use the shared (cached) HuggingFace embeddings (lightweight, no API key needed)
+    embeddings = get_embeddings()
+
     # Create documents with metadata if provided
     if metadata:
         documents = [
@@ -45,6 +104,7 @@ def add_documents_to_vectorstore(
 ) -> FAISS:
     """
     Adds new documents to an existing vectorstore.
+    The vectorstore embeds them with the shared model it was created with.
     
     Args:
         vectorstore: Existing FAISS vectorstore
@@ -64,3 +124,21 @@ def add_documents_to_vectorstore(
     
     vectorstore.add_documents(documents)
     return vectorstore
+
+
+def build_vectorstore(text: str, entity_id: str) -> FAISS:
+    """
+    Builds a vectorstore from a record's rendered text.
+
+    Args:
+        text: Rendered record text
+        entity_id: Record ID stored in the document metadata
+
+    Returns:
+        FAISS vectorstore instance
+    """
+    if not text or not text.strip():
+        print(" Warning: Empty text provided to vectorstore")
+        text = "No data available"
+
+    return create_vectorstore([text], [{"account_id": entity_id}])
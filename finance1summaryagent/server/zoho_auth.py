@@ -1,39 +1,150 @@
 """
 Zoho OAuth token refresh utility.
 Handles OAuth token refreshing for Zoho CRM API calls.
+
+Access tokens are cached process-wide and reused until shortly before they
+expire. A token that is close to expiry is refreshed in the background while
+callers keep using the current one, and concurrent callers that find no usable
+token share a single in-flight refresh instead of each hitting the OAuth
+endpoint.
 """
+import asyncio
 import os
-import requests
+import time
+import httpx
 from typing import Optional
+from http_client import get_http_client
+
+# Token endpoint can be overridden (e.g. regional data centre or a local fake for testing)
+ZOHO_TOKEN_URL = os.getenv("ZOHO_TOKEN_URL", "https://accounts.zoho.com/oauth/v2/token")
+
+# Refresh this many seconds before the token actually expires
+ZOHO_TOKEN_REFRESH_MARGIN = int(os.getenv("ZOHO_TOKEN_REFRESH_MARGIN", "300"))
+
+# Zoho access tokens live for one hour unless the response says otherwise
+DEFAULT_TOKEN_TTL = 3600
+
+_cached_token: Optional[str] = None
+_expires_at: float = 0.0
+_refresh_lock: Optional[asyncio.Lock] = None
+_refresh_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_refresh: Optional[asyncio.Task] = None
 
 
-def get_access_token() -> Optional[str]:
+def _get_refresh_lock() -> asyncio.Lock:
     """
-    Refreshes and returns a valid Zoho access token.
-    
+    The refresh lock, created on first use in the running event loop (and again
+    if the module is used from another loop later), not at import time.
+    """
+    global _refresh_lock, _refresh_lock_loop
+    loop = asyncio.get_running_loop()
+    if _refresh_lock is None or _refresh_lock_loop is not loop:
+        _refresh_lock = asyncio.Lock()
+        _refresh_lock_loop = loop
+    return _refresh_lock
+
+
+async def _request_new_token() -> Optional[tuple]:
+    """
+    Calls the Zoho OAuth endpoint for a new access token.
+
     Returns:
-        Access token string if successful, None otherwise.
+        (access_token, expires_in_seconds) if successful, None otherwise.
     """
     refresh_token = os.getenv("ZOHO_REFRESH_TOKEN")
     client_id = os.getenv("ZOHO_CLIENT_ID")
     client_secret = os.getenv("ZOHO_CLIENT_SECRET")
-    
+
     if not all([refresh_token, client_id, client_secret]):
         raise ValueError("Missing required Zoho OAuth credentials in environment variables")
-    
-    url = "https://accounts.zoho.com/oauth/v2/token"
+
     params = {
         "refresh_token": refresh_token,
         "client_id": client_id,
         "client_secret": client_secret,
         "grant_type": "refresh_token"
     }
-    
+
     try:
-        response = requests.post(url, params=params)
+        response = await get_http_client().post(ZOHO_TOKEN_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
-        return data.get("access_token")
-    except requests.exceptions.RequestException as e:
+        access_token = data.get("access_token")
+        if not access_token:
+            print(f"Error refreshing Zoho token: {data.get('error', 'no access_token in response')}")
+            return None
+        expires_in = int(data.get("expires_in", DEFAULT_TOKEN_TTL))
+        return access_token, expires_in
+    except (httpx.HTTPError, ValueError) as e:
         print(f"Error refreshing Zoho token: {e}")
         return None
+
+
+async def _refresh_token() -> Optional[str]:
+    """
+    Refreshes the cached token. Only one refresh runs at a time; callers that
+    arrive while a refresh is in flight wait for it and reuse its result.
+
+    Returns:
+        The current access token if available, None otherwise.
+    """
+    global _cached_token, _expires_at
+
+    started_waiting = time.monotonic()
+    async with _get_refresh_lock():
+        # Another caller may have refreshed while we were waiting for the lock
+        if _cached_token and _expires_at - ZOHO_TOKEN_REFRESH_MARGIN > started_waiting:
+            return _cached_token
+
+        result = await _request_new_token()
+
+        if result:
+            _cached_token, expires_in = result
+            _expires_at = time.monotonic() + expires_in
+            return _cached_token
+        # Keep serving the old token if it has not expired yet
+        if _cached_token and _expires_at > time.monotonic():
+            return _cached_token
+        return None
+
+
+def _refresh_in_background() -> None:
+    """Starts a background refresh unless one is already in flight."""
+    global _background_refresh
+    if _get_refresh_lock().locked() or (_background_refresh is not None and not _background_refresh.done()):
+        return
+
+    async def _run():
+        try:
+            await _refresh_token()
+        except Exception as e:
+            print(f"Background Zoho token refresh failed: {e}")
+
+    _background_refresh = asyncio.get_running_loop().create_task(_run())
+
+
+async def get_access_token() -> Optional[str]:
+    """
+    Returns a valid Zoho access token, refreshing it only when needed.
+
+    Returns:
+        Access token string if successful, None otherwise.
+    """
+    now = time.monotonic()
+
+    if _cached_token and now < _expires_at - ZOHO_TOKEN_REFRESH_MARGIN:
+        return _cached_token
+
+    if _cached_token and now < _expires_at:
+        # Still valid but close to expiry: keep serving it and refresh ahead of time
+        _refresh_in_background()
+        return _cached_token
+
+    return await _refresh_token()
+
+
+def reset_access_token_cache() -> None:
+    """Drops the cached token so the next call fetches a new one."""
+    global _cached_token, _expires_at
+    _cached_token = None
+    _expires_at = 0.0
@@ -2,63 +2,409 @@
 Zoho CRM API call utilities.
 Fetches record data from Zoho CRM for any module type.
 """
+import asyncio
 import os
-import requests
-from typing import Dict, Any, Optional
+import threading
+import time
+import httpx
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from zoho_auth import get_access_token
+from http_client import get_http_client
+from ttl_cache import TTLCache
+from single_flight import SingleFlight
 
+# Upper bound on concurrent related-list requests per record
+ZOHO_RELATED_FETCH_WORKERS = int(os.getenv("ZOHO_RELATED_FETCH_WORKERS", "6"))
 
-def get_record_data(entity_type: str, entity_id: str, token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+# Per-request timeout (seconds) for Zoho CRM calls
+ZOHO_REQUEST_TIMEOUT = float(os.getenv("ZOHO_REQUEST_TIMEOUT", "10"))
+
+# Fetched records and related lists, keyed by (module, record id, related module or None).
+# Records older than the TTL are revalidated with If-Modified-Since; related lists are
+# refetched in full, since Zoho treats that header as a filter on related-list endpoints.
+record_cache = TTLCache(
+    max_entries=int(os.getenv("ZOHO_RECORD_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ZOHO_RECORD_CACHE_TTL", "60")),
+)
+
+# Concurrent identical fetches (same record, related list or account + modules) share one request
+zoho_fetches = SingleFlight("zoho_fetches")
+
+
+def _api_base_url() -> str:
+    api_domain = os.getenv("ZOHO_API_DOMAIN", "www.zohoapis.com")
+    return f"https://{api_domain}/crm/v3"
+
+
+def _auth_headers(token: str, if_modified_since: Optional[str] = None) -> Dict[str, str]:
+    headers = {
+        "Authorization": f"Zoho-oauthtoken {token}",
+        "Content-Type": "application/json"
+    }
+    if if_modified_since:
+        headers["If-Modified-Since"] = if_modified_since
+    return headers
+
+
+async def get_record_data(entity_type: str, entity_id: str, token: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Fetches record data from Zoho CRM for the specified entity.
-    
+    Served from the record cache while fresh; stale entries are revalidated
+    with If-Modified-Since.
+    Concurrent calls for the same record share one request.
+
     Args:
         entity_type: Module name (e.g., "Accounts", "Deals", "Contacts")
         entity_id: Record ID
         token: Optional access token. If not provided, will be fetched automatically.
-    
+
     Returns:
         Record data dictionary if successful, None otherwise.
     """
     if token is None:
-        token = get_access_token()
-    
+        token = await get_access_token()
+
     if not token:
         raise ValueError("Failed to obtain Zoho access token")
-    
+
+    record = await zoho_fetches.do(
+        ("record", entity_type, entity_id),
+        lambda: _fetch_record_data(entity_type, entity_id, token)
+    )
+    return dict(record) if record is not None else None
+
+
+async def _fetch_record_data(entity_type: str, entity_id: str, token: str) -> Optional[Dict[str, Any]]:
+    key = (entity_type, entity_id, None)
+    cached = record_cache.get(key, allow_stale=True)
+    if cached is not None and cached.is_fresh(record_cache.ttl):
+        return dict(cached.value)
+
     # Zoho CRM API endpoint
-    api_domain = os.getenv("ZOHO_API_DOMAIN", "www.zohoapis.com")
-    url = f"https://{api_domain}/crm/v3/{entity_type}/{entity_id}"
-    
-    headers = {
-        "Authorization": f"Zoho-oauthtoken {token}",
-        "Content-Type": "application/json"
-    }
-    
+    url = f"{_api_base_url()}/{entity_type}/{entity_id}"
+    headers = _auth_headers(token, cached.validator if cached else None)
+
     try:
-        response = requests.get(url, headers=headers)
+        response = await get_http_client().get(url, headers=headers, timeout=ZOHO_REQUEST_TIMEOUT)
+
+        # 304 Not Modified: the cached copy is still current
+        if response.status_code == 304 and cached is not None:
+            record_cache.mark_revalidated(key)
+            return dict(cached.value)
+
         response.raise_for_status()
         data = response.json()
-        
+
         # Zoho API returns data in 'data' array with one record
         if "data" in data and len(data["data"]) > 0:
-            return data["data"][0]
+            record = data["data"][0]
+            record_cache.set(key, record, validator=record.get("Modified_Time"))
+            return dict(record)
         return None
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         print(f"Error fetching record data: {e}")
         return None
 
 
-# Backward compatibility function for Accounts module
-def get_account_data(account_id: str, token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+async def get_related_records(
+    entity_type: str,
+    entity_id: str,
+    module: str,
+    token: str
+) -> Optional[List[Dict[str, Any]]]:
     """
-    Fetches account data from Zoho CRM (backward compatibility).
-    
+    Fetches one related list of a record, using the record cache and request
+    coalescing like get_record_data. Stale lists are fetched again in full:
+    on related-list endpoints Zoho answers If-Modified-Since with only the
+    records modified since then, which would drop unchanged records and hide
+    deletions.
+
+    Args:
+        entity_type: Parent module name (e.g., "Accounts")
+        entity_id: Parent record ID
+        module: Related list API name (e.g., "Contacts", "Liabilites_New")
+        token: Access token
+
+    Returns:
+        List of related records (possibly empty), or None if the request failed.
+    """
+    records = await zoho_fetches.do(
+        ("related", entity_type, entity_id, module),
+        lambda: _fetch_related_records(entity_type, entity_id, module, token)
+    )
+    return list(records) if records is not None else None
+
+
+async def _fetch_related_records(
+    entity_type: str,
+    entity_id: str,
+    module: str,
+    token: str
+) -> Optional[List[Dict[str, Any]]]:
+    key = (entity_type, entity_id, module)
+    cached = record_cache.get(key)
+    if cached is not None:
+        return list(cached.value)
+
+    # API endpoint: /{Module}/{id}/{Related_List_API_Name}
+    url = f"{_api_base_url()}/{entity_type}/{entity_id}/{module}"
+    headers = _auth_headers(token)
+
+    try:
+        # We limit per_page to 10 to keep payloads manageable
+        response = await get_http_client().get(
+            url,
+            headers=headers,
+            params={"per_page": 10},
+            timeout=ZOHO_REQUEST_TIMEOUT
+        )
+    except httpx.HTTPError as e:
+        print(f"   Error fetching {module}: {e}")
+        return None
+
+    # 204 No Content is common for empty lists, anything else is an error
+    if response.status_code == 204:
+        record_cache.set(key, [])
+        return []
+    if response.status_code != 200:
+        print(f"   Could not fetch {module} (Status: {response.status_code})")
+        return None
+
+    try:
+        records = response.json().get("data", [])
+    except ValueError as e:
+        print(f"   Error parsing {module}: {e}")
+        return None
+
+    record_cache.set(key, records)
+    return list(records)
+
+
+async def fetch_related_modules(
+    entity_type: str,
+    entity_id: str,
+    modules: List[str],
+    token: str
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetches several related lists concurrently.
+
+    Requests run concurrently on the event loop, at most
+    ZOHO_RELATED_FETCH_WORKERS at a time, so the total time is close to the
+    slowest single call. A failure or timeout in one module does not affect the
+    others; failed modules are simply left out of the result, while empty ones
+    map to [] so callers can tell "no records" from "not fetched".
+
+    Args:
+        entity_type: Parent module name
+        entity_id: Parent record ID
+        modules: Related list API names to fetch
+        token: Access token
+
+    Returns:
+        Dictionary mapping each fetched module name to its list of records.
+    """
+    # Preserve the requested order while dropping duplicates
+    modules = list(dict.fromkeys(modules))
+    if not modules:
+        return {}
+
+    semaphore = asyncio.Semaphore(max(1, ZOHO_RELATED_FETCH_WORKERS))
+
+    async def fetch(module: str) -> Optional[List[Dict[str, Any]]]:
+        async with semaphore:
+            return await get_related_records(entity_type, entity_id, module, token)
+
+    results = await asyncio.gather(*(fetch(module) for module in modules), return_exceptions=True)
+
+    related = {}
+    for module, records in zip(modules, results):
+        if isinstance(records, Exception):
+            print(f"   Error fetching {module}: {records}")
+            continue
+
+        if records:
+            print(f"   Found {len(records)} records in {module}")
+        elif records is not None:
+            print(f"   {module} is empty.")
+        if records is not None:
+            related[module] = records
+
+    return related
+
+
+async def get_account_data(
+    account_id: str,
+    token: Optional[str] = None,
+    related_modules_to_fetch: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches account data from Zoho CRM, optionally with related lists.
+    Concurrent calls for the same account and modules share one fetch.
+
     Args:
         account_id: Account ID
         token: Optional access token
-    
+        related_modules_to_fetch: Related list API names to include. Each one is
+            stored on the returned record under "Related_<Module>". If None,
+            only the main account data is returned.
+
     Returns:
         Account data dictionary if successful, None otherwise.
     """
-    return get_record_data("Accounts", account_id, token)
+    if token is None:
+        token = await get_access_token()
+
+    modules_key = tuple(dict.fromkeys(related_modules_to_fetch or []))
+    account_data = await zoho_fetches.do(
+        ("account", account_id, modules_key),
+        lambda: _fetch_account_data(account_id, token, related_modules_to_fetch)
+    )
+    return dict(account_data) if account_data is not None else None
+
+
+async def _fetch_account_data(
+    account_id: str,
+    token: str,
+    related_modules_to_fetch: Optional[List[str]]
+) -> Optional[Dict[str, Any]]:
+    # 1. ALWAYS Fetch the MAIN Account (Core details are always needed)
+    print(f"Fetching Main Account ID: {account_id}...")
+    account_data = await get_record_data("Accounts", account_id, token)
+    if not account_data:
+        return None
+
+    # 2. FETCH SPECIFIC RELATED MODULES (Optimization)
+    if not related_modules_to_fetch:
+        print("No specific related modules requested. Returning main account data only.")
+        return account_data
+
+    print(f"Fetching requested related modules: {related_modules_to_fetch}")
+    related = await fetch_related_modules("Accounts", account_id, related_modules_to_fetch, token)
+    for module, records in related.items():
+        account_data[f"Related_{module}"] = records
+
+    return account_data
+
+
+# Related lists fetched speculatively while the module router is still deciding
+ZOHO_PREFETCH_MODULES = [
+    m.strip() for m in os.getenv("ZOHO_PREFETCH_MODULES", "Contacts,Deals,Notes").split(",") if m.strip()
+]
+
+_prefetch_counters = {
+    "requests": 0,
+    "modules_used": 0,
+    "modules_dropped": 0,
+    "modules_extra": 0,
+    "time_saved_seconds": 0.0,
+    "answered_from_main": 0,
+}
+_prefetch_lock = threading.Lock()
+
+
+def _discard_tasks(tasks: List["asyncio.Task[Any]"]) -> None:
+    # On failure (of the router or any fetch), stop the fetches still running and
+    # retrieve errors of finished ones, so none is left running or logged unobserved
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+
+async def get_account_data_with_prefetch(
+    account_id: str,
+    token: str,
+    route: Awaitable[List[str]],
+    shortcut: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches an account while its related modules are still being chosen.
+
+    The main account and ZOHO_PREFETCH_MODULES are requested immediately and
+    run while `route` (the module router) is awaited. Once the router answers,
+    any modules it wants beyond the prefetched ones are fetched, and prefetched
+    modules it did not ask for are dropped from the result.
+
+    Args:
+        account_id: Account ID
+        token: Access token
+        route: Awaitable resolving to the related list API names to include
+        shortcut: Called with the main account record as soon as it arrives,
+            while routing and the related fetches go on. If it returns True,
+            they are cancelled and the main record is returned alone.
+
+    Returns:
+        Account data dictionary with "Related_<Module>" keys, or None if the
+        account could not be fetched.
+    """
+    started = time.monotonic()
+    fetch_done = {}
+
+    async def _timed(name: str, fetch: Awaitable[Any]) -> Any:
+        try:
+            return await fetch
+        finally:
+            fetch_done[name] = time.monotonic()
+
+    print(f"Prefetching Main Account ID: {account_id} and {ZOHO_PREFETCH_MODULES}...")
+    main_task = asyncio.create_task(_timed("main", get_record_data("Accounts", account_id, token)))
+    prefetch_task = asyncio.create_task(_timed(
+        "prefetch", fetch_related_modules("Accounts", account_id, ZOHO_PREFETCH_MODULES, token)
+    ))
+    route_task = asyncio.ensure_future(route)
+    tasks = [main_task, prefetch_task, route_task]
+
+    try:
+        if shortcut is not None:
+            main_record = await main_task
+            if main_record and shortcut(main_record):
+                with _prefetch_lock:
+                    _prefetch_counters["answered_from_main"] += 1
+                return main_record
+
+        target_modules = list(dict.fromkeys(await route_task))
+        routed_at = time.monotonic()
+
+        extra_modules = [m for m in target_modules if m not in ZOHO_PREFETCH_MODULES]
+        if extra_modules:
+            print(f"Fetching modules beyond the prefetch: {extra_modules}")
+            tasks.append(asyncio.create_task(fetch_related_modules("Accounts", account_id, extra_modules, token)))
+        results = await asyncio.gather(*(task for task in tasks if task is not route_task))
+    finally:
+        _discard_tasks(tasks)
+    account_data, prefetched = results[0], results[1]
+    extra = results[2] if extra_modules else {}
+
+    # Fetch time that overlapped with routing is time a serial pipeline would have spent waiting
+    overlap = min(routed_at, max(fetch_done.values())) - started
+    used = [m for m in ZOHO_PREFETCH_MODULES if m in target_modules]
+    dropped = [m for m in ZOHO_PREFETCH_MODULES if m not in target_modules]
+    with _prefetch_lock:
+        _prefetch_counters["requests"] += 1
+        _prefetch_counters["modules_used"] += len(used)
+        _prefetch_counters["modules_dropped"] += len(dropped)
+        _prefetch_counters["modules_extra"] += len(extra_modules)
+        _prefetch_counters["time_saved_seconds"] += max(0.0, overlap)
+    print(f"Prefetch used {used}, dropped {dropped}, saved {overlap * 1000:.0f} ms")
+
+    if not account_data:
+        return None
+
+    for module in target_modules:
+        records = prefetched[module] if module in prefetched else extra.get(module)
+        if records is not None:
+            account_data[f"Related_{module}"] = records
+    return account_data
+
+
+def prefetch_stats() -> Dict[str, Any]:
+    """Returns speculative prefetch counters, including total routing time hidden behind fetches."""
+    with _prefetch_lock:
+        stats = dict(_prefetch_counters)
+    stats["time_saved_seconds"] = round(stats["time_saved_seconds"], 3)
+    stats["avg_time_saved_ms"] = (
+        round(stats["time_saved_seconds"] * 1000 / stats["requests"], 1) if stats["requests"] else 0.0
+    )
+    return stats
@@ -16,13 +16,27 @@ export interface ChatRequest {
   entity_type?: string;
   /** User query string */
   query: string;
+  /** Stream the answer as Server-Sent Events instead of returning one JSON body */
+  stream?: boolean;
 }
 
 export interface ChatResponse {
   response: string;
   actions?: Action[];
+  cached?: boolean; // True when served from the backend answer cache
 }
 
+/**
+ * Server-Sent Events sent by the streaming chat endpoint, in order:
+ * any number of "token" events, then "actions", then "done".
+ * "error" replaces the remaining events if generation fails mid-stream.
+ */
+export type ChatStreamEvent =
+  | { event: 'token'; data: { text: string } }
+  | { event: 'actions'; data: { actions: Action[] } }
+  | { event: 'done'; data: { cached?: boolean } }
+  | { event: 'error'; data: { detail: string } };
+
 // New /scan endpoint
 export interface ScanRequest {
   entity_id: string;
@@ -38,6 +52,7 @@ export interface Recommendation {
 
 export interface ScanResponse {
   recommendations: Recommendation[];
+  cached?: boolean; // True when served from the backend answer cache
 }
 
 // Action structure for actionable UI
@@ -67,6 +82,32 @@ export interface UploadRequest {
 export interface UploadResponse {
   success: boolean;
   message: string;
+  job_id?: string; // Poll GET /api/upload/{job_id} for ingestion progress
+  status?: UploadJobState;
+  content_hash?: string; // SHA-256 of the uploaded file
+}
+
+export type UploadJobState = "queued" | "running" | "succeeded" | "failed";
+
+export interface UploadJobStatus {
+  job_id: string;
+  status: UploadJobState;
+  stage: "extracting" | "embedding" | null;
+  progress: number; // 0-1
+  entity_id: string;
+  entity_type: string;
+  filename: string;
+  size_bytes: number;
+  content_hash: string | null;
+  chunks_total: number | null;
+  chunks_embedded: number; // Chunks sent to the embedding model
+  chunks_reused: number | null; // Chunks whose vectors were reused (includes chunks_unchanged)
+  chunks_unchanged: number | null;
+  duplicate: boolean | null; // Set once succeeded: same content was uploaded before and was copied
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
 }
 
 // Zoho execute endpoint